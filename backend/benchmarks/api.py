@@ -0,0 +1,292 @@
+"""
+Benchmark de extremo a extremo de la API: rendimiento y latencia por endpoint
+según el tamaño del catálogo.
+
+Uso (desde /backend):
+    python benchmarks/api.py --salida resultados.json
+    python benchmarks/api.py --tamanos 10000 --clientes 1 8 --modos uvicorn --workers 4
+    python benchmarks/api.py --tamanos 1000 --comparar resultados.json
+
+Para cada tamaño se genera una ontología sintética en un directorio temporal
+y se mide cada escenario (endpoint) con N clientes concurrentes durante
+--segundos, en dos modos:
+
+  proceso   la aplicación se ejecuta en un subproceso y los clientes le hablan
+            por ASGI, sin red (mide la aplicación, comparte GIL con el cliente)
+  uvicorn   la aplicación corre en un uvicorn local y los clientes usan HTTP
+
+Cada modo parte de una copia limpia de la ontología, así que las escrituras
+de un modo no afectan al otro. El JSON de salida incluye el commit, de modo
+que puede compararse con el de otra revisión mediante --comparar.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from comun import BACKEND_DIR, poblar_sintetico
+
+IRI = "http://uni.edu/biblioteca.owl#"
+ESCENARIOS_DEFECTO = [
+    "libros", "libros_pagina", "individuo", "buscador", "sparql",
+    "crear", "dato", "relacion", "mixto",
+]
+
+
+# --- Escenarios: cada uno devuelve (método, ruta, json) para una petición ---
+
+def _libro(rnd, n):
+    i = rnd.randrange(n)
+    return f"bench_libro_{i - i % 10 + rnd.randrange(7)}"
+
+def _estudiante(rnd, n):
+    i = rnd.randrange(n)
+    return f"bench_estudiante_{i - i % 10 + 7 + rnd.randrange(3)}" if n >= 10 else None
+
+def _peticion(escenario, rnd, n, cliente, contador):
+    if escenario == "libros":
+        return "GET", "/libros", None
+    if escenario == "libros_pagina":
+        return "GET", "/libros?limit=100", None
+    if escenario == "individuo":
+        return "GET", f"/individuos/{_libro(rnd, n)}", None
+    if escenario == "buscador":
+        return "GET", f"/buscador?q=prueba {rnd.randrange(n)}", None
+    if escenario == "sparql":
+        return "POST", "/consultar/sparql", {
+            "query": f"SELECT ?l WHERE {{ ?l <{IRI}titulo> ?? . }}",
+            "parametros": [f"Libro de prueba {_libro(rnd, n).rsplit('_', 1)[1]}"],
+        }
+    if escenario == "crear":
+        return "POST", "/individuos/", {"name": f"bench_nuevo_{cliente}_{contador}", "class_name": "Libro"}
+    if escenario == "dato":
+        return "POST", "/individuos/datos", {"individual": _libro(rnd, n), "property": "resumen", "value": f"nota {contador}"}
+    if escenario == "relacion":
+        return "POST", "/individuos/relacion", {
+            "subject": _estudiante(rnd, n), "property": "toma_prestado", "object": _libro(rnd, n),
+        }
+    if escenario == "mixto":
+        # Carga típica: 90% lecturas, 10% escrituras
+        r = rnd.random()
+        elegido = "individuo" if r < 0.5 else "buscador" if r < 0.7 else "libros_pagina" if r < 0.8 \
+            else "sparql" if r < 0.9 else "dato"
+        return _peticion(elegido, rnd, n, cliente, contador)
+    raise ValueError(f"Escenario desconocido: {escenario}")
+
+
+# --- Medición ---
+
+def _percentil(ordenadas, p):
+    if not ordenadas:
+        return None
+    return ordenadas[min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))]
+
+async def _ronda(cliente, escenario, n, clientes, segundos, max_peticiones):
+    """`clientes` tareas concurrentes piden sin pausa hasta agotar el tiempo."""
+    latencias = []
+    errores = {}
+    fin = time.perf_counter() + segundos
+
+    async def trabajo(c):
+        rnd = random.Random(f"{escenario}:{c}")
+        k = 0
+        while time.perf_counter() < fin and len(latencias) < max_peticiones:
+            metodo, ruta, cuerpo = _peticion(escenario, rnd, n, c, k)
+            k += 1
+            inicio = time.perf_counter()
+            try:
+                r = await cliente.request(metodo, ruta, json=cuerpo)
+                await r.aread()
+                estado = r.status_code
+            except httpx.HTTPError as e:
+                estado = type(e).__name__
+            latencias.append(time.perf_counter() - inicio)
+            if estado != 200:
+                errores[str(estado)] = errores.get(str(estado), 0) + 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajo(c) for c in range(clientes)))
+    duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    ms = lambda s: round(s * 1000, 3) if s is not None else None
+    return {
+        "escenario": escenario,
+        "clientes": clientes,
+        "peticiones": len(latencias),
+        "errores": errores,
+        "segundos": round(duracion, 3),
+        "peticiones_por_seg": round(len(latencias) / duracion, 1),
+        "p50_ms": ms(_percentil(latencias, 50)),
+        "p95_ms": ms(_percentil(latencias, 95)),
+        "p99_ms": ms(_percentil(latencias, 99)),
+        "max_ms": ms(latencias[-1] if latencias else None),
+    }
+
+async def _medir(cliente, args, n):
+    resultados = []
+    for escenario in args.escenarios:
+        for clientes in args.clientes:
+            r = await _ronda(cliente, escenario, n, clientes, args.segundos, args.max_peticiones)
+            resultados.append(r)
+            print(f"      {escenario:<14} {clientes:>3} clientes  {r['peticiones_por_seg']:>9.1f} pet/s"
+                  f"  p50 {r['p50_ms']:>9.2f}  p95 {r['p95_ms']:>9.2f}  p99 {r['p99_ms']:>9.2f} ms"
+                  f"{'  errores ' + json.dumps(r['errores']) if r['errores'] else ''}", file=sys.stderr, flush=True)
+    return resultados
+
+
+# --- Modos ---
+
+def _preparar(cantidad):
+    """Subproceso: genera biblioteca.owl con `cantidad` individuos."""
+    import main
+
+    main.inicializar_ontologia_base()
+    poblar_sintetico(main.onto, cantidad)
+    main.guardar_ontologia()
+
+async def _en_proceso(args, n):
+    """Subproceso: arranca la aplicación y la mide por ASGI, sin red."""
+    import main
+
+    main.startup_event()
+    transporte = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=None) as cliente:
+            return await _medir(cliente, args, n)
+    finally:
+        main.shutdown_event()
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def _en_uvicorn(args, n, cwd, env):
+    puerto = _puerto_libre()
+    comando = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(puerto),
+               "--log-level", "warning", "--app-dir", BACKEND_DIR]
+    if args.workers > 1:
+        comando += ["--workers", str(args.workers)]
+        env = dict(env, BIBLIOTECA_MULTIPROCESO="1")
+    servidor = subprocess.Popen(comando, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    limites = httpx.Limits(max_connections=max(args.clientes), max_keepalive_connections=max(args.clientes))
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{puerto}", timeout=None, limits=limites) as cliente:
+            limite = time.monotonic() + 600
+            while True:
+                if servidor.poll() is not None:
+                    raise RuntimeError(f"uvicorn terminó con código {servidor.returncode}")
+                try:
+                    if (await cliente.get("/")).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.monotonic() > limite:
+                    raise RuntimeError("uvicorn no respondió a tiempo")
+                await asyncio.sleep(0.2)
+            return await _medir(cliente, args, n)
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+
+# --- Resultados ---
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _comparar(actual, ruta_anterior):
+    with open(ruta_anterior) as f:
+        anterior = json.load(f)
+    clave = lambda r: (r["individuos"], r["modo"], r["escenario"], r["clientes"])
+    previos = {clave(r): r for r in anterior["resultados"]}
+    print(f">>> Comparación con {ruta_anterior} (commit {anterior.get('commit')})")
+    for r in actual["resultados"]:
+        p = previos.get(clave(r))
+        if not p or not p["peticiones_por_seg"] or not p["p50_ms"] or not r["p50_ms"]:
+            continue
+        print(f"   {r['individuos']:>7} {r['modo']:<8} {r['escenario']:<14} {r['clientes']:>3} clientes"
+              f"  pet/s x{r['peticiones_por_seg'] / p['peticiones_por_seg']:.2f}"
+              f"  p50 x{r['p50_ms'] / p['p50_ms']:.2f}  p99 x{r['p99_ms'] / p['p99_ms']:.2f}")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--modos", nargs="+", choices=["proceso", "uvicorn"], default=["proceso", "uvicorn"])
+    parser.add_argument("--escenarios", nargs="+", choices=ESCENARIOS_DEFECTO, default=ESCENARIOS_DEFECTO)
+    parser.add_argument("--clientes", type=int, nargs="+", default=[1, 8], help="Clientes concurrentes")
+    parser.add_argument("--segundos", type=float, default=5.0, help="Duración de cada escenario")
+    parser.add_argument("--max-peticiones", type=int, default=100000, help="Tope de peticiones por escenario")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn (activa BIBLIOTECA_MULTIPROCESO)")
+    parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--_accion", help=argparse.SUPPRESS)
+    parser.add_argument("--_cantidad", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._accion == "preparar":
+        _preparar(args._cantidad)
+        return
+    if args._accion == "proceso":
+        print(json.dumps(asyncio.run(_en_proceso(args, args._cantidad))))
+        return
+
+    env = {k: v for k, v in os.environ.items() if k not in ("BIBLIOTECA_QUADSTORE", "BIBLIOTECA_MULTIPROCESO")}
+    env.update(BIBLIOTECA_COMPACTAR_SEG="3600", BIBLIOTECA_COMPACTAR_BYTES=str(1 << 40))
+    opciones = ["--segundos", str(args.segundos), "--max-peticiones", str(args.max_peticiones),
+                "--escenarios", *args.escenarios, "--clientes", *map(str, args.clientes)]
+
+    salida = {
+        "commit": _commit(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "parametros": {k: v for k, v in vars(args).items() if not k.startswith("_") and k not in ("salida", "comparar")},
+        "resultados": [],
+    }
+    for cantidad in args.tamanos:
+        print(f">>> Preparando ontología con {cantidad} individuos...", flush=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            base = os.path.join(tmp, "base")
+            os.mkdir(base)
+            subprocess.run([sys.executable, os.path.abspath(__file__), "--_accion", "preparar", "--_cantidad", str(cantidad)],
+                           cwd=base, env=env, capture_output=True, check=True)
+
+            for modo in args.modos:
+                print(f"   {modo}", flush=True)
+                cwd = os.path.join(tmp, modo)
+                shutil.copytree(base, cwd)
+                if modo == "proceso":
+                    proc = subprocess.run(
+                        [sys.executable, os.path.abspath(__file__), "--_accion", "proceso", "--_cantidad", str(cantidad), *opciones],
+                        cwd=cwd, env=env, stdout=subprocess.PIPE, text=True, check=True,
+                    )
+                    resultados = json.loads(proc.stdout.strip().splitlines()[-1])
+                else:
+                    resultados = asyncio.run(_en_uvicorn(args, cantidad, cwd, env))
+                salida["resultados"].extend({"individuos": cantidad, "modo": modo, **r} for r in resultados)
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(salida, f, indent=2)
+    if args.comparar:
+        _comparar(salida, args.comparar)
+
+
+if __name__ == "__main__":
+    main_cli()
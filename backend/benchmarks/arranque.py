@@ -0,0 +1,121 @@
+"""
+Benchmark de arranque en frío: ontología en RDF/XML (biblioteca.owl) frente al
+quadstore SQLite persistente (BIBLIOTECA_QUADSTORE).
+
+Uso (desde /backend):
+    python benchmarks/arranque.py
+    python benchmarks/arranque.py --tamanos 10000 --repeticiones 3
+
+Para cada tamaño se genera una ontología sintética en un directorio temporal,
+se importa una vez al quadstore y luego se mide, en procesos nuevos, el tiempo
+de carga de la ontología, el de construcción de los índices en memoria y la
+memoria residente máxima (RSS) de cada modo.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from comun import poblar_sintetico
+
+SQLITE = "biblioteca.sqlite3"
+
+
+def _preparar(cantidad):
+    """Subproceso: genera biblioteca.owl con `cantidad` individuos."""
+    import main
+
+    main.inicializar_ontologia_base()
+    poblar_sintetico(main.onto, cantidad)
+    main.guardar_ontologia()
+
+
+def _importar():
+    """Subproceso: importa biblioteca.owl al quadstore."""
+    import main
+    import quadstore
+
+    quadstore.abrir(SQLITE, main.ONTO_FILE, main.IRI_BASE)
+
+
+def _medir_arranque():
+    """Subproceso: mide la carga de la ontología y la construcción de índices."""
+    import main
+
+    inicio = time.perf_counter()
+    main.inicializar_ontologia_base()
+    ontologia = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    main.indice_busqueda.construir(main.onto.individuals())
+    main.estadisticas.construir(main.onto)
+    indices = time.perf_counter() - inicio
+
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"ontologia_seg": ontologia, "indices_seg": indices, "total_seg": ontologia + indices, "rss_mb": rss_kb / 1024}
+
+
+def _subproceso(accion, cwd, env, *extra):
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--_accion", accion, *extra],
+        cwd=cwd, env=env, capture_output=True, text=True, check=True,
+    )
+    return proc.stdout.strip().splitlines()[-1] if proc.stdout.strip() else None
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--_accion", help=argparse.SUPPRESS)
+    parser.add_argument("--_cantidad", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._accion == "preparar":
+        _preparar(args._cantidad)
+        return
+    if args._accion == "importar":
+        _importar()
+        return
+    if args._accion == "medir":
+        print(json.dumps(_medir_arranque()))
+        return
+
+    base_env = {k: v for k, v in os.environ.items() if k != "BIBLIOTECA_QUADSTORE"}
+    todos = []
+    for cantidad in args.tamanos:
+        print(f">>> Preparando ontología con {cantidad} individuos...", flush=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            _subproceso("preparar", tmp, base_env, "--_cantidad", str(cantidad))
+            _subproceso("importar", tmp, dict(base_env, BIBLIOTECA_QUADSTORE=SQLITE))
+            tamano_owl = os.path.getsize(os.path.join(tmp, "biblioteca.owl"))
+            tamano_sqlite = os.path.getsize(os.path.join(tmp, SQLITE))
+
+            resultado = {"individuos": cantidad, "owl_mb": tamano_owl / 2**20, "sqlite_mb": tamano_sqlite / 2**20}
+            for modo, env in (("owl", base_env), ("sqlite", dict(base_env, BIBLIOTECA_QUADSTORE=SQLITE))):
+                medidas = [json.loads(_subproceso("medir", tmp, env)) for _ in range(args.repeticiones)]
+                resultado[modo] = {
+                    clave: round(statistics.median(m[clave] for m in medidas), 3)
+                    for clave in medidas[0]
+                }
+        todos.append(resultado)
+
+        print(f"   archivos: owl {resultado['owl_mb']:.1f} MB, sqlite {resultado['sqlite_mb']:.1f} MB")
+        for modo in ("owl", "sqlite"):
+            r = resultado[modo]
+            print(f"   {modo:<7} ontología {r['ontologia_seg']:>8.3f} s   índices {r['indices_seg']:>7.3f} s"
+                  f"   total {r['total_seg']:>8.3f} s   RSS {r['rss_mb']:>8.1f} MB")
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(todos, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,29 @@
+"""Utilidades compartidas por los benchmarks (se ejecutan desde /backend)."""
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def poblar_sintetico(onto, cantidad: int):
+    """
+    Crea `cantidad` individuos sintéticos: ~70% libros y ~30% estudiantes,
+    con un préstamo por estudiante. Los IDs son deterministas.
+    """
+    libros = []
+    with onto:
+        for i in range(cantidad):
+            if i % 10 < 7:
+                libro = onto.Libro(f"bench_libro_{i}")
+                libro.titulo = [f"Libro de prueba {i}"]
+                libro.estado_libro = ["Disponible"]
+                libros.append(libro)
+            else:
+                est = onto.Estudiante(f"bench_estudiante_{i}")
+                est.nombre = [f"Estudiante {i}"]
+                est.carrera = ["Sistemas"]
+                if libros:
+                    est.toma_prestado = [libros[i % len(libros)]]
+    return libros
@@ -0,0 +1,170 @@
+"""
+Prueba de estrés del cerrojo de lectura/escritura de la ontología: lectores y
+un escritor concurrentes sobre los mismos individuos.
+
+Uso (desde /backend):
+    python benchmarks/concurrencia.py
+    python benchmarks/concurrencia.py --tamano 10000 --hilos 1 2 4 8 16 --segundos 3
+
+El escritor actualiza `titulo` e `isbn` de un mismo libro en una sola
+operación por lotes (dos mutaciones en la misma sección crítica); los lectores
+consultan ese libro y uno al azar. Una lectura es "corrupta" si ve una de las
+dos mutaciones sin la otra. Se compara el cerrojo de lectura/escritura con un
+cerrojo exclusivo único y con no usar cerrojo.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from comun import poblar_sintetico
+
+PAR = "bench_par"
+
+
+class _CerrojoExclusivo:
+    """Referencia: un único RLock para lecturas y escrituras."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+
+    def adquirir_lectura(self, plazo=None):
+        self._lock.acquire()
+
+    liberar_lectura = lambda self: self._lock.release()
+    adquirir_escritura = adquirir_lectura
+    liberar_escritura = liberar_lectura
+
+
+class _SinCerrojo:
+    def adquirir_lectura(self, plazo=None):
+        pass
+
+    def liberar_lectura(self):
+        pass
+
+    adquirir_escritura = adquirir_lectura
+    liberar_escritura = liberar_lectura
+
+
+def _usar_cerrojo(main, cerrojo):
+    main._lectura = main._cerrojo(cerrojo.adquirir_lectura, cerrojo.liberar_lectura)
+    main._escritura = main._cerrojo(cerrojo.adquirir_escritura, cerrojo.liberar_escritura)
+
+
+def _ronda(main, libros, hilos, segundos):
+    par = main.onto[PAR]
+    par.titulo = []
+    par.isbn = []
+    fin = time.monotonic() + segundos
+    lecturas = [0] * hilos
+    corruptas = [0] * hilos
+    escrituras = [0]
+
+    def lector(h):
+        rnd = random.Random(h)
+        while time.monotonic() < fin:
+            with main._lectura():
+                datos = main._consultar_individuo(PAR)["datos"]
+                main._consultar_individuo(libros[rnd.randrange(len(libros))])
+            if len(datos.get("titulo", ())) != len(datos.get("isbn", ())):
+                corruptas[h] += 1
+            lecturas[h] += 1
+
+    def escritor():
+        n = 0
+        while time.monotonic() < fin:
+            n += 1
+            main._aplicar_lote([
+                (1, json.dumps({"op": "dato", "individual": PAR, "property": "titulo", "value": f"v{n}"}).encode()),
+                (2, json.dumps({"op": "dato", "individual": PAR, "property": "isbn", "value": f"v{n}"}).encode()),
+            ])
+            escrituras[0] += 1
+            time.sleep(0.001)
+
+    workers = [threading.Thread(target=lector, args=(h,)) for h in range(hilos)]
+    workers.append(threading.Thread(target=escritor))
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return {
+        "lectores": hilos,
+        "lecturas_por_seg": round(sum(lecturas) / segundos, 1),
+        "escrituras_por_seg": round(escrituras[0] / segundos, 1),
+        "lecturas_corruptas": sum(corruptas),
+    }
+
+
+def _ejecutar(cantidad, hilos, segundos):
+    """Se ejecuta dentro del subproceso, con el directorio temporal como cwd."""
+    import main
+
+    main.inicializar_ontologia_base()
+    libros = [l.name for l in poblar_sintetico(main.onto, cantidad)]
+    with main.onto:
+        main.onto.Libro(PAR)
+    main.guardar_ontologia()
+    main.indice_busqueda.construir(main.onto.individuals())
+    main.estadisticas.construir(main.onto)
+    main.bitacora.modo = "grupo"
+    main.bitacora.abrir()
+
+    resultados = {"individuos": cantidad}
+    cerrojos = {
+        "lectura_escritura": main.cerrojo_onto,
+        "exclusivo": _CerrojoExclusivo(),
+        "sin_cerrojo": _SinCerrojo(),
+    }
+    for modo, cerrojo in cerrojos.items():
+        _usar_cerrojo(main, cerrojo)
+        resultados[modo] = [_ronda(main, libros, h, segundos) for h in hilos]
+    resultados["metricas_cerrojo"] = main.cerrojo_onto.metricas()
+    return resultados
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamano", type=int, default=10000)
+    parser.add_argument("--hilos", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--segundos", type=float, default=3.0, help="Duración de cada ronda")
+    parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--_ejecutar", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._ejecutar:
+        print(json.dumps(_ejecutar(args.tamano, args.hilos, args.segundos)))
+        return
+
+    print(f">>> Estrés con {args.tamano} individuos, lectores {args.hilos}...", flush=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, BIBLIOTECA_COMPACTAR_SEG="3600", BIBLIOTECA_COMPACTAR_BYTES=str(1 << 40))
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--_ejecutar", "--tamano", str(args.tamano),
+             "--segundos", str(args.segundos), "--hilos", *map(str, args.hilos)],
+            cwd=tmp, env=env, capture_output=True, text=True, check=True,
+        )
+        resultado = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    for modo in ("lectura_escritura", "exclusivo", "sin_cerrojo"):
+        print(f"   {modo}")
+        for r in resultado[modo]:
+            print(f"      {r['lectores']:>3} lectores  {r['lecturas_por_seg']:>10.1f} lecturas/s"
+                  f"  {r['escrituras_por_seg']:>8.1f} escrituras/s  corruptas {r['lecturas_corruptas']}")
+    m = resultado["metricas_cerrojo"]
+    for tipo in ("lectura", "escritura"):
+        print(f"   espera {tipo:<9} media {m[tipo]['espera_media_ms']:>8.3f} ms  máx {m[tipo]['espera_max_ms']:>8.3f} ms"
+              f"  ({m[tipo]['esperas']} de {m[tipo]['adquisiciones']})")
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(resultado, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
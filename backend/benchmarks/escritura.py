@@ -0,0 +1,132 @@
+"""
+Benchmark de rendimiento de escritura: guardado completo por mutación
+(comportamiento anterior) frente a la bitácora en modo "fsync" y "grupo".
+
+Uso (desde /backend):
+    python benchmarks/escritura.py
+    python benchmarks/escritura.py --tamanos 1000 10000 --escrituras 500 --hilos 8
+
+Cada tamaño se mide en un subproceso propio sobre una ontología temporal,
+así que nunca se toca el biblioteca.owl del proyecto.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from comun import poblar_sintetico
+
+
+def _poblar(main, cantidad):
+    libros = poblar_sintetico(main.onto, cantidad)
+    main.guardar_ontologia()
+    main._construir_indices()
+    return [l.name for l in libros]
+
+
+def _medir(escribir, escrituras, hilos):
+    por_hilo = max(1, escrituras // hilos)
+    errores = []
+
+    def trabajo(h):
+        try:
+            for i in range(por_hilo):
+                escribir(h, i)
+        except Exception as e:
+            errores.append(e)
+
+    inicio = time.perf_counter()
+    workers = [threading.Thread(target=trabajo, args=(h,)) for h in range(hilos)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    if errores:
+        # Una medición con escrituras fallidas no sirve: se aborta con el primer error
+        raise errores[0]
+    duracion = time.perf_counter() - inicio
+    total = por_hilo * hilos
+    return {"escrituras": total, "segundos": round(duracion, 4), "escrituras_por_seg": round(total / duracion, 1)}
+
+
+def _ejecutar_tamano(cantidad, escrituras, escrituras_guardado, hilos):
+    """Se ejecuta dentro del subproceso, con el directorio temporal como cwd."""
+    import main
+
+    main.inicializar_ontologia_base()
+    libros = _poblar(main, cantidad)
+    main.bitacora.abrir()
+
+    def dato(h, i):
+        main.agregar_dato(main.DataPropertyUpdate(
+            individual=libros[(h * 7919 + i) % len(libros)], property="resumen", value=f"nota {h}-{i}"))
+
+    resultados = {"individuos": cantidad}
+
+    # Comportamiento anterior: aplicar la mutación y re-serializar todo el .owl
+    def dato_con_guardado(h, i):
+        main._aplicar_dato(libros[i % len(libros)], "resumen", f"nota {i}")
+        main.onto.save(file=main.ONTO_FILE)
+
+    resultados["guardado_completo"] = _medir(dato_con_guardado, escrituras_guardado, 1)
+
+    main.bitacora.modo = "fsync"
+    resultados["bitacora_fsync"] = _medir(dato, escrituras, 1)
+    resultados["bitacora_fsync_concurrente"] = _medir(dato, escrituras, hilos)
+
+    main.bitacora.modo = "grupo"
+    resultados["bitacora_grupo_concurrente"] = _medir(dato, escrituras, hilos)
+
+    inicio = time.perf_counter()
+    main.bitacora.compactar()
+    resultados["compactacion_seg"] = round(time.perf_counter() - inicio, 4)
+    return resultados
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--escrituras", type=int, default=1000)
+    parser.add_argument("--escrituras-guardado", type=int, default=20,
+                        help="Máximo de escrituras medidas con guardado completo (se reduce en catálogos grandes)")
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--_tamano", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._tamano:
+        resultado = _ejecutar_tamano(args._tamano, args.escrituras, args.escrituras_guardado, args.hilos)
+        print(json.dumps(resultado))
+        return
+
+    todos = []
+    for cantidad in args.tamanos:
+        print(f">>> Midiendo con {cantidad} individuos...", flush=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, BIBLIOTECA_COMPACTAR_SEG="3600", BIBLIOTECA_COMPACTAR_BYTES=str(1 << 40))
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--_tamano", str(cantidad),
+                 "--escrituras", str(args.escrituras),
+                 "--escrituras-guardado", str(min(args.escrituras_guardado, max(3, 200000 // cantidad))),
+                 "--hilos", str(args.hilos)],
+                cwd=tmp, env=env, capture_output=True, text=True, check=True,
+            )
+            resultado = json.loads(proc.stdout.strip().splitlines()[-1])
+        todos.append(resultado)
+
+        for modo in ("guardado_completo", "bitacora_fsync", "bitacora_fsync_concurrente", "bitacora_grupo_concurrente"):
+            r = resultado[modo]
+            print(f"   {modo:<28} {r['escrituras_por_seg']:>10.1f} escrituras/s  ({r['escrituras']} en {r['segundos']} s)")
+        print(f"   {'compactacion':<28} {resultado['compactacion_seg']:>10.4f} s")
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(todos, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,379 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+# "fsync": cada petición hace su propio fsync antes de responder.
+# "grupo": las peticiones concurrentes comparten un único fsync (group commit).
+MODOS_DURABILIDAD = ("fsync", "grupo")
+
+# Estado compartido entre procesos (archivo <bitácora>.estado):
+# secuencia global de mutaciones, época (rotaciones de la bitácora) y un token
+# aleatorio fijado al crear el archivo.
+_ESTADO = struct.Struct("<QQQ")
+
+
+def guardar_archivo_atomico(destino, escribir):
+    """
+    Escribe `destino` mediante `escribir(ruta_temporal)` y lo reemplaza de forma
+    atómica, de modo que una caída nunca deja un archivo a medio escribir.
+    """
+    temporal = destino + ".tmp"
+    escribir(temporal)
+    with open(temporal, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(temporal, destino)
+
+
+class Bitacora:
+    """
+    Bitácora de mutaciones de solo-anexado (write-behind).
+
+    Cada escritura se anota como una línea JSON y se sincroniza a disco antes
+    de responder. Un hilo en segundo plano compacta la bitácora persistiendo
+    la ontología completa con `guardar()` (archivo .owl o quadstore SQLite)
+    cuando se supera un umbral de tiempo o de tamaño. Al arrancar, las entradas que no llegaron a compactarse se
+    vuelven a aplicar con `leer_pendientes()`.
+
+    Las mutaciones deben aplicarse y anotarse dentro de `with bitacora.lock:`
+    para que la compactación nunca observe un cambio a medio registrar.
+
+    Con `compartida=True` varios procesos (uvicorn --workers N) usan la misma
+    bitácora como registro de deltas: las escrituras se serializan con un
+    cerrojo de archivo (`exclusivo()`), cada entrada avanza una secuencia
+    global en <ruta>.estado y los demás procesos leen las entradas nuevas con
+    `entradas_nuevas()`. La compactación reemplaza la bitácora por una vacía y
+    avanza la época; los lectores terminan de leer la anterior por su
+    descriptor abierto. `ponerse_al_dia()` debe aplicar esas entradas ajenas
+    y se invoca antes de cada compactación y periódicamente.
+    """
+
+    def __init__(self, ruta, guardar, modo="fsync", ventana_grupo=0.002,
+                 intervalo_compactacion=30.0, umbral_bytes=1 << 20,
+                 compartida=False, ponerse_al_dia=None):
+        if modo not in MODOS_DURABILIDAD:
+            raise ValueError(f"Modo de durabilidad no soportado: {modo}. Use: {', '.join(MODOS_DURABILIDAD)}")
+
+        self.ruta = ruta
+        self._guardar = guardar          # callable() que persiste la ontología completa
+        self.modo = modo
+        self.ventana_grupo = ventana_grupo
+        self.intervalo_compactacion = intervalo_compactacion
+        self.umbral_bytes = umbral_bytes
+
+        # Serializa mutaciones en memoria + anotación frente a la compactación
+        self.lock = threading.RLock()
+        # Protege el descriptor del archivo y los contadores de escritura
+        self._lock_archivo = threading.Lock()
+        self._cond = threading.Condition()
+
+        self._archivo = None
+        self._escritas = 0
+        self._sincronizadas = 0
+        self._sincronizando = False
+        self._pendientes = 0
+        self._bytes = 0
+        self._ultima_compactacion = time.monotonic()
+
+        self._detener = threading.Event()
+        self._hilo = None
+
+        # Modo multiproceso
+        self.compartida = compartida
+        self._ponerse_al_dia = ponerse_al_dia
+        self._cerrojo_procesos = None    # archivo <ruta>.lock para fcntl.flock
+        self._estado = None              # mmap de <ruta>.estado
+        self._flock = 0                  # profundidad del cerrojo exclusivo en este proceso
+        self._lector = None              # descriptor de lectura de la bitácora actual
+        self._leido = 0                  # bytes ya aplicados de la bitácora actual
+        self._epoca = 0
+
+    # --- Coordinación entre procesos ---
+
+    def _abrir_estado(self):
+        if self._estado is not None:
+            return
+        import fcntl  # solo POSIX; el modo multiproceso no está disponible en Windows
+        self._fcntl = fcntl
+        self._cerrojo_procesos = open(self.ruta + ".lock", "a+b")
+        ruta_estado = self.ruta + ".estado"
+        fcntl.flock(self._cerrojo_procesos, fcntl.LOCK_EX)
+        try:
+            with open(ruta_estado, "a+b") as f:
+                if os.path.getsize(ruta_estado) < _ESTADO.size:
+                    f.truncate(0)
+                    f.write(_ESTADO.pack(0, 0, int.from_bytes(os.urandom(6), "big")))
+                    f.flush()
+                    os.fsync(f.fileno())
+            with open(ruta_estado, "r+b") as f:
+                self._estado = mmap.mmap(f.fileno(), _ESTADO.size)
+        finally:
+            fcntl.flock(self._cerrojo_procesos, fcntl.LOCK_UN)
+
+    def _leer_estado(self):
+        return _ESTADO.unpack_from(self._estado, 0)
+
+    def secuencia(self) -> int:
+        """Cantidad total de mutaciones anotadas por todos los procesos."""
+        return self._leer_estado()[0]
+
+    def token(self) -> int:
+        return self._leer_estado()[2]
+
+    @contextmanager
+    def exclusivo(self):
+        """
+        `self.lock` y, en modo compartido, el cerrojo de archivo entre procesos.
+        Reentrante dentro del mismo hilo.
+        """
+        with self.lock:
+            if not self.compartida:
+                yield
+                return
+            self._abrir_estado()
+            if self._flock == 0:
+                self._fcntl.flock(self._cerrojo_procesos, self._fcntl.LOCK_EX)
+            self._flock += 1
+            try:
+                yield
+            finally:
+                self._flock -= 1
+                if self._flock == 0:
+                    self._fcntl.flock(self._cerrojo_procesos, self._fcntl.LOCK_UN)
+
+    @contextmanager
+    def compartido(self):
+        """Cerrojo de archivo compartido para leer entradas ajenas sin excluir a otros lectores."""
+        with self.lock:
+            if not self.compartida or self._flock:
+                yield
+                return
+            self._abrir_estado()
+            self._fcntl.flock(self._cerrojo_procesos, self._fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                self._fcntl.flock(self._cerrojo_procesos, self._fcntl.LOCK_UN)
+
+    def entradas_nuevas(self):
+        """
+        Entradas anotadas por otros procesos desde la última llamada, o None si
+        la bitácora rotó más de una vez entretanto (hay que recargar todo y
+        llamar a `reabrir()`). Requiere `exclusivo()` o `compartido()`.
+        """
+        entradas = self._leer_ajenas()
+        epoca = self._leer_estado()[1]
+        if epoca != self._epoca:
+            if epoca != self._epoca + 1:
+                return None
+            # La bitácora anterior ya se leyó completa por su descriptor;
+            # su contenido quedó compactado y la nueva empieza vacía.
+            self._reabrir_archivos(epoca)
+            self._pendientes = 0
+            self._bytes = 0
+            entradas += self._leer_ajenas()
+        return entradas
+
+    def _leer_ajenas(self):
+        entradas = []
+        self._lector.seek(self._leido)
+        for linea in self._lector:
+            if not linea.endswith(b"\n"):
+                break   # otro proceso está escribiéndola
+            entradas.append(json.loads(linea))
+            self._leido += len(linea)
+            self._bytes += len(linea)
+        self._pendientes += len(entradas)
+        return entradas
+
+    def _reabrir_archivos(self, epoca):
+        with self._lock_archivo:
+            if self._archivo is not None:
+                self._archivo.close()
+            self._archivo = open(self.ruta, "ab")
+        if self._lector is not None:
+            self._lector.close()
+        self._lector = open(self.ruta, "rb")
+        self._leido = 0
+        self._epoca = epoca
+
+    def reabrir(self):
+        """Tras recargar la ontología completa: continúa desde el final de la bitácora actual."""
+        self._reabrir_archivos(self._leer_estado()[1])
+        self._leido = os.path.getsize(self.ruta)
+        self._bytes = self._leido
+
+    # --- Lectura / reproducción ---
+
+    def leer_pendientes(self):
+        """
+        Devuelve las entradas que aún no fueron compactadas. Si la última línea
+        quedó truncada por una caída, se descarta y se recorta el archivo.
+        """
+        if not os.path.exists(self.ruta):
+            return []
+
+        entradas = []
+        valido_hasta = 0
+        with open(self.ruta, "rb") as f:
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    break
+                try:
+                    entradas.append(json.loads(linea))
+                except ValueError:
+                    break
+                valido_hasta += len(linea)
+
+        if valido_hasta < os.path.getsize(self.ruta):
+            print(f"--- Bitácora: descartando cola incompleta en {self.ruta} ---")
+            with open(self.ruta, "r+b") as f:
+                f.truncate(valido_hasta)
+                f.flush()
+                os.fsync(f.fileno())
+
+        self._pendientes = len(entradas)
+        self._bytes = valido_hasta
+        return entradas
+
+    # --- Escritura ---
+
+    def abrir(self):
+        if self.compartida:
+            if self._lector is None:
+                self._abrir_estado()
+                self.reabrir()
+            return
+        if self._archivo is None:
+            self._archivo = open(self.ruta, "ab")
+
+    def anotar(self, entrada: dict) -> int:
+        """Anexa una entrada y devuelve su número de secuencia (sin fsync)."""
+        linea = (json.dumps(entrada, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock_archivo:
+            self._archivo.write(linea)
+            if self.compartida:
+                # Visible para los demás procesos antes de soltar el cerrojo
+                self._archivo.flush()
+                self._leido = self._archivo.tell()
+                secuencia, epoca, token = self._leer_estado()
+                _ESTADO.pack_into(self._estado, 0, secuencia + 1, epoca, token)
+            self._escritas += 1
+            self._pendientes += 1
+            self._bytes += len(linea)
+            return self._escritas
+
+    def sincronizar(self, seq: int):
+        """Bloquea hasta que la entrada `seq` esté en disco."""
+        if self.modo == "fsync":
+            with self._lock_archivo:
+                if self._sincronizadas < seq:
+                    self._fsync()
+                    self._sincronizadas = self._escritas
+            return
+
+        # Group commit: un líder hace fsync por todos los que esperan
+        with self._cond:
+            while self._sincronizadas < seq and self._sincronizando:
+                self._cond.wait()
+            if self._sincronizadas >= seq:
+                return
+            self._sincronizando = True
+
+        hasta = 0
+        try:
+            if self.ventana_grupo:
+                time.sleep(self.ventana_grupo)
+            with self._lock_archivo:
+                hasta = self._escritas
+                self._fsync()
+        finally:
+            with self._cond:
+                self._sincronizando = False
+                if self._sincronizadas < hasta:
+                    self._sincronizadas = hasta
+                self._cond.notify_all()
+
+    def _fsync(self):
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+
+    # --- Compactación ---
+
+    def compactar(self):
+        """Persiste la ontología completa y vacía la bitácora."""
+        with self.exclusivo():
+            if self.compartida:
+                self._ponerse_al_dia()
+                if os.path.getsize(self.ruta) == 0:
+                    # Otro proceso acaba de compactar
+                    self._pendientes = 0
+                    self._bytes = 0
+                    self._ultima_compactacion = time.monotonic()
+                    return
+
+            self._guardar()
+
+            with self._lock_archivo:
+                self._archivo.flush()
+                if self.compartida:
+                    # Bitácora nueva y vacía; quien la esté leyendo termina la
+                    # anterior por su descriptor y ve la nueva época.
+                    guardar_archivo_atomico(self.ruta, lambda ruta: open(ruta, "wb").close())
+                    secuencia, epoca, token = self._leer_estado()
+                    _ESTADO.pack_into(self._estado, 0, secuencia, epoca + 1, token)
+                else:
+                    self._archivo.truncate(0)
+                    os.fsync(self._archivo.fileno())
+                self._pendientes = 0
+                self._bytes = 0
+                escritas = self._escritas
+            if self.compartida:
+                self._reabrir_archivos(epoca + 1)
+            self._ultima_compactacion = time.monotonic()
+
+        with self._cond:
+            self._sincronizadas = max(self._sincronizadas, escritas)
+            self._cond.notify_all()
+
+    def _debe_compactar(self):
+        if not self._pendientes:
+            return False
+        if self._bytes >= self.umbral_bytes:
+            return True
+        return time.monotonic() - self._ultima_compactacion >= self.intervalo_compactacion
+
+    def _bucle(self):
+        espera = min(1.0, self.intervalo_compactacion)
+        while not self._detener.wait(espera):
+            if self.compartida:
+                try:
+                    self._ponerse_al_dia()
+                except Exception as e:
+                    print(f"Error aplicando la bitácora compartida: {e}")
+            if self._debe_compactar():
+                try:
+                    self.compactar()
+                except Exception as e:
+                    print(f"Error compactando la bitácora: {e}")
+
+    def iniciar(self):
+        self.abrir()
+        if self._hilo is None:
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="bitacora-compactador", daemon=True)
+            self._hilo.start()
+
+    def cerrar(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+        if self._archivo is not None:
+            if self._pendientes:
+                self.compactar()
+            self._archivo.close()
+            self._archivo = None
@@ -0,0 +1,57 @@
+import threading
+from collections import OrderedDict
+
+
+class CacheRespuestas:
+    """
+    Caché LRU de respuestas JSON ya serializadas, acotada por memoria.
+
+    Cada entrada recuerda la generación de escritura con la que se construyó;
+    una entrada de una generación anterior se considera inválida y se descarta
+    al consultarla.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()   # clave -> (generacion, cuerpo)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave, generacion: int):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[0] != generacion:
+                if entrada is not None:
+                    self._quitar(clave)
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, clave, generacion: int, cuerpo: bytes):
+        if len(cuerpo) > self.max_bytes:
+            return
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = (generacion, cuerpo)
+            self._bytes += len(cuerpo)
+            while self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._entradas)))
+
+    def _quitar(self, clave):
+        _, cuerpo = self._entradas.pop(clave)
+        self._bytes -= len(cuerpo)
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+            }
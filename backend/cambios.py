@@ -0,0 +1,140 @@
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+
+
+class CanalCambios:
+    """
+    Canal de cambios de GET /cambios (Server-Sent Events).
+
+    Cada mutación se serializa una sola vez como evento SSE y se guarda en un
+    buffer circular acotado, ordenado por generación. Los suscriptores no
+    tienen cola propia: todos esperan el mismo futuro, que se resuelve al
+    publicar (o con cada latido), y al despertar copian del buffer lo que les
+    falta desde su última generación. Publicar cuesta lo mismo con uno o con
+    cientos de clientes conectados y un cliente lento solo retrasa su propia
+    conexión; si se queda atrás más que el buffer recibe un evento `reinicio`
+    (volver a pedir los listados).
+
+    Los IDs de evento son "época-generación", como los ETag. `publicar` se
+    llama desde los hilos de los endpoints; la espera es asíncrona en el
+    bucle de eventos del servidor.
+    """
+
+    def __init__(self, capacidad: int, latido_seg: float = 15.0):
+        self.latido_seg = latido_seg
+        self._lock = threading.Lock()
+        self._eventos = deque(maxlen=capacidad)   # (generacion, evento SSE codificado)
+        self._epoca = ""
+        self._ultima = 0            # generación del último evento publicado
+        self._bucle = None
+        self._futuro = None
+        self._aviso_pendiente = False
+        self._latido = None
+        self.suscriptores = 0
+
+    # --- Publicación (cualquier hilo) ---
+
+    def reiniciar(self, epoca: str, generacion: int):
+        """Fija la época y la generación actuales y vacía el buffer (arranque o recarga)."""
+        with self._lock:
+            self._epoca = epoca
+            self._ultima = generacion
+            self._eventos.clear()
+        self._avisar()
+
+    def publicar(self, generacion: int, evento: dict):
+        datos = json.dumps({**evento, "generacion": generacion}, ensure_ascii=False)
+        with self._lock:
+            if generacion != self._ultima + 1:
+                # Hueco en la secuencia: no se puede reanudar a través de él
+                self._eventos.clear()
+            self._eventos.append((generacion, f"id: {self._epoca}-{generacion}\nevent: cambio\ndata: {datos}\n\n".encode("utf-8")))
+            self._ultima = generacion
+        self._avisar()
+
+    def _avisar(self):
+        # Un solo aviso al bucle por tanda de publicaciones (ej: carga masiva)
+        with self._lock:
+            if self._bucle is None or self._aviso_pendiente:
+                return
+            self._aviso_pendiente = True
+            bucle = self._bucle
+        try:
+            bucle.call_soon_threadsafe(self._despertar, False)
+        except RuntimeError:
+            pass    # el bucle ya se cerró
+
+    # --- Suscripción (bucle de eventos) ---
+
+    def _despertar(self, latido: bool):
+        if not latido:
+            with self._lock:
+                self._aviso_pendiente = False
+        futuro, self._futuro = self._futuro, self._bucle.create_future()
+        if not futuro.done():
+            futuro.set_result(latido)
+
+    async def _latir(self):
+        while True:
+            await asyncio.sleep(self.latido_seg)
+            self._despertar(True)
+
+    def _vincular(self, bucle):
+        if self._bucle is bucle:
+            return
+        with self._lock:
+            self._bucle = bucle
+            self._aviso_pendiente = False
+        self._futuro = bucle.create_future()
+        self._latido = bucle.create_task(self._latir())
+
+    def _reinicio(self) -> bytes:
+        return f"id: {self._epoca}-{self._ultima}\nevent: reinicio\ndata: {json.dumps({'generacion': self._ultima})}\n\n".encode("utf-8")
+
+    def _pendientes(self, desde):
+        """(fragmento, nueva posición) con los eventos posteriores a la generación `desde`."""
+        with self._lock:
+            faltan = self._ultima - desde if desde is not None else -1
+            if faltan == 0:
+                return b"", desde
+            if faltan < 0 or faltan > len(self._eventos):
+                return self._reinicio(), self._ultima
+            # Los que faltan son siempre los últimos del buffer
+            eventos = list(itertools.islice(reversed(self._eventos), faltan))
+            return b"".join(e for _, e in reversed(eventos)), self._ultima
+
+    def _generacion_de(self, ultimo_id: str):
+        epoca, _, generacion = ultimo_id.strip().rpartition("-")
+        if epoca != self._epoca or not generacion.isdigit():
+            return None
+        return int(generacion)
+
+    async def suscribir(self, ultimo_id: str = None):
+        """
+        Genera los fragmentos SSE de una conexión. Con `ultimo_id` (cabecera
+        Last-Event-ID) reanuda desde el evento siguiente; sin él, empieza por
+        los cambios a partir de ahora.
+        """
+        self._vincular(asyncio.get_running_loop())
+        self.suscriptores += 1
+        try:
+            with self._lock:
+                desde = self._ultima if not ultimo_id else self._generacion_de(ultimo_id)
+                # Un bloque solo con `id` fija Last-Event-ID en el cliente sin
+                # emitir evento, así que reconectar no pierde cambios aunque no
+                # haya llegado ninguno todavía
+                inicio = "retry: 3000\n" + (f"id: {self._epoca}-{desde}\n" if desde is not None else "") + "\n"
+            yield inicio.encode("utf-8")
+            while True:
+                futuro = self._futuro
+                fragmento, desde = self._pendientes(desde)
+                if fragmento:
+                    yield fragmento
+                    continue
+                if await futuro:
+                    yield b": latido\n\n"
+        finally:
+            self.suscriptores -= 1
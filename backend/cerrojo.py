@@ -0,0 +1,193 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class TiempoAgotado(Exception):
+    """No se obtuvo el cerrojo dentro del plazo."""
+
+
+class _Metricas:
+    __slots__ = ("adquisiciones", "esperas", "espera_total", "espera_max", "agotados")
+
+    def __init__(self):
+        self.adquisiciones = 0
+        self.esperas = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.agotados = 0
+
+    def registrar(self, espera: float):
+        self.adquisiciones += 1
+        if espera > 0:
+            self.esperas += 1
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+
+    def resumen(self) -> dict:
+        return {
+            "adquisiciones": self.adquisiciones,
+            "esperas": self.esperas,
+            "espera_total_ms": round(self.espera_total * 1000, 3),
+            "espera_media_ms": round(self.espera_total * 1000 / self.esperas, 3) if self.esperas else 0.0,
+            "espera_max_ms": round(self.espera_max * 1000, 3),
+            "agotados": self.agotados,
+        }
+
+
+class CerrojoLecturaEscritura:
+    """
+    Cerrojo de lectores/escritor para la ontología compartida.
+
+    Muchos lectores en paralelo; un escritor con acceso exclusivo. Es justo en
+    ambos sentidos: si hay un escritor esperando, los lectores nuevos esperan
+    detrás de él (el escritor no muere de hambre), y al salir un escritor
+    entran primero los lectores que ya esperaban (los lectores tampoco).
+    Toda espera está acotada por `plazo` segundos (TiempoAgotado).
+
+    Es reentrante por hilo: un lector que vuelve a leer, o un escritor que
+    lee o escribe de nuevo, no se bloquea a sí mismo.
+    """
+
+    def __init__(self, plazo: float = 30.0):
+        self.plazo = plazo
+        self._cond = threading.Condition(threading.Lock())
+        self._lectores = 0
+        self._lectores_esperando = 0
+        self._escritor = None               # ident del hilo escritor
+        self._escritores_esperando = 0
+        self._pase_lectores = 0             # lectores admitidos antes del próximo escritor
+        self._turno = 0                     # último turno de llegada entregado a un lector
+        self._admitidos_hasta = 0           # turnos que entran antes del próximo escritor
+        self._local = threading.local()
+        self._m_lectura = _Metricas()
+        self._m_escritura = _Metricas()
+
+    def _profundidad(self) -> list:
+        prof = getattr(self._local, "prof", None)
+        if prof is None:
+            prof = self._local.prof = [0, 0]   # [lecturas, escrituras] del hilo
+        return prof
+
+    def _limite(self, plazo):
+        return time.monotonic() + (self.plazo if plazo is None else plazo)
+
+    # --- Lectura ---
+
+    def adquirir_lectura(self, plazo: float = None):
+        prof = self._profundidad()
+        if prof[0] or prof[1]:
+            prof[0] += 1
+            return
+        inicio = time.monotonic()
+        limite = self._limite(plazo)
+        with self._cond:
+            self._lectores_esperando += 1
+            # Solo los lectores que llegaron antes de que saliera el escritor
+            # usan el pase; los que llegan después esperan al próximo escritor
+            self._turno += 1
+            turno = self._turno
+            espero = False
+            try:
+                while self._escritor is not None or (self._escritores_esperando and turno > self._admitidos_hasta):
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._m_lectura.agotados += 1
+                        raise TiempoAgotado("lectura")
+                    espero = True
+                    self._cond.wait(restante)
+            except TiempoAgotado:
+                self._lectores_esperando -= 1
+                if turno <= self._admitidos_hasta and self._pase_lectores:
+                    self._pase_lectores -= 1
+                self._cond.notify_all()
+                raise
+            self._lectores_esperando -= 1
+            if turno <= self._admitidos_hasta and self._pase_lectores:
+                self._pase_lectores -= 1
+            self._lectores += 1
+            self._m_lectura.registrar(time.monotonic() - inicio if espero else 0.0)
+        prof[0] = 1
+
+    def liberar_lectura(self):
+        prof = self._profundidad()
+        prof[0] -= 1
+        if prof[0] or prof[1]:
+            return
+        with self._cond:
+            self._lectores -= 1
+            if self._lectores == 0:
+                self._cond.notify_all()
+
+    # --- Escritura ---
+
+    def adquirir_escritura(self, plazo: float = None):
+        prof = self._profundidad()
+        if prof[1]:
+            prof[1] += 1
+            return
+        if prof[0]:
+            raise RuntimeError("No se puede pasar de lectura a escritura en el mismo hilo")
+        inicio = time.monotonic()
+        limite = self._limite(plazo)
+        ident = threading.get_ident()
+        with self._cond:
+            self._escritores_esperando += 1
+            espero = False
+            try:
+                while self._escritor is not None or self._lectores or self._pase_lectores:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._m_escritura.agotados += 1
+                        raise TiempoAgotado("escritura")
+                    espero = True
+                    self._cond.wait(restante)
+            except TiempoAgotado:
+                self._escritores_esperando -= 1
+                self._cond.notify_all()
+                raise
+            self._escritores_esperando -= 1
+            self._escritor = ident
+            self._m_escritura.registrar(time.monotonic() - inicio if espero else 0.0)
+        prof[1] = 1
+
+    def liberar_escritura(self):
+        prof = self._profundidad()
+        prof[1] -= 1
+        if prof[1]:
+            return
+        with self._cond:
+            self._escritor = None
+            # Turno de los lectores que ya esperaban (los turnos entregados hasta ahora)
+            self._pase_lectores = self._lectores_esperando
+            self._admitidos_hasta = self._turno
+            self._cond.notify_all()
+
+    # --- Context managers ---
+
+    @contextmanager
+    def lectura(self, plazo: float = None):
+        self.adquirir_lectura(plazo)
+        try:
+            yield
+        finally:
+            self.liberar_lectura()
+
+    @contextmanager
+    def escritura(self, plazo: float = None):
+        self.adquirir_escritura(plazo)
+        try:
+            yield
+        finally:
+            self.liberar_escritura()
+
+    def metricas(self) -> dict:
+        with self._cond:
+            return {
+                "lectores_activos": self._lectores,
+                "lectores_esperando": self._lectores_esperando,
+                "escritor_activo": self._escritor is not None,
+                "escritores_esperando": self._escritores_esperando,
+                "lectura": self._m_lectura.resumen(),
+                "escritura": self._m_escritura.resumen(),
+            }
@@ -0,0 +1,199 @@
+import datetime
+import itertools
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from owlready2.util import locstr
+
+
+def normalizar(query: str) -> str:
+    """
+    Normaliza el texto de una consulta SPARQL para usarlo como clave de caché:
+    colapsa los espacios en blanco fuera de literales y elimina los extremos.
+    Los literales entre comillas se copian sin cambios.
+    """
+    partes = []
+    i = 0
+    largo = len(query)
+    espacio = False
+    while i < largo:
+        ch = query[i]
+        if ch in "\"'":
+            # Copiar el literal completo (respetando escapes)
+            j = i + 1
+            while j < largo and query[j] != ch:
+                j += 2 if query[j] == "\\" else 1
+            if espacio and partes:
+                partes.append(" ")
+            espacio = False
+            partes.append(query[i:j + 1])
+            i = j + 1
+            continue
+        if ch.isspace():
+            espacio = True
+        else:
+            if espacio and partes:
+                partes.append(" ")
+            espacio = False
+            partes.append(ch)
+        i += 1
+    return "".join(partes)
+
+
+class ConsultasPreparadas:
+    """
+    LRU acotado de consultas SPARQL ya compiladas con `world.prepare_sparql`,
+    indexado por el texto normalizado de la consulta.
+    """
+
+    def __init__(self, world, max_consultas: int = 256):
+        self.world = world
+        self.max_consultas = max_consultas
+        self._consultas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, texto: str):
+        """Devuelve (consulta_preparada, ms_de_compilación). 0 ms si estaba en caché."""
+        with self._lock:
+            preparada = self._consultas.get(texto)
+            if preparada is not None:
+                self._consultas.move_to_end(texto)
+                return preparada, 0.0
+
+        inicio = time.perf_counter()
+        preparada = self.world.prepare_sparql(texto)
+        ms = (time.perf_counter() - inicio) * 1000
+
+        with self._lock:
+            self._consultas[texto] = preparada
+            self._consultas.move_to_end(texto)
+            while len(self._consultas) > self.max_consultas:
+                self._consultas.popitem(last=False)
+        return preparada, ms
+
+    def vaciar(self):
+        with self._lock:
+            self._consultas.clear()
+
+
+# --- Codificación JSON de filas ---
+
+def codificar_valor(v):
+    """
+    Convierte un valor de una fila SPARQL en JSON compacto: las entidades de
+    owlready2 pasan a {"iri", "nombre"}, los literales conservan su tipo JSON
+    (número, booleano, texto) y los textos con idioma pasan a {"valor", "lang"}.
+    """
+    if v is None or isinstance(v, (bool, int, float)):
+        return v
+    if isinstance(v, locstr):
+        return {"valor": str(v), "lang": v.lang}
+    if isinstance(v, str):
+        return v
+    iri = getattr(v, "iri", None)
+    if iri is not None:
+        return {"iri": iri, "nombre": getattr(v, "name", iri)}
+    if isinstance(v, (datetime.date, datetime.datetime, datetime.time)):
+        return v.isoformat()
+    return str(v)
+
+def codificar_fila(fila):
+    return [codificar_valor(v) for v in fila]
+
+
+# --- Presupuesto de tiempo por consulta ---
+
+class PresupuestoTiempo:
+    """
+    Ejecuta las consultas SELECT en conexiones SQLite propias y corta las que
+    exceden su plazo. Entre filas el plazo se comprueba en Python; si una sola
+    llamada a SQLite (ej: un ORDER BY o un agregado) sigue en curso al vencer,
+    un hilo vigilante llama a `interrupt()` sobre la conexión de esa consulta.
+    Cada conexión atiende una consulta a la vez y el resto de la aplicación
+    usa la de owlready2, así que un corte no afecta a ninguna otra lectura.
+
+    Las conexiones se reparten con una cola y esperar una libre cuenta dentro
+    del plazo. Antes de consultar se confirma la transacción en curso de
+    owlready2 para que la conexión vea las últimas escrituras; la base está en
+    modo WAL, así que confirmar no espera a las lecturas en curso.
+    """
+
+    def __init__(self, conexiones: int = 4):
+        self.conexiones = conexiones
+        self._world = None
+        self._libres = queue.Queue()
+        self._activas = {}          # id de consulta -> (plazo, conexión)
+        self._ids = itertools.count()
+        self._cond = threading.Condition()
+        self._hilo = None
+
+    def instalar(self, world, abrir_conexion):
+        """`abrir_conexion()` devuelve una conexión nueva a la base de `world`."""
+        self._world = world
+        for _ in range(self.conexiones):
+            self._libres.put(abrir_conexion())
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._vigilar, name="sparql-plazos", daemon=True)
+            self._hilo.start()
+
+    def _vigilar(self):
+        with self._cond:
+            while True:
+                if not self._activas:
+                    self._cond.wait()
+                    continue
+                ahora = time.monotonic()
+                vencidas = [i for i, (plazo, _) in self._activas.items() if plazo <= ahora]
+                if vencidas:
+                    for i in vencidas:
+                        self._activas.pop(i)[1].interrupt()
+                    continue
+                self._cond.wait(min(plazo for plazo, _ in self._activas.values()) - ahora)
+
+    @contextmanager
+    def _limitar(self, plazo: float, conexion):
+        if time.monotonic() > plazo:
+            raise sqlite3.OperationalError("interrupted")
+        ident = next(self._ids)
+        with self._cond:
+            self._activas[ident] = (plazo, conexion)
+            self._cond.notify()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._activas.pop(ident, None)
+
+    def ejecutar(self, preparada, parametros, plazo: float):
+        """
+        Genera las filas de la consulta SELECT `preparada`; `plazo` es un
+        instante de time.monotonic(). La conexión se toma al pedir la primera
+        fila (bajo el cerrojo de lectura del llamador) y se devuelve al
+        agotar o cerrar el generador, aunque los pasos se ejecuten en hilos
+        distintos (StreamingResponse).
+        """
+        try:
+            conexion = self._libres.get(timeout=max(plazo - time.monotonic(), 0))
+        except queue.Empty:
+            raise sqlite3.OperationalError("interrupted")
+        crudas = None
+        try:
+            self._world.graph.commit()
+            with self._limitar(plazo, conexion):
+                crudas = preparada.execute_raw_with_db(parametros, conexion)
+            filas = preparada.execute(parametros, execute_raw_result=crudas)
+            while True:
+                with self._limitar(plazo, conexion):
+                    try:
+                        fila = next(filas)
+                    except StopIteration:
+                        return
+                yield fila
+        finally:
+            if isinstance(crudas, sqlite3.Cursor):
+                crudas.close()
+            self._libres.put(conexion)
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+
+from SPARQLWrapper import SPARQLWrapper, JSON
+
+
+class Disyuntor:
+    """
+    Circuit breaker para el endpoint remoto. Tras `umbral` fallos seguidos se
+    abre y rechaza llamadas durante `enfriamiento` segundos; luego deja pasar
+    una sola llamada de prueba (semiabierto) que decide si se cierra de nuevo.
+    """
+
+    def __init__(self, umbral: int = 3, enfriamiento: float = 30.0):
+        self.umbral = umbral
+        self.enfriamiento = enfriamiento
+        self._fallos = 0
+        self._abierto_hasta = 0.0
+        self._probando = False
+        self._lock = threading.Lock()
+
+    def permitir(self) -> bool:
+        with self._lock:
+            if self._fallos < self.umbral:
+                return True
+            if time.monotonic() < self._abierto_hasta or self._probando:
+                return False
+            self._probando = True
+            return True
+
+    def exito(self):
+        with self._lock:
+            self._fallos = 0
+            self._probando = False
+
+    def fallo(self):
+        with self._lock:
+            self._fallos += 1
+            self._probando = False
+            if self._fallos >= self.umbral:
+                self._abierto_hasta = time.monotonic() + self.enfriamiento
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            if self._fallos < self.umbral:
+                return "cerrado"
+            return "abierto" if time.monotonic() < self._abierto_hasta else "semiabierto"
+
+
+def _escapar(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace("'", "\\'").replace('"', '\\"')
+
+
+class ClienteDBpedia:
+    """
+    Búsqueda remota en DBpedia con caché TTL por (q, lang) y circuit breaker.
+    `buscar()` nunca lanza excepciones: devuelve (resultados, estado).
+    """
+
+    def __init__(self, url: str, timeout: float = 10.0, ttl: float = 600.0, max_entradas: int = 1024,
+                 disyuntor: Disyuntor = None):
+        self.url = url
+        self.timeout = timeout
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.disyuntor = disyuntor or Disyuntor()
+        self._cache = OrderedDict()   # (q, lang) -> (expira, resultados)
+        self._lock = threading.Lock()
+
+    def en_cache(self, q: str, lang: str):
+        with self._lock:
+            entrada = self._cache.get((q, lang))
+            if entrada is None:
+                return None
+            if entrada[0] < time.monotonic():
+                del self._cache[(q, lang)]
+                return None
+            self._cache.move_to_end((q, lang))
+            return entrada[1]
+
+    def _guardar(self, q: str, lang: str, resultados):
+        with self._lock:
+            self._cache[(q, lang)] = (time.monotonic() + self.ttl, resultados)
+            self._cache.move_to_end((q, lang))
+            while len(self._cache) > self.max_entradas:
+                self._cache.popitem(last=False)
+
+    def buscar(self, q: str, lang: str):
+        cacheados = self.en_cache(q, lang)
+        if cacheados is not None:
+            return cacheados, "cache"
+        if not self.disyuntor.permitir():
+            return [], "circuito_abierto"
+
+        try:
+            resultados = self._consultar(q, lang)
+        except Exception as e:
+            print(f"Error en DBpedia o sin conexión: {e}")
+            self.disyuntor.fallo()
+            return [], "error"
+
+        self.disyuntor.exito()
+        self._guardar(q, lang, resultados)
+        return resultados, "ok"
+
+    def _consultar(self, q: str, lang: str):
+        sparql = SPARQLWrapper(self.url)
+        q = _escapar(q)
+        lang = _escapar(lang)
+
+        # Consulta SPARQL
+        query = f"""
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        PREFIX dbo: <http://dbpedia.org/ontology/>
+        PREFIX bif: <bif:>
+
+        SELECT DISTINCT ?s ?label ?comment ?type ?img
+        WHERE {{
+          ?s rdfs:label ?label .
+          ?label bif:contains "'{q}'" .
+          ?s a ?type .
+
+          # --- FILTRO DE IDIOMA ---
+          FILTER (lang(?label) = '{lang}')
+
+          OPTIONAL {{
+            ?s rdfs:comment ?comment .
+            FILTER (lang(?comment) = '{lang}')
+          }}
+          OPTIONAL {{ ?s foaf:depiction ?img }}
+
+          FILTER (?type IN (dbo:Person, dbo:Book, dbo:Organisation))
+        }}
+        LIMIT 10
+        """
+
+        sparql.setQuery(query)
+        sparql.setReturnFormat(JSON)
+        sparql.setTimeout(max(1, int(self.timeout)))
+        dbpedia_data = sparql.query().convert()
+
+        resultados = []
+        for r in dbpedia_data["results"]["bindings"]:
+            tipo_raw = r["type"]["value"]
+            tipo_clean = tipo_raw.split('/')[-1]
+
+            resultados.append({
+                "id": r["s"]["value"],
+                "tipo": tipo_clean,
+                "nombre_mostrar": r["label"]["value"],
+                "descripcion": r.get("comment", {}).get("value", "Sin descripción"),
+                "origen": "DBpedia",
+                "imagen": r.get("img", {}).get("value", None)
+            })
+        return resultados
@@ -0,0 +1,111 @@
+import threading
+from collections import Counter
+
+from owlready2 import Thing, ThingClass
+
+# Propiedades de datos con desglose por valor en /estadisticas
+PROPS_DESGLOSE = ["estado_libro", "carrera", "departamento"]
+
+
+class _Resumen:
+    """Lo que un individuo aporta a los contadores."""
+    __slots__ = ("clases", "valores", "prestamos")
+
+    def __init__(self, clases, valores, prestamos):
+        self.clases = clases          # frozenset de nombres de clase (con ancestros)
+        self.valores = valores        # {propiedad: tuple(valores)}
+        self.prestamos = prestamos    # cantidad de toma_prestado
+
+
+class Estadisticas:
+    """
+    Contadores agregados del catálogo mantenidos de forma incremental.
+
+    Se construyen una sola vez al arrancar; después cada escritura llama a
+    `actualizar(ind)`, que compara el aporte anterior del individuo con el
+    actual y ajusta solo la diferencia.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resumenes = {}                  # nombre -> _Resumen
+        self._ancestros = {}                  # clase -> frozenset(nombres)
+        self.clases = Counter()               # instancias por clase (con subclases)
+        self.valores = {p: Counter() for p in PROPS_DESGLOSE}
+        self.prestamos = 0
+        self.usuarios_con_prestamos = 0
+        self._nombres_clases = []
+
+    def construir(self, onto):
+        with self._lock:
+            self._resumenes = {}
+            self._ancestros = {}
+            self.clases = Counter()
+            self.valores = {p: Counter() for p in PROPS_DESGLOSE}
+            self.prestamos = 0
+            self.usuarios_con_prestamos = 0
+            self._nombres_clases = sorted(c.name for c in onto.classes())
+            for ind in onto.individuals():
+                self._actualizar(ind)
+
+    def actualizar(self, ind):
+        with self._lock:
+            self._actualizar(ind)
+
+    def _clases_de(self, ind):
+        nombres = set()
+        for cls in ind.is_a:
+            if not isinstance(cls, ThingClass):
+                continue
+            ancestros = self._ancestros.get(cls)
+            if ancestros is None:
+                ancestros = frozenset(a.name for a in cls.ancestors() if a is not Thing)
+                self._ancestros[cls] = ancestros
+            nombres |= ancestros
+        return frozenset(nombres)
+
+    def _resumir(self, ind):
+        valores = {}
+        for prop in PROPS_DESGLOSE:
+            vals = getattr(ind, prop, None) or []
+            valores[prop] = tuple(str(v) for v in vals)
+        prestamos = len(getattr(ind, "toma_prestado", None) or [])
+        return _Resumen(self._clases_de(ind), valores, prestamos)
+
+    def _actualizar(self, ind):
+        nuevo = self._resumir(ind)
+        anterior = self._resumenes.get(ind.name)
+        self._resumenes[ind.name] = nuevo
+
+        if anterior is None:
+            anterior = _Resumen(frozenset(), {p: () for p in PROPS_DESGLOSE}, 0)
+
+        for cls in anterior.clases - nuevo.clases:
+            self.clases[cls] -= 1
+        for cls in nuevo.clases - anterior.clases:
+            self.clases[cls] += 1
+
+        for prop in PROPS_DESGLOSE:
+            contador = self.valores[prop]
+            for v in anterior.valores[prop]:
+                contador[v] -= 1
+                if contador[v] <= 0:
+                    del contador[v]
+            for v in nuevo.valores[prop]:
+                contador[v] += 1
+
+        self.prestamos += nuevo.prestamos - anterior.prestamos
+        self.usuarios_con_prestamos += (nuevo.prestamos > 0) - (anterior.prestamos > 0)
+
+    def resumen(self):
+        with self._lock:
+            return {
+                "clases": {c: self.clases.get(c, 0) for c in self._nombres_clases},
+                "prestamos": {
+                    "total": self.prestamos,
+                    "usuarios_con_prestamos": self.usuarios_con_prestamos,
+                    "libros_por_estado": dict(self.valores["estado_libro"]),
+                },
+                "por_carrera": dict(self.valores["carrera"]),
+                "por_departamento": dict(self.valores["departamento"]),
+            }
@@ -0,0 +1,162 @@
+import threading
+
+# Propiedades de texto que participan en la búsqueda local (en orden de prioridad)
+PROPS_TEXTO = ["titulo", "nombre", "descripcion", "carrera", "editorial", "autor"]
+
+# Longitud máxima de los n-gramas indexados (trigramas)
+N_GRAMA = 3
+
+
+def _ngramas(texto: str):
+    """Devuelve todos los n-gramas de longitud 1..N_GRAMA contenidos en el texto."""
+    gramas = set()
+    largo = len(texto)
+    for n in range(1, N_GRAMA + 1):
+        for i in range(largo - n + 1):
+            gramas.add(texto[i:i + n])
+    return gramas
+
+
+class _Documento:
+    """Textos de un individuo, ya normalizados a minúsculas."""
+    __slots__ = ("nombre", "nombre_lower", "etiquetas", "propiedades", "gramas")
+
+    def __init__(self, nombre, etiquetas, propiedades):
+        self.nombre = nombre
+        self.nombre_lower = nombre.lower()
+        # [(etiqueta, etiqueta_lower)]
+        self.etiquetas = etiquetas
+        # [(nombre_propiedad, valor, valor_lower)]
+        self.propiedades = propiedades
+
+        self.gramas = _ngramas(self.nombre_lower)
+        for _, lbl_lower in etiquetas:
+            self.gramas |= _ngramas(lbl_lower)
+        for _, _, val_lower in propiedades:
+            self.gramas |= _ngramas(val_lower)
+
+    def coincidencia(self, q: str):
+        """
+        Reproduce el orden de prioridad de la búsqueda original:
+        ID, luego etiqueta, luego propiedades. Devuelve el detalle o None.
+        """
+        if q in self.nombre_lower:
+            return "Coincidencia en ID"
+        for lbl, lbl_lower in self.etiquetas:
+            if q in lbl_lower:
+                return f"Coincidencia en etiqueta: {lbl}"
+        for prop_name, val, val_lower in self.propiedades:
+            if q in val_lower:
+                return f"Coincidencia en {prop_name}: {val}"
+        return None
+
+
+def _extraer_documento(ind):
+    etiquetas = []
+    if hasattr(ind, "label"):
+        etiquetas = [(lbl, lbl.lower()) for lbl in ind.label]
+
+    propiedades = []
+    for prop_name in PROPS_TEXTO:
+        if hasattr(ind, prop_name):
+            for val in getattr(ind, prop_name):
+                if isinstance(val, str):
+                    propiedades.append((prop_name, val, val.lower()))
+
+    return _Documento(ind.name, etiquetas, propiedades)
+
+
+class IndiceBusqueda:
+    """
+    Índice invertido de n-gramas (1 a 3 caracteres) sobre IDs, etiquetas y
+    propiedades de texto de los individuos. Cada individuo recibe un ordinal
+    estable según el orden en que fue indexado, que coincide con el orden de
+    iteración de onto.individuals().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs = []          # ordinal -> _Documento
+        self._ordinales = {}     # nombre -> ordinal
+        self._postings = {}      # n-grama -> set(ordinales)
+
+    def construir(self, individuos):
+        with self._lock:
+            self._docs = []
+            self._ordinales = {}
+            self._postings = {}
+            for ind in individuos:
+                self._indexar(ind)
+
+    def indexar(self, ind):
+        """Agrega o reindexa un individuo (llamar tras cada escritura)."""
+        with self._lock:
+            self._indexar(ind)
+
+    def _indexar(self, ind):
+        doc = _extraer_documento(ind)
+        ordinal = self._ordinales.get(doc.nombre)
+
+        if ordinal is None:
+            ordinal = len(self._docs)
+            self._docs.append(doc)
+            self._ordinales[doc.nombre] = ordinal
+            anteriores = set()
+        else:
+            anteriores = self._docs[ordinal].gramas
+            self._docs[ordinal] = doc
+
+        for g in anteriores - doc.gramas:
+            posting = self._postings.get(g)
+            if posting is not None:
+                posting.discard(ordinal)
+                if not posting:
+                    del self._postings[g]
+        for g in doc.gramas - anteriores:
+            self._postings.setdefault(g, set()).add(ordinal)
+
+    def _candidatos(self, q: str):
+        if not q:
+            return set(range(len(self._docs)))
+        if len(q) <= N_GRAMA:
+            return set(self._postings.get(q, ()))
+
+        trigramas = {q[i:i + N_GRAMA] for i in range(len(q) - N_GRAMA + 1)}
+        postings = []
+        for g in trigramas:
+            posting = self._postings.get(g)
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+
+        resultado = set(postings[0])
+        for posting in postings[1:]:
+            resultado &= posting
+            if not resultado:
+                break
+        return resultado
+
+    def buscar(self, q: str, nombres=None):
+        """
+        Devuelve [(nombre, detalle)] de los individuos que contienen `q`
+        (ya en minúsculas). Sin `nombres`, el orden es el de indexación;
+        con `nombres` (un iterable de IDs) se respeta ese orden y alcance.
+        """
+        with self._lock:
+            candidatos = self._candidatos(q)
+            if nombres is None:
+                docs = [self._docs[o] for o in sorted(candidatos)]
+            else:
+                docs = []
+                for nombre in nombres:
+                    o = self._ordinales.get(nombre)
+                    if o is not None and o in candidatos:
+                        docs.append(self._docs[o])
+
+        resultados = []
+        for doc in docs:
+            detalle = doc.coincidencia(q)
+            if detalle is not None:
+                resultados.append((doc.nombre, detalle))
+        return resultados
@@ -0,0 +1,219 @@
+import threading
+
+from owlready2 import Thing, ThingClass, rdf_type, owl_named_individual
+
+# Facetas por valor exacto (propiedades de datos), además de la faceta "clase"
+FACETAS_VALOR = ["carrera", "departamento", "pais_origen", "estado_libro"]
+FACETA_ANIO = "anio_publicacion"
+ANCHO_RANGO_ANIO = 10          # los conteos de años se agrupan por década
+
+_FACETAS_DATOS = FACETAS_VALOR + [FACETA_ANIO]
+
+
+def _bits(mapa: int, despues_de: int = -1):
+    """Recorre en orden los bits encendidos de `mapa` con posición mayor que `despues_de`."""
+    mapa >>= despues_de + 1
+    posicion = despues_de + 1
+    while mapa:
+        salto = (mapa & -mapa).bit_length() - 1
+        posicion += salto
+        yield posicion
+        mapa >>= salto + 1
+        posicion += 1
+
+
+def _mapa_de(ordinales, total: int) -> int:
+    """Mapa de bits con los `ordinales` encendidos, armado en una sola pasada."""
+    bytes_ = bytearray((total + 7) // 8)
+    for o in ordinales:
+        bytes_[o >> 3] |= 1 << (o & 7)
+    return int.from_bytes(bytes_, "little")
+
+
+def _normalizar(faceta, valores):
+    if faceta == FACETA_ANIO:
+        return tuple(sorted({v for v in valores if isinstance(v, int)}))
+    return tuple(sorted({str(v) for v in valores}))
+
+
+class IndiceFacetas:
+    """
+    Índice de facetas con mapas de bits sobre ordinales de individuos.
+
+    Cada individuo recibe un ordinal (orden de storid) y cada valor de faceta
+    (clase con sus ancestros, carrera, departamento, pais_origen,
+    estado_libro y cada año de anio_publicacion) un mapa de bits representado
+    con un `int` de Python: los filtros se combinan con `|` (valores de una
+    misma faceta) y `&` (entre facetas), y los conteos son
+    `(mapa & resultado).bit_count()`, todo en C.
+
+    Se construye al arrancar directamente desde las tablas del quadstore
+    (cada mapa se arma de una vez a partir de la lista de sus ordinales) y
+    cada escritura llama a `actualizar(ind)`, que enciende o apaga solo los
+    bits de los valores que cambiaron.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._storids = []          # ordinal -> storid
+        self._ordinales = {}        # storid -> ordinal
+        self._valores = {}          # ordinal -> tuple(valores por faceta de datos), solo si hay alguno
+        self._mapas = {}            # faceta -> {valor: int}
+        self._ancestros = {}        # storid de clase -> tuple(nombres)
+        self._todos = 0             # mapa con todos los ordinales
+        self._onto = None
+
+    def construir(self, onto):
+        grafo = onto.world.graph
+        c = onto.graph.c
+        with self._lock:
+            self._onto = onto
+            self._ancestros = {}
+            self._storids = [s for (s,) in grafo.execute(
+                "SELECT s FROM objs WHERE c=? AND p=? AND o=? ORDER BY s", (c, rdf_type, owl_named_individual))]
+            self._ordinales = {s: i for i, s in enumerate(self._storids)}
+            total = len(self._storids)
+            listas = {f: {} for f in ["clase", *_FACETAS_DATOS]}
+
+            for s, clase in grafo.execute("SELECT s, o FROM objs WHERE c=? AND p=? AND o!=?", (c, rdf_type, owl_named_individual)):
+                o = self._ordinales.get(s)
+                if o is not None:
+                    for nombre in self._ancestros_de(clase):
+                        listas["clase"].setdefault(nombre, []).append(o)
+
+            por_ordinal = {}
+            for i, faceta in enumerate(_FACETAS_DATOS):
+                prop = onto[faceta]
+                if prop is None:
+                    continue
+                crudos = {}
+                for s, valor in grafo.execute("SELECT s, o FROM datas WHERE c=? AND p=?", (c, prop.storid)):
+                    o = self._ordinales.get(s)
+                    if o is not None:
+                        crudos.setdefault(o, []).append(valor)
+                for o, valores in crudos.items():
+                    valores = _normalizar(faceta, valores)
+                    if not valores:
+                        continue
+                    por_ordinal.setdefault(o, [()] * len(_FACETAS_DATOS))[i] = valores
+                    for v in valores:
+                        listas[faceta].setdefault(v, []).append(o)
+            self._valores = {o: tuple(v) for o, v in por_ordinal.items()}
+
+            self._todos = (1 << total) - 1
+            self._mapas = {
+                faceta: {v: _mapa_de(ordinales, total) for v, ordinales in por_valor.items()}
+                for faceta, por_valor in listas.items()
+            }
+
+    def _ancestros_de(self, clase_storid):
+        ancestros = self._ancestros.get(clase_storid)
+        if ancestros is None:
+            cls = self._onto.world._get_by_storid(clase_storid)
+            ancestros = ()
+            if isinstance(cls, ThingClass):
+                ancestros = tuple(a.name for a in cls.ancestors() if a is not Thing)
+            self._ancestros[clase_storid] = ancestros
+        return ancestros
+
+    def actualizar(self, ind):
+        with self._lock:
+            ordinal = self._ordinales.get(ind.storid)
+            if ordinal is None:
+                # Individuo nuevo: su clase no cambia después de creado
+                ordinal = len(self._storids)
+                self._storids.append(ind.storid)
+                self._ordinales[ind.storid] = ordinal
+                self._todos |= 1 << ordinal
+                clases = set()
+                for cls in ind.is_a:
+                    if isinstance(cls, ThingClass):
+                        clases.update(self._ancestros_de(cls.storid))
+                self._cambiar("clase", ordinal, (), clases)
+
+            vacios = ((),) * len(_FACETAS_DATOS)
+            anteriores = self._valores.get(ordinal, vacios)
+            nuevos = tuple(_normalizar(f, getattr(ind, f, None) or []) for f in _FACETAS_DATOS)
+            if nuevos == anteriores:
+                return
+            if nuevos == vacios:
+                del self._valores[ordinal]
+            else:
+                self._valores[ordinal] = nuevos
+            for faceta, antes, ahora in zip(_FACETAS_DATOS, anteriores, nuevos):
+                self._cambiar(faceta, ordinal, antes, ahora)
+
+    def _cambiar(self, faceta, ordinal, anteriores, nuevos):
+        mapas = self._mapas[faceta]
+        bit = 1 << ordinal
+        for v in set(anteriores) - set(nuevos):
+            mapa = mapas[v] & ~bit
+            if mapa:
+                mapas[v] = mapa
+            else:
+                del mapas[v]
+        for v in set(nuevos) - set(anteriores):
+            mapas[v] = mapas.get(v, 0) | bit
+
+    # --- Consultas ---
+
+    def filtrar(self, filtros: dict, anio_desde: int = None, anio_hasta: int = None, storids=None) -> int:
+        """
+        Mapa de los individuos que cumplen todos los filtros: {faceta: [valores]}
+        (un valor cualquiera de la lista basta), el rango de años (inclusive)
+        y, si se da, el alcance `storids` (ej: resultados de texto).
+        """
+        with self._lock:
+            resultado = self._todos
+            if storids is not None:
+                ordinales = (self._ordinales.get(s) for s in storids)
+                resultado &= _mapa_de((o for o in ordinales if o is not None), len(self._storids))
+
+            for faceta, valores in filtros.items():
+                mapas = self._mapas[faceta]
+                union = 0
+                for v in valores:
+                    union |= mapas.get(v, 0)
+                resultado &= union
+                if not resultado:
+                    return 0
+
+            if anio_desde is not None or anio_hasta is not None:
+                union = 0
+                for anio, mapa in self._mapas[FACETA_ANIO].items():
+                    if (anio_desde is None or anio >= anio_desde) and (anio_hasta is None or anio <= anio_hasta):
+                        union |= mapa
+                resultado &= union
+            return resultado
+
+    def conteos(self, resultado: int) -> dict:
+        """Cantidad de individuos de `resultado` por valor de cada faceta (sin ceros)."""
+        with self._lock:
+            conteos = {}
+            for faceta, mapas in self._mapas.items():
+                if faceta == FACETA_ANIO:
+                    # Un individuo con dos años de la misma década cuenta una
+                    # sola vez: se unen los mapas de la década antes de contar
+                    decadas = {}
+                    for anio, mapa in mapas.items():
+                        inicio = anio - anio % ANCHO_RANGO_ANIO
+                        rango = f"{inicio}-{inicio + ANCHO_RANGO_ANIO - 1}"
+                        decadas[rango] = decadas.get(rango, 0) | mapa
+                    mapas = decadas
+                por_valor = {}
+                for valor, mapa in mapas.items():
+                    n = (mapa & resultado).bit_count()
+                    if n:
+                        por_valor[valor] = n
+                conteos[faceta] = dict(sorted(por_valor.items(), key=lambda x: (-x[1], x[0])))
+            return conteos
+
+    def pagina(self, resultado: int, despues_de: int = -1, limite: int = 50):
+        """Hasta `limite` (ordinal, storid) de `resultado` posteriores al ordinal `despues_de`, y si hay más."""
+        with self._lock:
+            pagina = []
+            for o in _bits(resultado, despues_de):
+                if len(pagina) == limite:
+                    return pagina, True
+                pagina.append((o, self._storids[o]))
+            return pagina, False
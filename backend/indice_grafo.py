@@ -0,0 +1,121 @@
+import threading
+
+# Bits reservados para la propiedad en cada arista empaquetada: (vecino << 8) | propiedad
+_BITS_PROPIEDAD = 8
+_MASCARA_PROPIEDAD = (1 << _BITS_PROPIEDAD) - 1
+
+
+class IndiceAdyacencia:
+    """
+    Índice de adyacencia en memoria sobre las propiedades de objeto de la
+    ontología (escribe, publica, toma_prestado, gestiona, trabaja_en...).
+
+    Para cada individuo guarda sus aristas salientes y entrantes. Los nodos se
+    identifican por su storid del quadstore y cada arista se empaqueta en un
+    único entero (vecino + índice de la propiedad), así que el índice ocupa
+    poco más que dos listas de enteros por individuo con relaciones.
+
+    Se construye al arrancar con una sola consulta sobre la tabla `objs` y
+    después cada escritura de relaciones llama a `actualizar(ind)`, que relee
+    las aristas salientes del individuo y ajusta solo la diferencia.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._propiedades = []        # índice -> nombre de la propiedad
+        self._indices = {}            # storid de la propiedad -> índice
+        self._salientes = {}          # storid -> [arista]
+        self._entrantes = {}          # storid -> [arista]
+        self._onto = None
+
+    def construir(self, onto):
+        propiedades = sorted(onto.object_properties(), key=lambda p: p.name)
+        if len(propiedades) > _MASCARA_PROPIEDAD + 1:
+            raise ValueError("Demasiadas propiedades de objeto para el índice de adyacencia")
+        with self._lock:
+            self._onto = onto
+            self._propiedades = [p.name for p in propiedades]
+            self._indices = {p.storid: i for i, p in enumerate(propiedades)}
+            self._salientes = {}
+            self._entrantes = {}
+            if not self._indices:
+                return
+            marcas = ",".join("?" * len(self._indices))
+            filas = onto.world.graph.execute(
+                f"SELECT s, p, o FROM objs WHERE c=? AND p IN ({marcas})", (onto.graph.c, *self._indices)
+            )
+            for s, p, o in filas:
+                i = self._indices[p]
+                self._salientes.setdefault(s, []).append((o << _BITS_PROPIEDAD) | i)
+                self._entrantes.setdefault(o, []).append((s << _BITS_PROPIEDAD) | i)
+
+    def actualizar(self, ind):
+        """Sincroniza las aristas salientes de `ind` con el quadstore."""
+        with self._lock:
+            s = ind.storid
+            filas = self._onto.world.graph.execute("SELECT p, o FROM objs WHERE c=? AND s=?", (self._onto.graph.c, s))
+            nuevas = {(o << _BITS_PROPIEDAD) | self._indices[p] for p, o in filas if p in self._indices}
+            anteriores = set(self._salientes.get(s, ()))
+            if nuevas == anteriores:
+                return
+
+            for arista in anteriores - nuevas:
+                o, i = arista >> _BITS_PROPIEDAD, arista & _MASCARA_PROPIEDAD
+                entrantes = self._entrantes[o]
+                entrantes.remove((s << _BITS_PROPIEDAD) | i)
+                if not entrantes:
+                    del self._entrantes[o]
+            for arista in nuevas - anteriores:
+                o, i = arista >> _BITS_PROPIEDAD, arista & _MASCARA_PROPIEDAD
+                self._entrantes.setdefault(o, []).append((s << _BITS_PROPIEDAD) | i)
+
+            if nuevas:
+                # Conserva el orden de inserción de las aristas que siguen
+                self._salientes[s] = [a for a in self._salientes.get(s, ()) if a in nuevas] + \
+                    [a for a in nuevas if a not in anteriores]
+            else:
+                self._salientes.pop(s, None)
+
+    def propiedades(self):
+        return list(self._propiedades)
+
+    def vecindario(self, raiz: int, profundidad: int, propiedades=None, max_nodos: int = 1000):
+        """
+        Recorrido en anchura desde `raiz` hasta `profundidad` saltos, siguiendo
+        las aristas en ambos sentidos. `propiedades` restringe los nombres de
+        propiedad a seguir (None = todas).
+
+        Devuelve (distancias, aristas, truncado): {storid: saltos},
+        [(origen, propiedad, destino)] entre nodos visitados, y si se dejaron
+        nodos fuera por `max_nodos`.
+        """
+        with self._lock:
+            permitidas = None
+            if propiedades is not None:
+                permitidas = {self._propiedades.index(p) for p in propiedades}
+
+            distancias = {raiz: 0}
+            aristas = set()
+            truncado = False
+            frontera = [raiz]
+            for distancia in range(1, profundidad + 1):
+                siguiente = []
+                for nodo in frontera:
+                    for sentido, lista in ((1, self._salientes.get(nodo, ())), (-1, self._entrantes.get(nodo, ()))):
+                        for arista in lista:
+                            vecino, i = arista >> _BITS_PROPIEDAD, arista & _MASCARA_PROPIEDAD
+                            if permitidas is not None and i not in permitidas:
+                                continue
+                            if vecino not in distancias:
+                                if len(distancias) >= max_nodos:
+                                    truncado = True
+                                    continue
+                                distancias[vecino] = distancia
+                                siguiente.append(vecino)
+                            aristas.add((nodo, i, vecino) if sentido == 1 else (vecino, i, nodo))
+                frontera = siguiente
+                if not frontera:
+                    break
+
+            nombres = self._propiedades
+            return distancias, sorted((s, nombres[i], o) for s, i, o in aristas), truncado
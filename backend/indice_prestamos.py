@@ -0,0 +1,135 @@
+import bisect
+import threading
+
+# Cada préstamo se empaqueta en un entero: (usuario << 32) | libro
+_BITS_LIBRO = 32
+_MASCARA_LIBRO = (1 << _BITS_LIBRO) - 1
+
+
+def _pagina(ordenada, despues_de: int, limite: int):
+    """
+    Hasta `limite` elementos de una lista ordenada mayores que `despues_de`,
+    si hay más y el total de la lista.
+    """
+    inicio = bisect.bisect_right(ordenada, despues_de)
+    pagina = ordenada[inicio:inicio + limite + 1]
+    return pagina[:limite], len(pagina) > limite, len(ordenada)
+
+
+def _quitar(ordenada, valor):
+    i = bisect.bisect_left(ordenada, valor)
+    if i < len(ordenada) and ordenada[i] == valor:
+        del ordenada[i]
+
+
+class IndicePrestamos:
+    """
+    Índice de circulación: libro -> prestatarios, usuario -> libros,
+    estado_libro -> libros y la lista global de préstamos.
+
+    Todo se guarda como listas ordenadas de storids, así que cada consulta es
+    una búsqueda binaria más una página: el costo no depende del tamaño del
+    catálogo. Se construye al arrancar con dos consultas al quadstore y
+    después cada escritura llama a `actualizar(ind)`, que compara los
+    préstamos y el estado del individuo con los anteriores y ajusta solo la
+    diferencia.
+    """
+
+    def __init__(self, prop_prestamo: str = "toma_prestado", prop_estado: str = "estado_libro"):
+        self.prop_prestamo = prop_prestamo
+        self.prop_estado = prop_estado
+        self._lock = threading.Lock()
+        self._prestamos = []          # préstamos empaquetados, ordenados
+        self._libros_de = {}          # usuario -> [libro] ordenados
+        self._prestatarios = {}       # libro -> [usuario] ordenados
+        self._por_estado = {}         # estado -> [libro] ordenados
+        self._estados_de = {}         # libro -> tuple(estados)
+
+    def construir(self, onto):
+        with self._lock:
+            self._prestamos = []
+            self._libros_de = {}
+            self._prestatarios = {}
+            self._por_estado = {}
+            self._estados_de = {}
+
+            prop = onto[self.prop_prestamo]
+            if prop is not None:
+                filas = onto.world.graph.execute(
+                    "SELECT s, o FROM objs WHERE c=? AND p=? ORDER BY s, o", (onto.graph.c, prop.storid))
+                for u, l in filas:
+                    self._prestamos.append((u << _BITS_LIBRO) | l)
+                    self._libros_de.setdefault(u, []).append(l)
+                    self._prestatarios.setdefault(l, []).append(u)
+                for usuarios in self._prestatarios.values():
+                    usuarios.sort()
+
+            prop = onto[self.prop_estado]
+            if prop is not None:
+                filas = onto.world.graph.execute(
+                    "SELECT s, o FROM datas WHERE c=? AND p=? ORDER BY s", (onto.graph.c, prop.storid))
+                for l, estado in filas:
+                    estado = str(estado)
+                    self._estados_de[l] = self._estados_de.get(l, ()) + (estado,)
+                    libros = self._por_estado.setdefault(estado, [])
+                    if not libros or libros[-1] != l:
+                        libros.append(l)
+
+    def actualizar(self, ind):
+        with self._lock:
+            s = ind.storid
+            nuevos = sorted({v.storid for v in getattr(ind, self.prop_prestamo, None) or []})
+            anteriores = self._libros_de.get(s, [])
+            if nuevos != anteriores:
+                for l in set(anteriores) - set(nuevos):
+                    _quitar(self._prestamos, (s << _BITS_LIBRO) | l)
+                    usuarios = self._prestatarios[l]
+                    _quitar(usuarios, s)
+                    if not usuarios:
+                        del self._prestatarios[l]
+                for l in set(nuevos) - set(anteriores):
+                    bisect.insort(self._prestamos, (s << _BITS_LIBRO) | l)
+                    bisect.insort(self._prestatarios.setdefault(l, []), s)
+                if nuevos:
+                    self._libros_de[s] = nuevos
+                else:
+                    self._libros_de.pop(s, None)
+
+            estados = tuple(str(v) for v in getattr(ind, self.prop_estado, None) or [])
+            anteriores = self._estados_de.get(s, ())
+            if estados != anteriores:
+                for estado in set(anteriores) - set(estados):
+                    libros = self._por_estado[estado]
+                    _quitar(libros, s)
+                    if not libros:
+                        del self._por_estado[estado]
+                for estado in set(estados) - set(anteriores):
+                    bisect.insort(self._por_estado.setdefault(estado, []), s)
+                if estados:
+                    self._estados_de[s] = estados
+                else:
+                    self._estados_de.pop(s, None)
+
+    # --- Consultas (storids) ---
+
+    def prestamos(self, despues_de: int = 0, limite: int = 50, libro: int = None):
+        """Página de préstamos (usuario, libro), opcionalmente de un solo libro."""
+        with self._lock:
+            if libro is None:
+                pagina, hay_mas, total = _pagina(self._prestamos, despues_de, limite)
+                return [(p >> _BITS_LIBRO, p & _MASCARA_LIBRO) for p in pagina], hay_mas, total
+            usuarios, hay_mas, total = _pagina(self._prestatarios.get(libro, []), despues_de, limite)
+            return [(u, libro) for u in usuarios], hay_mas, total
+
+    def libros_de(self, usuario: int, despues_de: int = 0, limite: int = 50):
+        with self._lock:
+            return _pagina(self._libros_de.get(usuario, []), despues_de, limite)
+
+    def libros_en_estado(self, estado: str, despues_de: int = 0, limite: int = 50):
+        with self._lock:
+            return _pagina(self._por_estado.get(estado, []), despues_de, limite)
+
+    @staticmethod
+    def cursor_prestamo(usuario: int, libro: int, por_libro: bool) -> int:
+        """Valor de `despues_de` que continúa después del préstamo dado."""
+        return usuario if por_libro else (usuario << _BITS_LIBRO) | libro
@@ -0,0 +1,264 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+import unicodedata
+
+from owlready2 import label, rdf_type, owl_named_individual
+
+from indice_busqueda import PROPS_TEXTO
+
+# Parámetros de BM25
+K1 = 1.2
+B = 0.75
+
+# Peso de cada campo al sumar las frecuencias (BM25F); los demás pesan 1
+PESOS_CAMPO = {"id": 1.5, "etiqueta": 2.0, "titulo": 2.0, "nombre": 2.0}
+
+_TOKEN = re.compile(r"[^\W_]+")
+# Cortes dentro de los IDs: "MarioVargasLlosa2856" -> "Mario Vargas Llosa 2856"
+_CORTES_ID = re.compile(r"(?<=[a-z])(?=[A-Z])|(?<=[^\W\d_])(?=\d)|(?<=\d)(?=[^\W\d_])")
+
+
+def plegar(texto: str) -> str:
+    """
+    Minúsculas y sin diacríticos ("Organización" -> "organizacion",
+    "Ñawpa" -> "nawpa"). Solo se usa para comparar: el texto original se
+    conserva para mostrarlo.
+    """
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+
+
+def tokenizar(texto: str, es_id: bool = False):
+    if es_id:
+        texto = _CORTES_ID.sub(" ", texto)
+    return _TOKEN.findall(plegar(texto))
+
+
+class IndiceRelevancia:
+    """
+    Búsqueda por relevancia (BM25F) sobre el ID, las etiquetas en todos los
+    idiomas y las propiedades de texto de los individuos.
+
+    Cada término guarda el impacto normalizado de BM25 en cada documento
+    (la parte que no depende de la consulta). Al buscar se recorren las
+    listas de los términos de la consulta en orden de impacto decreciente
+    (algoritmo de umbral de Fagin) y se corta en cuanto el k-ésimo mejor
+    puntaje del montículo supera la cota de lo que falta por ver, así que el
+    costo depende de `k` y no de cuántos documentos coinciden.
+
+    Se construye desde las tablas del quadstore; cada escritura llama a
+    `actualizar(ind)`, que mantiene con bisect las listas ya ordenadas (cada
+    una se ordena la primera vez que se consulta) y los totales de longitud
+    por campo. El impacto de un documento se calcula con las longitudes
+    medias del momento en que se indexa; `construir` los recalcula todos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._onto = None
+        self._props = {}          # storid de la propiedad -> nombre del campo
+        self._ordinales = {}      # storid -> ordinal
+        self._storids = []        # ordinal -> storid
+        self._terminos = []       # ordinal -> tuple(términos)
+        self._impactos = {}       # término -> {ordinal: impacto}
+        self._listas = {}         # término -> [ordinal] por impacto decreciente (y ordinal), al consultarlo
+        self._largos = []         # ordinal -> ((campo, términos), ...)
+        self._totales = {}        # campo -> términos en todos los documentos
+        self._n_docs = 0
+
+    # --- Construcción ---
+
+    def _campos_de(self, filas, nombre: str):
+        """{campo: [términos]} a partir de las filas (p, o) de datas de un individuo."""
+        campos = {"id": tokenizar(nombre, es_id=True)}
+        for p, o in filas:
+            campo = self._props.get(p)
+            if campo is not None and isinstance(o, str):
+                campos.setdefault(campo, []).extend(tokenizar(o))
+        return campos
+
+    def _nombre(self, iri: str) -> str:
+        base = self._onto.base_iri
+        return iri[len(base):] if iri.startswith(base) else iri.rsplit("#", 1)[-1].rsplit("/", 1)[-1]
+
+    def construir(self, onto):
+        grafo = onto.world.graph
+        c = onto.graph.c
+        with self._lock:
+            self._onto = onto
+            self._props = {label.storid: "etiqueta"}
+            for nombre in PROPS_TEXTO:
+                prop = onto[nombre]
+                if prop is not None:
+                    self._props[prop.storid] = nombre
+
+            filas = grafo.execute(
+                "SELECT q.s, r.iri FROM objs q JOIN resources r ON r.storid=q.s "
+                "WHERE q.c=? AND q.p=? AND q.o=? ORDER BY q.s", (c, rdf_type, owl_named_individual))
+            nombres = dict(filas)
+            datos = {s: [] for s in nombres}
+            marcas = ",".join("?" * len(self._props))
+            for s, p, o in grafo.execute(
+                    f"SELECT s, p, o FROM datas WHERE c=? AND p IN ({marcas})", (c, *self._props)):
+                filas_s = datos.get(s)
+                if filas_s is not None:
+                    filas_s.append((p, o))
+
+            self._storids = list(nombres)
+            self._ordinales = {s: i for i, s in enumerate(self._storids)}
+            campos = [self._campos_de(datos[s], self._nombre(nombres[s])) for s in self._storids]
+            self._n_docs = len(campos)
+
+            self._totales = {}
+            self._largos = []
+            for doc in campos:
+                self._largos.append(self._sumar_largos(doc))
+
+            self._impactos = {}
+            self._listas = {}
+            self._terminos = []
+            for ordinal, doc in enumerate(campos):
+                self._terminos.append(self._agregar(ordinal, doc))
+
+    def _sumar_largos(self, campos: dict):
+        largos = tuple((campo, len(terminos)) for campo, terminos in campos.items())
+        for campo, n in largos:
+            self._totales[campo] = self._totales.get(campo, 0) + n
+        return largos
+
+    def _restar_largos(self, largos):
+        for campo, n in largos:
+            self._totales[campo] -= n
+
+    def _impactos_de(self, campos: dict) -> dict:
+        """{término: impacto} del documento, con las longitudes medias actuales."""
+        frecuencias = {}
+        for campo, terminos in campos.items():
+            if not terminos:
+                continue
+            media = self._totales.get(campo, 0) / max(self._n_docs, 1) or len(terminos)
+            norma = PESOS_CAMPO.get(campo, 1.0) / (1 - B + B * len(terminos) / media)
+            for t in terminos:
+                frecuencias[t] = frecuencias.get(t, 0.0) + norma
+        return {t: tf / (K1 + tf) for t, tf in frecuencias.items()}
+
+    def _clave(self, termino: str):
+        """Orden de la lista de `termino`: impacto decreciente y, a igual impacto, ordinal."""
+        impactos = self._impactos[termino]
+        return lambda ordinal: (-impactos[ordinal], ordinal)
+
+    def _agregar(self, ordinal: int, campos: dict):
+        """Suma el documento a los impactos (y a las listas ya ordenadas) y devuelve sus términos."""
+        impactos = self._impactos_de(campos)
+        for t, impacto in impactos.items():
+            self._impactos.setdefault(t, {})[ordinal] = impacto
+            lista = self._listas.get(t)
+            if lista is not None:
+                bisect.insort(lista, ordinal, key=self._clave(t))
+        return tuple(impactos)
+
+    def _quitar(self, ordinal: int):
+        for t in self._terminos[ordinal]:
+            impactos = self._impactos[t]
+            lista = self._listas.get(t)
+            if lista is not None:
+                # Se busca antes de borrar el impacto: la clave lo necesita
+                del lista[bisect.bisect_left(lista, (-impactos[ordinal], ordinal), key=self._clave(t))]
+            del impactos[ordinal]
+            if not impactos:
+                del self._impactos[t]
+                self._listas.pop(t, None)
+
+    def actualizar(self, ind):
+        """Reindexa `ind` leyendo sus textos del quadstore."""
+        with self._lock:
+            filas = self._onto.world.graph.execute(
+                "SELECT p, o FROM datas WHERE c=? AND s=?", (self._onto.graph.c, ind.storid))
+            campos = self._campos_de(filas, ind.name)
+            ordinal = self._ordinales.get(ind.storid)
+            if ordinal is None:
+                ordinal = len(self._storids)
+                self._storids.append(ind.storid)
+                self._ordinales[ind.storid] = ordinal
+                self._terminos.append(())
+                self._largos.append(())
+                self._n_docs += 1
+            else:
+                self._quitar(ordinal)
+                self._restar_largos(self._largos[ordinal])
+            self._largos[ordinal] = self._sumar_largos(campos)
+            self._terminos[ordinal] = self._agregar(ordinal, campos)
+
+    # --- Consultas ---
+
+    def _lista(self, termino: str):
+        lista = self._listas.get(termino)
+        if lista is None:
+            # Mismo orden que _clave con dos ordenamientos estables, más
+            # rápidos que comparar tuplas
+            impactos = self._impactos[termino]
+            lista = self._listas[termino] = sorted(sorted(impactos), key=impactos.__getitem__, reverse=True)
+        return lista
+
+    def buscar(self, q: str, k: int = 20, admitir=None):
+        """
+        Los `k` individuos más relevantes para `q` como [(storid, puntaje)],
+        de mayor a menor. `admitir(storid)` puede descartar candidatos (ej:
+        filtro por clase) sin perder el corte anticipado.
+        """
+        with self._lock:
+            terminos = []
+            for t in dict.fromkeys(tokenizar(q)):
+                impactos = self._impactos.get(t)
+                if impactos:
+                    idf = math.log(1 + (self._n_docs - len(impactos) + 0.5) / (len(impactos) + 0.5))
+                    terminos.append((idf, impactos, self._lista(t)))
+            if not terminos or k <= 0:
+                return []
+
+            mejores = []          # montículo de mínimos: (puntaje, -ordinal)
+            vistos = set()
+            posicion = 0
+            while True:
+                umbral = 0.0
+                quedan = False
+                for idf, impactos, lista in terminos:
+                    if posicion >= len(lista):
+                        continue
+                    quedan = True
+                    ordinal = lista[posicion]
+                    umbral += idf * impactos[ordinal]
+                    if ordinal in vistos:
+                        continue
+                    vistos.add(ordinal)
+                    if admitir is not None and not admitir(self._storids[ordinal]):
+                        continue
+                    puntaje = sum(i * imp.get(ordinal, 0.0) for i, imp, _ in terminos)
+                    entrada = (puntaje, -ordinal)
+                    if len(mejores) < k:
+                        heapq.heappush(mejores, entrada)
+                    elif entrada > mejores[0]:
+                        heapq.heapreplace(mejores, entrada)
+                if not quedan or (len(mejores) == k and mejores[0][0] >= umbral):
+                    break
+                posicion += 1
+
+            return [(self._storids[-o], p) for p, o in sorted(mejores, reverse=True)]
+
+    def detalle(self, ind, q: str):
+        """Primer campo de `ind` que contiene algún término de `q` (ID, etiquetas, propiedades)."""
+        buscados = set(tokenizar(q))
+        if buscados & set(tokenizar(ind.name, es_id=True)):
+            return "Coincidencia en ID"
+        for lbl in ind.label:
+            if buscados & set(tokenizar(lbl)):
+                lang = getattr(lbl, "lang", "")
+                return f"Coincidencia en etiqueta ({lang}): {lbl}" if lang else f"Coincidencia en etiqueta: {lbl}"
+        for prop_name in PROPS_TEXTO:
+            for val in getattr(ind, prop_name, None) or []:
+                if isinstance(val, str) and buscados & set(tokenizar(val)):
+                    return f"Coincidencia en {prop_name}: {val}"
+        return None
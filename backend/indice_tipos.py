@@ -0,0 +1,97 @@
+import bisect
+import threading
+
+from owlready2 import Thing, ThingClass, rdf_type, owl_named_individual
+
+
+class IndiceTipos:
+    """
+    Índice de tipos: clausura transitiva de superclases del T-Box y, para cada
+    clase, la lista ordenada (por storid) de sus instancias directas y
+    heredadas.
+
+    Reemplaza a `clase.instances()` y a los rangos por subclase sobre el
+    quadstore en las lecturas por clase (ej: Usuario -> Estudiante, Docente):
+    contar es `len` y paginar es una búsqueda binaria. Se construye al
+    arrancar con una sola consulta a `objs`; `agregar(ind)` lo mantiene al
+    crear individuos y las modificaciones SPARQL (que pueden tocar el T-Box)
+    lo reconstruyen.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._onto = None
+        self._ancestros = {}        # storid de clase -> tuple(storids de ancestros, incluida ella)
+        self._instancias = {}       # storid de clase -> [storid] ordenados
+
+    def construir(self, onto):
+        grafo = onto.world.graph
+        c = onto.graph.c
+        with self._lock:
+            self._onto = onto
+            self._ancestros = {}
+            for cls in onto.classes():
+                self._clausura(cls)
+
+            self._instancias = {}
+            filas = grafo.execute(
+                "SELECT t.s, t.o FROM objs t JOIN objs i ON i.c=t.c AND i.s=t.s AND i.p=t.p "
+                "WHERE t.c=? AND t.p=? AND i.o=? AND t.o!=i.o ORDER BY t.s",
+                (c, rdf_type, owl_named_individual))
+            for s, clase in filas:
+                for a in self._ancestros_de(clase):
+                    lista = self._instancias.setdefault(a, [])
+                    if not lista or lista[-1] != s:
+                        lista.append(s)
+
+    def _clausura(self, cls):
+        ancestros = tuple(a.storid for a in cls.ancestors() if a is not Thing)
+        self._ancestros[cls.storid] = ancestros
+        return ancestros
+
+    def _ancestros_de(self, clase_storid):
+        ancestros = self._ancestros.get(clase_storid)
+        if ancestros is None:
+            cls = self._onto.world._get_by_storid(clase_storid)
+            ancestros = self._clausura(cls) if isinstance(cls, ThingClass) else ()
+            self._ancestros[clase_storid] = ancestros
+        return ancestros
+
+    def agregar(self, ind):
+        """Registra un individuo recién creado en su clase y sus superclases."""
+        with self._lock:
+            for cls in ind.is_a:
+                if not isinstance(cls, ThingClass):
+                    continue
+                for a in self._ancestros_de(cls.storid):
+                    lista = self._instancias.setdefault(a, [])
+                    i = bisect.bisect_left(lista, ind.storid)
+                    if i == len(lista) or lista[i] != ind.storid:
+                        lista.insert(i, ind.storid)
+
+    # --- Consultas ---
+
+    def cantidad(self, clase) -> int:
+        return len(self._instancias.get(clase.storid, ()))
+
+    def contiene(self, clase, storid: int) -> bool:
+        with self._lock:
+            lista = self._instancias.get(clase.storid, ())
+            i = bisect.bisect_left(lista, storid)
+            return i < len(lista) and lista[i] == storid
+
+    def pagina(self, clase, limite: int, despues_de: int = 0):
+        """Hasta `limite` storids de instancias de `clase` mayores que `despues_de`, en orden."""
+        with self._lock:
+            lista = self._instancias.get(clase.storid, ())
+            inicio = bisect.bisect_right(lista, despues_de)
+            return lista[inicio:inicio + limite]
+
+    def iterar(self, clase, despues_de: int = 0, lote: int = 1000):
+        """Recorre los storids de las instancias de `clase` de a `lote` por vez."""
+        while True:
+            storids = self.pagina(clase, lote, despues_de)
+            yield from storids
+            if len(storids) < lote:
+                return
+            despues_de = storids[-1]
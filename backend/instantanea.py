@@ -0,0 +1,380 @@
+"""
+Exportación N-Triples e instantáneas binarias de la ontología.
+
+Ambas leen las tripletas directamente de las tablas del quadstore de
+owlready2 (objs, datas y resources), sin construir el documento completo:
+
+- `ntriples(onto)` genera el volcado N-Triples por páginas de filas.
+- `escribir(onto, ruta)` guarda una instantánea binaria: una tabla de IRIs
+  (cada IRI se escribe una sola vez) y las tripletas como columnas de
+  enteros, en secciones con prefijo de longitud comprimidas con zlib.
+  `cargar(ruta, iri_base)` la inserta en el quadstore con executemany, mucho
+  más rápido que parsear RDF/XML.
+
+Uso por línea de comandos (desde /backend):
+    python instantanea.py crear [--owl biblioteca.owl] [--instantanea biblioteca.instantanea]
+    python instantanea.py owl [--instantanea biblioteca.instantanea] [--owl biblioteca.owl]
+    python instantanea.py verificar [--owl biblioteca.owl]
+"""
+import argparse
+import io
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from collections import Counter
+
+from owlready2 import World, default_world, get_ontology
+
+INSTANTANEA_FILE = "biblioteca.instantanea"
+
+_MAGIA = b"BIBINST1"
+_LONGITUD = struct.Struct("<Q")
+
+# Tipos de los valores de `datas`: owlready2 solo guarda texto, enteros de
+# 64 bits y reales en esa columna
+_TEXTO, _ENTERO, _REAL = 0, 1, 2
+
+_XSD_STRING = "http://www.w3.org/2001/XMLSchema#string"
+
+
+# --- N-Triples ---
+
+_ESCAPES_IRI = {c: f"\\u{c:04X}" for c in list(range(0x21)) + [ord(x) for x in '<>"{}|^`\\']}
+_ESCAPES_LITERAL = {ord("\\"): "\\\\", ord('"'): '\\"', ord("\n"): "\\n", ord("\r"): "\\r"}
+
+
+def _iri(iri: str, storid: int) -> str:
+    if iri is None:
+        return f"_:b{-storid}"     # nodo en blanco (storid negativo)
+    return f"<{iri.translate(_ESCAPES_IRI)}>"
+
+
+def _literal(o, d, iri_tipo) -> str:
+    texto = f'"{str(o).translate(_ESCAPES_LITERAL)}"'
+    if isinstance(d, str) and d.startswith("@"):
+        return texto + d
+    if iri_tipo and iri_tipo != _XSD_STRING:
+        return f"{texto}^^<{iri_tipo}>"
+    return texto
+
+
+def ntriples(onto, lote: int = 5000):
+    """
+    Genera el contenido N-Triples del grafo de `onto`, una página de `lote`
+    filas por fragmento (cada página es una consulta independiente por rowid,
+    así que el llamador puede soltar los cerrojos entre fragmentos).
+    """
+    grafo = onto.world.graph
+    c = onto.graph.c
+
+    ultima = 0
+    while True:
+        filas = grafo.execute(
+            "SELECT q.rowid, q.s, rs.iri, rp.iri, q.o, ro.iri FROM objs q "
+            "LEFT JOIN resources rs ON rs.storid=q.s JOIN resources rp ON rp.storid=q.p "
+            "LEFT JOIN resources ro ON ro.storid=q.o "
+            "WHERE q.c=? AND q.rowid>? ORDER BY q.rowid LIMIT ?", (c, ultima, lote)).fetchall()
+        if not filas:
+            break
+        yield "".join(f"{_iri(si, s)} <{pi}> {_iri(oi, o)} .\n" for _, s, si, pi, o, oi in filas)
+        ultima = filas[-1][0]
+
+    ultima = 0
+    while True:
+        filas = grafo.execute(
+            "SELECT q.rowid, q.s, rs.iri, rp.iri, q.o, q.d, rd.iri FROM datas q "
+            "LEFT JOIN resources rs ON rs.storid=q.s JOIN resources rp ON rp.storid=q.p "
+            "LEFT JOIN resources rd ON rd.storid=q.d "
+            "WHERE q.c=? AND q.rowid>? ORDER BY q.rowid LIMIT ?", (c, ultima, lote)).fetchall()
+        if not filas:
+            break
+        yield "".join(f"{_iri(si, s)} <{pi}> {_literal(o, d, di)} .\n" for _, s, si, pi, o, d, di in filas)
+        ultima = filas[-1][0]
+
+
+# --- Instantánea binaria ---
+
+def _enteros(valores) -> bytes:
+    columna = array("q", valores)
+    if sys.byteorder == "big":
+        columna.byteswap()      # el archivo siempre es little-endian
+    return columna.tobytes()
+
+
+def _leer_enteros(datos: bytes) -> array:
+    columna = array("q")
+    columna.frombytes(datos)
+    if sys.byteorder == "big":
+        columna.byteswap()
+    return columna
+
+
+def _reales(valores) -> bytes:
+    columna = array("d", valores)
+    if sys.byteorder == "big":
+        columna.byteswap()
+    return columna.tobytes()
+
+
+def _leer_reales(datos: bytes) -> array:
+    columna = array("d")
+    columna.frombytes(datos)
+    if sys.byteorder == "big":
+        columna.byteswap()
+    return columna
+
+
+def escribir(onto, ruta: str):
+    """
+    Escribe la instantánea del grafo de `onto` en `ruta`.
+
+    Secciones (cada una con su longitud como uint64 little-endian, todo
+    comprimido con zlib tras la marca _MAGIA): IRI base, storids e IRIs de
+    la tabla de recursos, objs (s, p, o), datas (s, p, d), idiomas, tipos de
+    los valores, longitudes y bytes de los textos, enteros y reales. Los
+    nodos en blanco conservan su storid negativo; `d` negativo indica el
+    idioma -d-1.
+    """
+    grafo = onto.world.graph
+    c = onto.graph.c
+
+    objs = grafo.execute("SELECT s, p, o FROM objs WHERE c=?", (c,)).fetchall()
+    datas = grafo.execute("SELECT s, p, o, d FROM datas WHERE c=?", (c,)).fetchall()
+    recursos = grafo.execute(
+        "SELECT storid, iri FROM resources WHERE storid IN ("
+        "SELECT s FROM objs WHERE c=:c UNION SELECT p FROM objs WHERE c=:c UNION SELECT o FROM objs WHERE c=:c "
+        "UNION SELECT s FROM datas WHERE c=:c UNION SELECT p FROM datas WHERE c=:c "
+        "UNION SELECT d FROM datas WHERE c=:c AND typeof(d)='integer')", {"c": c}).fetchall()
+
+    idiomas = {}
+    columnas_datas = []
+    tipos = bytearray()
+    textos, enteros, reales = [], [], []
+    for s, p, o, d in datas:
+        if isinstance(d, str):
+            d = -1 - idiomas.setdefault(d, len(idiomas))
+        columnas_datas += (s, p, d)
+        if isinstance(o, str):
+            tipos.append(_TEXTO)
+            textos.append(o.encode("utf-8"))
+        elif isinstance(o, int):
+            tipos.append(_ENTERO)
+            enteros.append(o)
+        else:
+            tipos.append(_REAL)
+            reales.append(o)
+
+    secciones = [
+        onto.base_iri.encode("utf-8"),
+        _enteros(storid for storid, _ in recursos),
+        "\n".join(iri for _, iri in recursos).encode("utf-8"),
+        _enteros(x for fila in objs for x in fila),
+        _enteros(columnas_datas),
+        "\n".join(idiomas).encode("utf-8"),
+        bytes(tipos),
+        _enteros(len(t) for t in textos),
+        b"".join(textos),
+        _enteros(enteros),
+        _reales(reales),
+    ]
+
+    compresor = zlib.compressobj(6)
+    with open(ruta, "wb") as f:
+        f.write(_MAGIA)
+        for seccion in secciones:
+            f.write(compresor.compress(_LONGITUD.pack(len(seccion))))
+            f.write(compresor.compress(seccion))
+        f.write(compresor.flush())
+
+
+def _leer_secciones(ruta: str):
+    with open(ruta, "rb") as f:
+        if f.read(len(_MAGIA)) != _MAGIA:
+            raise ValueError(f"{ruta} no es una instantánea de la biblioteca")
+        cuerpo = zlib.decompress(f.read())
+    secciones = []
+    i = 0
+    while i < len(cuerpo):
+        (largo,) = _LONGITUD.unpack_from(cuerpo, i)
+        i += _LONGITUD.size
+        secciones.append(cuerpo[i:i + largo])
+        i += largo
+    return secciones
+
+
+def _insertar(grafo, filas_objs, filas_datas, insertar_objs, insertar_datas):
+    """
+    Inserta las filas acumuladas. Si el quadstore tiene menos tripletas que
+    las que se van a insertar (el arranque), los índices de objs y datas se
+    eliminan durante la inserción y se recrean después: construirlos de una
+    vez cuesta menos de la mitad que mantenerlos fila por fila. Las filas de
+    la instantánea no tienen duplicados, así que los índices UNIQUE se
+    recrean sin conflictos.
+    """
+    nuevas = len(filas_objs) + len(filas_datas)
+    existentes = sum(grafo.execute(f"SELECT COUNT(*) FROM (SELECT 1 FROM {tabla} LIMIT ?)", (nuevas,)).fetchone()[0]
+                     for tabla in ("objs", "datas"))
+    indices = grafo.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='index' AND sql IS NOT NULL "
+        "AND tbl_name IN ('objs', 'datas')").fetchall() if existentes < nuevas else []
+    for nombre, _ in indices:
+        grafo.execute(f"DROP INDEX {nombre}")
+    try:
+        insertar_objs()
+        insertar_datas()
+    finally:
+        # owlready2 consulta con INDEXED BY: los índices tienen que volver siempre
+        for _, sql in indices:
+            grafo.execute(sql)
+
+
+def cargar(ruta: str, iri_base: str, world=default_world):
+    """
+    Carga la instantánea `ruta` en `world` y devuelve la ontología `iri_base`.
+    Reemplaza las tripletas que esa ontología tuviera en el quadstore.
+    """
+    (base, storids, iris, objs, datas, idiomas, tipos,
+     largos, textos, enteros, reales) = _leer_secciones(ruta)
+    if base.decode("utf-8") != iri_base:
+        raise ValueError(f"La instantánea es de {base.decode('utf-8')}, no de {iri_base}")
+
+    onto = world.get_ontology(iri_base)
+    world.graph.acquire_write_lock()
+    try:
+        (filas_objs, filas_datas, _, _, insertar_objs, insertar_datas,
+         nuevo_blanco, abreviar, terminar) = onto.graph.create_parse_func(ruta)
+
+        # Los storids del archivo se traducen a los de este quadstore
+        traduccion = {s: abreviar(iri) for s, iri in zip(_leer_enteros(storids), iris.decode("utf-8").split("\n"))}
+        blancos = {}
+
+        def storid(s):
+            if s >= 0:
+                return traduccion[s]
+            b = blancos.get(s)
+            if b is None:
+                b = blancos[s] = nuevo_blanco()
+            return b
+
+        objs = _leer_enteros(objs)
+        filas_objs.extend((storid(objs[i]), traduccion[objs[i + 1]], storid(objs[i + 2])) for i in range(0, len(objs), 3))
+
+        idiomas = idiomas.decode("utf-8").split("\n") if idiomas else []
+        largos = _leer_enteros(largos)
+        enteros = iter(_leer_enteros(enteros))
+        reales = iter(_leer_reales(reales))
+        datas = _leer_enteros(datas)
+        inicio = 0
+        j = 0
+        for i, tipo in enumerate(tipos):
+            if tipo == _TEXTO:
+                o = textos[inicio:inicio + largos[j]].decode("utf-8")
+                inicio += largos[j]
+                j += 1
+            elif tipo == _ENTERO:
+                o = next(enteros)
+            else:
+                o = next(reales)
+            d = datas[3 * i + 2]
+            d = idiomas[-1 - d] if d < 0 else traduccion.get(d, d)
+            filas_datas.append((storid(datas[3 * i]), traduccion[datas[3 * i + 1]], o, d))
+
+        _insertar(world.graph, filas_objs, filas_datas, insertar_objs, insertar_datas)
+        terminar()
+        onto.loaded = True
+    finally:
+        world.graph.release_write_lock()
+    onto._load_properties()
+    return onto
+
+
+# --- Verificación ---
+
+def tripletas(onto) -> Counter:
+    """
+    Multiconjunto de tripletas del grafo de `onto` expresadas con IRIs (los
+    nodos en blanco se cuentan como "_:"), comparable entre quadstores.
+    """
+    grafo = onto.world.graph
+    c = onto.graph.c
+    resultado = Counter()
+    for s, p, o in grafo.execute(
+            "SELECT rs.iri, rp.iri, ro.iri FROM objs q LEFT JOIN resources rs ON rs.storid=q.s "
+            "JOIN resources rp ON rp.storid=q.p LEFT JOIN resources ro ON ro.storid=q.o WHERE q.c=?", (c,)):
+        resultado[(s or "_:", p, o or "_:")] += 1
+    for s, p, o, d, di in grafo.execute(
+            "SELECT rs.iri, rp.iri, q.o, q.d, rd.iri FROM datas q LEFT JOIN resources rs ON rs.storid=q.s "
+            "JOIN resources rp ON rp.storid=q.p LEFT JOIN resources rd ON rd.storid=q.d WHERE q.c=?", (c,)):
+        resultado[(s or "_:", p, o, d if isinstance(d, str) else di)] += 1
+    return resultado
+
+
+def _verificar(ruta_owl: str):
+    import tempfile
+
+    t = time.perf_counter()
+    original = World().get_ontology(ruta_owl).load()
+    t_owl = time.perf_counter() - t
+    esperadas = tripletas(original)
+    print(f"RDF/XML:      {sum(esperadas.values())} tripletas, carga {t_owl:.2f}s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "ronda.instantanea")
+        t = time.perf_counter()
+        escribir(original, ruta)
+        t_escribir = time.perf_counter() - t
+        t = time.perf_counter()
+        copia = cargar(ruta, original.base_iri, World())
+        t_cargar = time.perf_counter() - t
+        igual_instantanea = tripletas(copia) == esperadas
+        print(f"Instantánea:  {os.path.getsize(ruta)} bytes, escritura {t_escribir:.2f}s, "
+              f"carga {t_cargar:.2f}s -> {'idéntica' if igual_instantanea else 'DISTINTA'}")
+
+        ruta_nt = os.path.join(tmp, "ronda.nt")
+        t = time.perf_counter()
+        with open(ruta_nt, "w", encoding="utf-8") as f:
+            for fragmento in ntriples(original):
+                f.write(fragmento)
+        t_nt = time.perf_counter() - t
+        with open(ruta_nt, "rb") as f:
+            copia_nt = World().get_ontology(original.base_iri).load(fileobj=io.BytesIO(f.read()), format="ntriples")
+        igual_nt = tripletas(copia_nt) == esperadas
+        print(f"N-Triples:    {os.path.getsize(ruta_nt)} bytes, exportación {t_nt:.2f}s "
+              f"-> {'idéntico' if igual_nt else 'DISTINTO'}")
+
+    return igual_instantanea and igual_nt
+
+
+def main_cli():
+    from main import IRI_BASE, ONTO_FILE
+    from bitacora import guardar_archivo_atomico
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("accion", choices=["crear", "owl", "verificar"])
+    parser.add_argument("--owl", default=ONTO_FILE)
+    parser.add_argument("--instantanea", default=INSTANTANEA_FILE)
+    args = parser.parse_args()
+
+    if args.accion == "crear":
+        if not os.path.exists(args.owl):
+            parser.error(f"No existe {args.owl}")
+        onto = get_ontology(args.owl).load()
+        guardar_archivo_atomico(args.instantanea, lambda ruta: escribir(onto, ruta))
+        print(f"--- Instantánea escrita en {args.instantanea} ---")
+    elif args.accion == "owl":
+        if not os.path.exists(args.instantanea):
+            parser.error(f"No existe {args.instantanea}")
+        onto = cargar(args.instantanea, IRI_BASE)
+        guardar_archivo_atomico(args.owl, lambda ruta: onto.save(file=ruta))
+        print(f"--- Exportado a {args.owl} ---")
+    else:
+        if not os.path.exists(args.owl):
+            parser.error(f"No existe {args.owl}")
+        sys.exit(0 if _verificar(args.owl) else 1)
+
+
+if __name__ == "__main__":
+    main_cli()
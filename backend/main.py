@@ -7,15 +7,109 @@ import os
 import types
 import datetime
 from typing import Optional
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from SPARQLWrapper import SPARQLWrapper, JSON
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+import json
+import tempfile
+import asyncio
+import base64
+import itertools
+import time
+import zlib
+import sqlite3
+from contextlib import contextmanager
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from dbpedia import ClienteDBpedia
+from indice_busqueda import IndiceBusqueda
+from indice_grafo import IndiceAdyacencia
+from indice_prestamos import IndicePrestamos
+from indice_facetas import IndiceFacetas
+from indice_relevancia import IndiceRelevancia
+from indice_tipos import IndiceTipos
+from modelo_lectura import ModeloLectura
+from estadisticas import Estadisticas
+from bitacora import Bitacora, guardar_archivo_atomico
+from cerrojo import CerrojoLecturaEscritura, TiempoAgotado
+import quadstore
+import instantanea
+from cache_respuestas import CacheRespuestas
+from traducciones import TablasTraduccion, IDIOMAS_SOPORTADOS
+from metricas import Metricas
+from cambios import CanalCambios
+from consultas_sparql import ConsultasPreparadas, PresupuestoTiempo, codificar_fila, normalizar as normalizar_sparql
+from owlready2.sparql.main import PreparedSelectQuery
 
 # --- Configuración ---
 ONTO_FILE = "biblioteca.owl"
 IRI_BASE = "http://uni.edu/biblioteca.owl#"
 
-app = FastAPI(title="API Gestión Biblioteca OWL", version="1.0.0")
+# Bitácora de escrituras: las mutaciones se anotan aquí y se compactan
+# en ONTO_FILE en segundo plano (por tiempo o por tamaño).
+BITACORA_FILE = "biblioteca.bitacora"
+# "fsync" (un fsync por petición) o "grupo" (group commit entre peticiones concurrentes)
+MODO_DURABILIDAD = os.environ.get("BIBLIOTECA_DURABILIDAD", "fsync")
+COMPACTAR_CADA_SEG = float(os.environ.get("BIBLIOTECA_COMPACTAR_SEG", "30"))
+COMPACTAR_BYTES = int(os.environ.get("BIBLIOTECA_COMPACTAR_BYTES", str(1 << 20)))
+
+# Varios procesos (uvicorn --workers N) sobre el mismo ONTO_FILE: las escrituras
+# se serializan con un cerrojo de archivo y cada proceso aplica las mutaciones
+# de los demás leyendo la bitácora compartida. Solo POSIX y sin quadstore.
+MULTIPROCESO = os.environ.get("BIBLIOTECA_MULTIPROCESO", "0") == "1"
+
+# Quadstore SQLite persistente (opcional): si se define, la ontología vive en
+# este archivo y el arranque solo abre la base. ONTO_FILE se importa la primera vez.
+QUADSTORE_FILE = os.environ.get("BIBLIOTECA_QUADSTORE")
+
+# Instantánea binaria (opcional, sin quadstore): si se define, la compactación
+# escribe este archivo en lugar de ONTO_FILE y el arranque lo carga, bastante
+# más rápido que parsear RDF/XML. ONTO_FILE se importa la primera vez.
+INSTANTANEA_FILE = os.environ.get("BIBLIOTECA_INSTANTANEA")
+
+# Límites por consulta SPARQL: filas máximas devueltas y tiempo de ejecución
+MAX_FILAS_SPARQL = int(os.environ.get("BIBLIOTECA_SPARQL_MAX_FILAS", "100000"))
+PLAZO_SPARQL_SEG = float(os.environ.get("BIBLIOTECA_SPARQL_PLAZO_SEG", "10"))
+# Conexiones SQLite propias de las consultas SELECT (consultas en paralelo)
+CONEXIONES_SPARQL = int(os.environ.get("BIBLIOTECA_SPARQL_CONEXIONES", "4"))
+
+# Búsqueda online: endpoint SPARQL remoto, plazo total de /buscador/online,
+# timeout de cada llamada remota y vigencia de la caché por (q, lang)
+DBPEDIA_URL = os.environ.get("BIBLIOTECA_DBPEDIA_URL", "http://dbpedia.org/sparql")
+PLAZO_BUSQUEDA_SEG = float(os.environ.get("BIBLIOTECA_BUSQUEDA_PLAZO_SEG", "3"))
+TIMEOUT_DBPEDIA_SEG = float(os.environ.get("BIBLIOTECA_DBPEDIA_TIMEOUT_SEG", "10"))
+TTL_DBPEDIA_SEG = float(os.environ.get("BIBLIOTECA_DBPEDIA_TTL_SEG", "600"))
+
+# Memoria máxima para la caché de respuestas de lectura
+CACHE_RESPUESTAS_MB = int(os.environ.get("BIBLIOTECA_CACHE_MB", "64"))
+
+# Espera máxima por el cerrojo de la ontología antes de responder 503
+PLAZO_CERROJO_SEG = float(os.environ.get("BIBLIOTECA_CERROJO_PLAZO_SEG", "30"))
+
+# Vigencia en el cliente de las traducciones del esquema (/config/idioma*)
+MAX_AGE_TRADUCCIONES_SEG = int(os.environ.get("BIBLIOTECA_TRADUCCIONES_MAX_AGE_SEG", "86400"))
+
+# Límites de GET /individuos/{nombre}/grafo
+MAX_PROFUNDIDAD_GRAFO = 6
+MAX_NODOS_GRAFO = int(os.environ.get("BIBLIOTECA_GRAFO_MAX_NODOS", "5000"))
+
+# Máximo de resultados (k) de GET /buscador?modo=relevancia
+MAX_RESULTADOS_RELEVANCIA = 1000
+
+# Eventos recientes que guarda GET /cambios para reanudar con Last-Event-ID
+CAMBIOS_BUFFER = int(os.environ.get("BIBLIOTECA_CAMBIOS_BUFFER", "10000"))
+
+metricas = Metricas()
+
+class _RespuestaJSON(JSONResponse):
+    """JSONResponse que mide la serialización de las respuestas de los endpoints."""
+    def render(self, content) -> bytes:
+        with metricas.fase("serializacion"):
+            return super().render(content)
+
+app = FastAPI(title="API Gestión Biblioteca OWL", version="1.0.0", default_response_class=_RespuestaJSON)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,9 +117,56 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing", "X-SPARQL-Parse-Ms", "X-SPARQL-Exec-Ms", "X-SPARQL-Cache"],
 )
 
 onto = None
+indice_busqueda = IndiceBusqueda()
+indice_grafo = IndiceAdyacencia()
+indice_prestamos = IndicePrestamos()
+indice_facetas = IndiceFacetas()
+indice_relevancia = IndiceRelevancia()
+indice_tipos = IndiceTipos()
+modelo_lectura = ModeloLectura()
+estadisticas = Estadisticas()
+cache_respuestas = CacheRespuestas(CACHE_RESPUESTAS_MB << 20)
+cache_sparql = CacheRespuestas(CACHE_RESPUESTAS_MB << 20)
+consultas_preparadas = ConsultasPreparadas(default_world)
+presupuesto_sparql = PresupuestoTiempo(CONEXIONES_SPARQL)
+cliente_dbpedia = ClienteDBpedia(DBPEDIA_URL, timeout=TIMEOUT_DBPEDIA_SEG, ttl=TTL_DBPEDIA_SEG)
+tablas_traduccion = TablasTraduccion()
+cambios = CanalCambios(CAMBIOS_BUFFER)
+# Lectores en paralelo, escritores exclusivos. Orden de adquisición: bitacora.exclusivo() -> cerrojo_onto.
+cerrojo_onto = CerrojoLecturaEscritura(PLAZO_CERROJO_SEG)
+
+# Generación de escritura: avanza con cada mutación e invalida las cachés.
+# La época distingue generaciones de distintos arranques del proceso en los ETag.
+generacion = 0
+_EPOCA = f"{int(time.time()):x}"
+def guardar_ontologia():
+    """Persiste la ontología completa en el almacén configurado."""
+    with metricas.fase("persistencia"):
+        if QUADSTORE_FILE:
+            quadstore.guardar()
+        elif INSTANTANEA_FILE:
+            guardar_archivo_atomico(INSTANTANEA_FILE, lambda ruta: instantanea.escribir(onto, ruta))
+        else:
+            guardar_archivo_atomico(ONTO_FILE, lambda ruta: onto.save(file=ruta))
+
+def _sincronizar_bitacora(seq):
+    """Espera a que la mutación `seq` sea durable (fsync de la bitácora)."""
+    with metricas.fase("persistencia"):
+        bitacora.sincronizar(seq)
+
+bitacora = Bitacora(
+    BITACORA_FILE,
+    guardar=guardar_ontologia,
+    modo=MODO_DURABILIDAD,
+    intervalo_compactacion=COMPACTAR_CADA_SEG,
+    umbral_bytes=COMPACTAR_BYTES,
+    compartida=MULTIPROCESO,
+    ponerse_al_dia=lambda: _ponerse_al_dia(),
+)
 
 class IndividualCreate(BaseModel):
     name: str
@@ -43,12 +184,29 @@ class RelationCreate(BaseModel):
 
 class SPARQLQuery(BaseModel):
     query: str
+    # Valores para los parámetros `??` / `??1`... de la consulta, en orden.
+    # Un objeto {"entidad": "nombre"} o {"iri": "..."} se resuelve a la entidad.
+    parametros: List[Any] = []
+    # Paginación de resultados (acotada por MAX_FILAS_SPARQL)
+    limit: Optional[int] = None
+    offset: int = 0
+    # Transmite las filas como NDJSON (equivale a Accept: application/x-ndjson)
+    stream: bool = False
 
 # --- Inicialización de la Ontología (T-BOX) ---
 def inicializar_ontologia_base():
     global onto
     
-    if not os.path.exists(ONTO_FILE):
+    if not QUADSTORE_FILE:
+        # Base temporal en disco: las consultas SPARQL leen con conexiones propias
+        quadstore.abrir_temporal()
+
+    if QUADSTORE_FILE:
+        onto = quadstore.abrir(QUADSTORE_FILE, ONTO_FILE, IRI_BASE)
+    elif INSTANTANEA_FILE and os.path.exists(INSTANTANEA_FILE):
+        print(f"--- Cargando instantánea: {INSTANTANEA_FILE} ---")
+        onto = instantanea.cargar(INSTANTANEA_FILE, IRI_BASE)
+    elif not os.path.exists(ONTO_FILE):
         print(f"--- Creando ontología desde cero: {ONTO_FILE} ---")
         onto = get_ontology(IRI_BASE)
     else:
@@ -207,88 +365,515 @@ def inicializar_ontologia_base():
             domain = [Bibliotecario]
             range = [Biblioteca]
 
-    onto.save(file=ONTO_FILE)
+    guardar_ontologia()
     print("--- Ontología inicializada CORRECTAMENTE (5 Idiomas) ---")
 
     
 
 def get_thing(name: str):
-    res = onto[name]
+    with metricas.fase("consulta"):
+        res = onto[name]
     if not res:
         raise HTTPException(status_code=404, detail=f"Entidad '{name}' no encontrada.")
     return res
 
+def get_individuo(name: str):
+    """Como get_thing, pero rechaza clases y propiedades."""
+    res = get_thing(name)
+    if not isinstance(res, Thing):
+        raise HTTPException(status_code=400, detail=f"'{name}' no es un individuo.")
+    return res
+
+# --- Acceso concurrente a la ontología ---
+# Los endpoints son `def` síncronos y corren en paralelo en el threadpool.
+# Las lecturas toman el cerrojo compartido; las mutaciones, el exclusivo.
+# La compactación (onto.save) solo lee y ya queda serializada con las
+# escrituras por bitacora.lock, así que no necesita el cerrojo exclusivo.
+
+def _cerrojo(adquirir, liberar):
+    @contextmanager
+    def gestor():
+        try:
+            adquirir()
+        except TiempoAgotado:
+            raise HTTPException(503, "Ontología ocupada, reintente", headers={"Retry-After": "1"})
+        try:
+            yield
+        finally:
+            liberar()
+    return gestor
+
+_lectura = _cerrojo(cerrojo_onto.adquirir_lectura, cerrojo_onto.liberar_lectura)
+_escritura = _cerrojo(cerrojo_onto.adquirir_escritura, cerrojo_onto.liberar_escritura)
+
+def _bajo_lectura(generador):
+    """
+    Ejecuta cada paso de un generador de respuesta con el cerrojo de lectura,
+    sin retenerlo mientras el cliente consume los datos.
+    """
+    while True:
+        with cerrojo_onto.lectura():
+            try:
+                fragmento = next(generador)
+            except StopIteration:
+                return
+        yield fragmento
+
+@contextmanager
+def _mutacion():
+    """
+    Sección crítica de toda escritura: bitácora (y cerrojo entre procesos),
+    cerrojo exclusivo de la ontología y, en modo multiproceso, aplicar antes
+    lo que anotaron los demás procesos.
+    """
+    with bitacora.exclusivo(), _escritura():
+        if MULTIPROCESO:
+            _ponerse_al_dia()
+        yield
+
+# --- Modo multiproceso ---
+
+def _ponerse_al_dia():
+    """Aplica las mutaciones que otros procesos anotaron en la bitácora compartida."""
+    global generacion
+    with bitacora.compartido(), _escritura():
+        entradas = bitacora.entradas_nuevas()
+        if entradas is not None:
+            for i, entrada in enumerate(entradas, start=generacion + 1):
+                try:
+                    _APLICADORES[entrada["op"]](entrada)
+                except Exception as e:
+                    print(f"Entrada de bitácora ignorada {entrada}: {e}")
+                cambios.publicar(i, _evento_cambio(entrada))
+            # Con el cerrojo de archivo tomado nadie está escribiendo: la secuencia es exacta
+            generacion = bitacora.secuencia()
+            return
+
+    # Se perdió más de una rotación de la bitácora: recargar desde disco
+    with bitacora.exclusivo(), _escritura():
+        _recargar_ontologia()
+
+def _recargar_ontologia():
+    global generacion
+    print("--- Recargando la ontología desde disco ---")
+    onto.destroy()
+    inicializar_ontologia_base()
+    consultas_preparadas.vaciar()
+    _construir_indices()
+    for entrada in bitacora.leer_pendientes():
+        try:
+            _APLICADORES[entrada["op"]](entrada)
+        except Exception as e:
+            print(f"Entrada de bitácora ignorada {entrada}: {e}")
+    bitacora.reabrir()
+    generacion = bitacora.secuencia()
+    cambios.reiniciar(_EPOCA, generacion)
+
+if MULTIPROCESO:
+    @app.middleware("http")
+    async def sincronizar_procesos(request: Request, call_next):
+        # Comparar la secuencia compartida es una lectura de memoria; solo si
+        # otro proceso escribió se aplican sus mutaciones antes de responder.
+        if bitacora.secuencia() != generacion:
+            await run_in_threadpool(_ponerse_al_dia)
+        return await call_next(request)
+
+@app.middleware("http")
+async def medir_peticion(request: Request, call_next):
+    # Se registra después de sincronizar_procesos, así que la envuelve: el
+    # tiempo de ponerse al día con otros workers cuenta en la latencia.
+    fases = metricas.iniciar_peticion()
+    inicio = time.perf_counter()
+    estado = 500
+    try:
+        respuesta = await call_next(request)
+        estado = respuesta.status_code
+    finally:
+        total = time.perf_counter() - inicio
+        ruta = request.scope.get("route")
+        metricas.registrar_peticion(request.method, getattr(ruta, "path", "<sin_ruta>"), estado, total)
+    respuesta.headers["Server-Timing"] = metricas.server_timing(fases, total)
+    return respuesta
+
 # --- Eventos ---
+
+def _construir_indices():
+    indice_tipos.construir(onto)
+    modelo_lectura.construir(onto)
+    indice_busqueda.construir(onto.individuals())
+    indice_grafo.construir(onto)
+    indice_prestamos.construir(onto)
+    indice_facetas.construir(onto)
+    indice_relevancia.construir(onto)
+    estadisticas.construir(onto)
+    tablas_traduccion.construir(onto)
+
 @app.on_event("startup")
 def startup_event():
-    inicializar_ontologia_base()
+    global generacion, _EPOCA
+    if MULTIPROCESO and QUADSTORE_FILE:
+        raise RuntimeError("BIBLIOTECA_MULTIPROCESO no es compatible con BIBLIOTECA_QUADSTORE")
+
+    # En modo multiproceso los workers arrancan de a uno (cerrojo de archivo)
+    with bitacora.exclusivo():
+        inicializar_ontologia_base()
+        _construir_indices()
+        presupuesto_sparql.instalar(default_world, quadstore.conexion_lectura)
+        _reproducir_bitacora()
+        bitacora.iniciar()
+        if MULTIPROCESO:
+            generacion = bitacora.secuencia()
+            _EPOCA = f"{bitacora.token():x}"
+        cambios.reiniciar(_EPOCA, generacion)
+
+@app.on_event("shutdown")
+def shutdown_event():
+    bitacora.cerrar()
 
 # --- ENDPOINTS ---
 
 @app.get("/")
 def home():
-    return {"mensaje": "API de Ontología de Biblioteca funcionando", "archivo": ONTO_FILE}
+    return {"mensaje": "API de Ontología de Biblioteca funcionando", "archivo": QUADSTORE_FILE or INSTANTANEA_FILE or ONTO_FILE}
 
-# 1. Crear Individuos (A-Box)
-@app.post("/individuos/")
-def crear_individuo(ind: IndividualCreate):
-    clase = onto[ind.class_name]
-    if not clase:
+# --- Caché de respuestas (ETag / 304) ---
+
+def _etag(clave) -> str:
+    return f'"{_EPOCA}-{generacion}-{zlib.crc32(repr(clave).encode()):x}"'
+
+def _respuesta_cacheada(clave, if_none_match: Optional[str], construir):
+    """
+    Sirve una respuesta de lectura desde la caché versionada. Si el cliente ya
+    tiene la versión actual (If-None-Match), responde 304 sin tocar la ontología.
+    """
+    etag = _etag(clave)
+    cabeceras = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and etag in [e.strip() for e in if_none_match.split(",")]:
+        return Response(status_code=304, headers=cabeceras)
+
+    gen = generacion
+    cuerpo = cache_respuestas.obtener(clave, gen)
+    if cuerpo is None:
+        with _lectura():
+            datos = construir()
+        with metricas.fase("serializacion"):
+            cuerpo = json.dumps(
+                jsonable_encoder(datos), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+            ).encode("utf-8")
+        cache_respuestas.guardar(clave, gen, cuerpo)
+    return Response(cuerpo, media_type="application/json", headers=cabeceras)
+
+# --- Aplicación de mutaciones ---
+# Usadas tanto por los endpoints como al reproducir la bitácora en el arranque.
+
+def _aplicar_creacion(name: str, class_name: str):
+    clase = onto[class_name]
+    if not isinstance(clase, ThingClass):
         raise HTTPException(404, "Clase no encontrada")
     
     with onto:
-        nuevo = clase(ind.name)
-    
-    onto.save(file=ONTO_FILE)
-    return {"mensaje": f"Creado '{ind.name}' de tipo '{ind.class_name}'"}
-
-# 2. Asignar Datos (Data Properties)
-@app.post("/individuos/datos")
-def agregar_dato(data: DataPropertyUpdate):
-    ind = get_thing(data.individual)
-    prop = get_thing(data.property)
+        nuevo = clase(name)
+    indice_tipos.agregar(nuevo)
+    modelo_lectura.actualizar(nuevo)
+    indice_busqueda.indexar(nuevo)
+    estadisticas.actualizar(nuevo)
+    indice_facetas.actualizar(nuevo)
+    indice_relevancia.actualizar(nuevo)
+    return nuevo
+
+def _aplicar_dato(individual: str, property: str, value: Any):
+    ind = get_individuo(individual)
+    prop = get_thing(property)
     
     try:
-        actual = getattr(ind, data.property)
+        actual = getattr(ind, property)
         if isinstance(actual, list):
-            actual.append(data.value)
+            # El quadstore guarda conjuntos de tripletas: un valor ya presente
+            # no se vuelve a agregar, así reproducir la bitácora sobre una
+            # ontología que ya incluye la entrada no duplica nada
+            if not any(v == value and type(v) is type(value) for v in actual):
+                actual.append(value)
         else:
-            setattr(ind, data.property, data.value)
+            setattr(ind, property, value)
     except Exception as e:
         raise HTTPException(500, f"Error asignando dato: {str(e)}")
 
-    onto.save(file=ONTO_FILE)
+    indice_busqueda.indexar(ind)
+    estadisticas.actualizar(ind)
+    indice_prestamos.actualizar(ind)
+    indice_facetas.actualizar(ind)
+    modelo_lectura.actualizar(ind)
+    indice_relevancia.actualizar(ind)
+    return ind
+
+def _aplicar_relacion(subject: str, property: str, object: str):
+    sujeto = get_individuo(subject)
+    objeto = get_individuo(object)
+    propiedad = get_thing(property)
+    
+    try:
+        actual = getattr(sujeto, property)
+        if objeto not in actual:
+            actual.append(objeto)
+    except Exception as e:
+        setattr(sujeto, property, objeto)
+    estadisticas.actualizar(sujeto)
+    indice_grafo.actualizar(sujeto)
+    indice_prestamos.actualizar(sujeto)
+    modelo_lectura.actualizar(sujeto)
+    return sujeto
+
+_APLICADORES = {
+    "crear": lambda e: _aplicar_creacion(e["name"], e["class_name"]),
+    "dato": lambda e: _aplicar_dato(e["individual"], e["property"], e["value"]),
+    "relacion": lambda e: _aplicar_relacion(e["subject"], e["property"], e["object"]),
+}
+
+def _anotar_mutacion(entrada: dict) -> int:
+    """Anota una mutación ya aplicada, avanza la generación de escritura y la publica en /cambios."""
+    global generacion
+    seq = bitacora.anotar(entrada)
+    generacion += 1
+    cambios.publicar(generacion, _evento_cambio(entrada))
+    return seq
+
+def _evento_cambio(entrada: dict) -> dict:
+    """Forma compacta de una entrada de bitácora para GET /cambios."""
+    op = entrada["op"]
+    if op == "crear":
+        return {"op": op, "entidad": entrada["name"], "clase": entrada["class_name"]}
+    if op == "dato":
+        entidad, propiedad, valor = entrada["individual"], entrada["property"], entrada["value"]
+    elif op == "relacion":
+        entidad, propiedad, valor = entrada["subject"], entrada["property"], entrada["object"]
+    else:
+        # SPARQL: puede haber cambiado cualquier cosa
+        return {"op": op}
+    registro = modelo_lectura.registro(modelo_lectura.storid(entidad))
+    return {"op": op, "entidad": entidad, "clase": registro.clase if registro else None,
+            "propiedad": propiedad, "valor": valor}
+
+def _registrar_mutacion(op: str, **campos):
+    """Aplica una mutación en memoria y la anota en la bitácora (con fsync)."""
+    entrada = {"op": op, **campos}
+    with _mutacion():
+        _APLICADORES[op](entrada)
+        seq = _anotar_mutacion(entrada)
+    _sincronizar_bitacora(seq)
+
+def _reproducir_bitacora():
+    """
+    Reaplica las mutaciones que no alcanzaron a compactarse en el .owl. Las
+    entradas pueden estar ya incluidas (caída entre el guardado y el vaciado
+    de la bitácora, o confirmaciones del quadstore): aplicarlas es idempotente.
+    """
+    pendientes = bitacora.leer_pendientes()
+    if not pendientes:
+        return
+    
+    print(f"--- Reproduciendo {len(pendientes)} mutaciones de {BITACORA_FILE} ---")
+    for entrada in pendientes:
+        try:
+            _APLICADORES[entrada["op"]](entrada)
+        except Exception as e:
+            print(f"Entrada de bitácora ignorada {entrada}: {e}")
+    bitacora.abrir()
+    bitacora.compactar()
+
+# 1. Crear Individuos (A-Box)
+@app.post("/individuos/")
+def crear_individuo(ind: IndividualCreate):
+    _registrar_mutacion("crear", name=ind.name, class_name=ind.class_name)
+    return {"mensaje": f"Creado '{ind.name}' de tipo '{ind.class_name}'"}
+
+# 2. Asignar Datos (Data Properties)
+@app.post("/individuos/datos")
+def agregar_dato(data: DataPropertyUpdate):
+    _registrar_mutacion("dato", individual=data.individual, property=data.property, value=data.value)
     return {"mensaje": f"Actualizado {data.individual}: {data.property} = {data.value}"}
 
 # 3. Crear Relaciones (Object Properties)
 @app.post("/individuos/relacion")
 def crear_relacion(rel: RelationCreate):
-    sujeto = get_thing(rel.subject)
-    objeto = get_thing(rel.object)
-    propiedad = get_thing(rel.property)
-    
-    try:
-        actual = getattr(sujeto, rel.property)
-        actual.append(objeto)
-    except Exception as e:
-        setattr(sujeto, rel.property, objeto)
-        
-    onto.save(file=ONTO_FILE)
+    _registrar_mutacion("relacion", subject=rel.subject, property=rel.property, object=rel.object)
     return {"mensaje": f"Relación creada: {rel.subject} --[{rel.property}]--> {rel.object}"}
 
+# 3b. Carga masiva (NDJSON)
+# Cada línea es una operación con el mismo formato que la bitácora:
+#   {"op": "crear", "name": ..., "class_name": ...}
+#   {"op": "dato", "individual": ..., "property": ..., "value": ...}
+#   {"op": "relacion", "subject": ..., "property": ..., "object": ...}
+
+_MODELOS_OPERACION = {
+    "crear": IndividualCreate,
+    "dato": DataPropertyUpdate,
+    "relacion": RelationCreate,
+}
+
+def _validar_operacion(linea: bytes) -> dict:
+    obj = json.loads(linea)
+    if not isinstance(obj, dict):
+        raise ValueError("La línea debe ser un objeto JSON")
+    op = obj.pop("op", None)
+    modelo = _MODELOS_OPERACION.get(op)
+    if modelo is None:
+        raise ValueError(f"Operación no soportada: {op!r}. Use: {', '.join(_MODELOS_OPERACION)}")
+    return {"op": op, **dict(modelo(**obj))}
+
+def _aplicar_lote(lineas):
+    """
+    Aplica un lote de líneas dentro de un único `with onto:` y lo persiste
+    con un solo fsync de bitácora. Un error en una línea no detiene el lote.
+    """
+    resultados = []
+    seq = None
+    with _mutacion():
+        with onto:
+            for numero, linea in lineas:
+                try:
+                    entrada = _validar_operacion(linea)
+                    _APLICADORES[entrada["op"]](entrada)
+                except HTTPException as e:
+                    resultados.append({"linea": numero, "ok": False, "error": e.detail})
+                    continue
+                except Exception as e:
+                    resultados.append({"linea": numero, "ok": False, "error": str(e)})
+                    continue
+                seq = _anotar_mutacion(entrada)
+                resultados.append({"linea": numero, "ok": True, "op": entrada["op"]})
+    if seq is not None:
+        _sincronizar_bitacora(seq)
+    return resultados
+
+class _RespuestaConCuerpoAbierto(StreamingResponse):
+    """
+    StreamingResponse que empieza a responder mientras todavía se lee el
+    cuerpo de la petición. No escucha la desconexión del cliente por su
+    cuenta: esa escucha también llama a `receive()` y descartaría fragmentos
+    del cuerpo; la desconexión la detecta quien lee el cuerpo.
+    """
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+@app.post("/individuos/bulk")
+async def carga_masiva(request: Request, lote: int = Query(500, ge=1, le=10000)):
+    """
+    Recibe un flujo NDJSON de operaciones y las aplica en lotes acotados
+    mientras llega el cuerpo. Devuelve un resultado NDJSON por línea, que se
+    envía en cuanto se aplica cada lote, y un resumen final.
+
+    Una tarea lee el cuerpo y aplica los lotes aunque el cliente todavía no
+    lea la respuesta (muchos clientes envían todo antes de leer); los
+    resultados se acumulan en un archivo temporal (no en memoria) y la
+    respuesta los envía a medida que se escriben.
+    """
+    salida = tempfile.SpooledTemporaryFile(max_size=1 << 20)
+    contadores = {"lineas": 0, "aplicadas": 0, "errores": 0}
+    escrito = 0
+    hay_datos = asyncio.Event()
+
+    def escribir(obj):
+        nonlocal escrito
+        salida.seek(escrito)
+        escrito += salida.write((json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8"))
+        hay_datos.set()
+
+    async def procesar(pendientes):
+        try:
+            resultados = await run_in_threadpool(_aplicar_lote, pendientes)
+        except HTTPException as e:
+            if e.status_code != 503:
+                raise
+            # El cerrojo se agotó antes de aplicar nada de este lote: los
+            # lotes anteriores ya están anotados y sus resultados se conservan
+            resultados = [{"linea": numero, "ok": False, "error": e.detail} for numero, _ in pendientes]
+        for r in resultados:
+            contadores["aplicadas" if r["ok"] else "errores"] += 1
+            escribir(r)
+
+    async def leer_cuerpo():
+        pendientes = []
+        resto = b""
+        numero = 0
+        try:
+            async for fragmento in request.stream():
+                *lineas, resto = (resto + fragmento).split(b"\n")
+                for linea in lineas:
+                    numero += 1
+                    if linea.strip():
+                        pendientes.append((numero, linea))
+                    if len(pendientes) >= lote:
+                        await procesar(pendientes)
+                        pendientes = []
+            if resto.strip():
+                numero += 1
+                pendientes.append((numero, resto))
+            if pendientes:
+                await procesar(pendientes)
+            contadores["lineas"] = numero
+            escribir({"resumen": contadores})
+        except ClientDisconnect:
+            pass
+        except Exception as e:
+            # La respuesta ya empezó con 200: el error va en la última línea
+            contadores["lineas"] = numero
+            escribir({"resumen": contadores, "error": str(e)})
+        finally:
+            hay_datos.set()
+
+    lector = asyncio.create_task(leer_cuerpo())
+
+    async def enviar():
+        enviado = 0
+        try:
+            while True:
+                hay_datos.clear()
+                if enviado < escrito:
+                    salida.seek(enviado)
+                    fragmento = salida.read(escrito - enviado)
+                    enviado += len(fragmento)
+                    yield fragmento
+                elif lector.done():
+                    return
+                else:
+                    await hay_datos.wait()
+        finally:
+            # Si el cliente se fue, la tarea termina el lote en curso sola
+            lector.add_done_callback(lambda _: salida.close())
+
+    return _RespuestaConCuerpoAbierto(enviar(), media_type="application/x-ndjson")
+
 # 4. Consultar Individuo
 @app.get("/individuos/{nombre}")
-def consultar_individuo(nombre: str):
+def consultar_individuo(nombre: str, request: Request):
+    return _respuesta_cacheada(
+        ("individuo", nombre), request.headers.get("if-none-match"),
+        lambda: _consultar_individuo(nombre),
+    )
+
+def _consultar_individuo(nombre: str):
+    registro = modelo_lectura.registro(modelo_lectura.storid(nombre))
+    if registro is not None:
+        with metricas.fase("recorrido"):
+            return {
+                "nombre": registro.nombre,
+                "clase": registro.clase,
+                "datos": {k: list(v) for k, v in registro.datos},
+                "relaciones": {k: list(v) for k, v in registro.relaciones},
+            }
+
+    # Otras entidades (clases, propiedades) no están en el modelo de lectura
     ind = get_thing(nombre)
     datos = {}
     relaciones = {}
     
-    for prop in ind.get_properties():
-        valores = prop[ind]
-        if isinstance(prop, ObjectPropertyClass):
-            relaciones[prop.python_name] = [v.name for v in valores]
-        else:
-            datos[prop.python_name] = [str(v) for v in valores]
+    with metricas.fase("recorrido"):
+        for prop in ind.get_properties():
+            valores = prop[ind]
+            if isinstance(prop, ObjectPropertyClass):
+                relaciones[prop.python_name] = [v.name for v in valores]
+            else:
+                datos[prop.python_name] = [str(v) for v in valores]
             
     return {
         "nombre": ind.name,
@@ -297,105 +882,547 @@ def consultar_individuo(nombre: str):
         "relaciones": relaciones
     }
 
+# 4a. Vecindario en el grafo de relaciones
+@app.get("/individuos/{nombre}/grafo")
+def consultar_grafo(
+    nombre: str,
+    request: Request,
+    profundidad: int = Query(1, ge=1, le=MAX_PROFUNDIDAD_GRAFO, description="Saltos desde el individuo"),
+    propiedades: Optional[str] = Query(None, description="Propiedades de objeto a seguir, separadas por coma (por defecto todas)"),
+    max_nodos: int = Query(500, ge=1, le=MAX_NODOS_GRAFO),
+):
+    """
+    Recorrido en anchura desde `nombre` siguiendo las relaciones en ambos
+    sentidos (ej: autor -> libros -> editoriales y lectores), en una sola
+    respuesta. Se resuelve sobre el índice de adyacencia en memoria.
+    """
+    filtro = None
+    if propiedades:
+        filtro = tuple(sorted({p.strip() for p in propiedades.split(",") if p.strip()}))
+        desconocidas = [p for p in filtro if p not in indice_grafo.propiedades()]
+        if desconocidas:
+            raise HTTPException(400, f"Propiedades de objeto desconocidas: {', '.join(desconocidas)}. "
+                                     f"Use: {', '.join(indice_grafo.propiedades())}")
+    return _respuesta_cacheada(
+        ("grafo", nombre, profundidad, filtro, max_nodos), request.headers.get("if-none-match"),
+        lambda: _consultar_grafo(nombre, profundidad, filtro, max_nodos),
+    )
+
+def _consultar_grafo(nombre: str, profundidad: int, propiedades, max_nodos: int):
+    raiz = get_thing(nombre)
+    with metricas.fase("recorrido"):
+        distancias, aristas, truncado = indice_grafo.vecindario(raiz.storid, profundidad, propiedades, max_nodos)
+        nombres = {}
+        nodos = []
+        for storid, distancia in sorted(distancias.items(), key=lambda x: (x[1], x[0])):
+            registro = modelo_lectura.registro(storid)
+            if registro is not None:
+                nombre, tipo = registro.nombre, registro.clase
+            else:
+                ind = onto.world._get_by_storid(storid)
+                nombre, tipo = ind.name, ind.is_a[0].name
+            nombres[storid] = nombre
+            nodos.append({"id": nombre, "tipo": tipo, "distancia": distancia})
+
+    return {
+        "raiz": raiz.name,
+        "profundidad": profundidad,
+        "nodos": nodos,
+        "aristas": [{"origen": nombres[s], "propiedad": p, "destino": nombres[o]} for s, p, o in aristas],
+        "truncado": truncado,
+    }
+
+# 4b. Estadísticas agregadas
+@app.get("/estadisticas")
+def obtener_estadisticas():
+    """
+    Conteos por clase (incluye subclases, ej: Usuario = Estudiantes + Docentes),
+    préstamos por estado del libro y desgloses por carrera y departamento.
+    Se leen de contadores incrementales, sin recorrer la ontología.
+    `cerrojo` resume las esperas por el cerrojo de lectura/escritura.
+    """
+    return {**estadisticas.resumen(), "generacion": generacion, "cerrojo": cerrojo_onto.metricas()}
+
+# 4c. Métricas (Prometheus)
+
+def _contar_individuos():
+    with _lectura():
+        return onto.world.graph.execute(
+            "SELECT COUNT(*) FROM objs WHERE p=? AND o=? AND c=?", (rdf_type, owl_named_individual, onto.graph.c)
+        ).fetchone()[0]
+
+def _contar_tripletas():
+    with _lectura():
+        return onto.world.graph.execute(
+            "SELECT (SELECT COUNT(*) FROM objs WHERE c=?1) + (SELECT COUNT(*) FROM datas WHERE c=?1)", (onto.graph.c,)
+        ).fetchone()[0]
+
+metricas.medidor("individuos", "Individuos en la ontología.", _contar_individuos)
+metricas.medidor("tripletas", "Tripletas de la ontología en el quadstore.", _contar_tripletas)
+metricas.medidor("generacion", "Generación de escritura (mutaciones aplicadas).", lambda: generacion)
+metricas.medidor("cambios_suscriptores", "Conexiones abiertas a GET /cambios.", lambda: cambios.suscriptores)
+
+@app.get("/metrics")
+def exportar_metricas():
+    """
+    Latencia y conteo por ruta, duración de las fases internas (consulta,
+    recorrido, serializacion, persistencia, remoto) y tamaño de la ontología,
+    en el formato de texto de Prometheus. Con varios workers cada proceso
+    expone solo sus propias métricas.
+    """
+    return Response(metricas.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# 4d. Exportación
+
+@app.get("/export")
+def exportar(format: str = Query("ntriples", description="Formato del volcado: ntriples")):
+    """
+    Vuelca la ontología completa (T-Box y A-Box) en N-Triples, leída por
+    páginas directamente del quadstore. El cerrojo de lectura se toma por
+    página, así que una escritura concurrente puede quedar a medias en el
+    volcado; para una copia consistente se usa la instantánea.
+    """
+    if format != "ntriples":
+        raise HTTPException(status_code=400, detail=f"Formato '{format}' no soportado. Opciones: ntriples")
+    return StreamingResponse(_bajo_lectura(instantanea.ntriples(onto)), media_type="application/n-triples",
+                             headers={"Content-Disposition": 'attachment; filename="biblioteca.nt"'})
+
+# 4e. Cambios en vivo (SSE)
+
+_vigilancia = None
+
+async def _vigilar_procesos():
+    # Un worker que solo atiende /cambios no recibe peticiones que lo pongan
+    # al día (ver sincronizar_procesos): mientras haya suscriptores se revisa
+    # la secuencia compartida por su cuenta
+    while True:
+        await asyncio.sleep(1)
+        if cambios.suscriptores and bitacora.secuencia() != generacion:
+            try:
+                await run_in_threadpool(_ponerse_al_dia)
+            except Exception as e:
+                print(f"No se pudo aplicar la bitácora compartida: {e}")
+
+@app.get("/cambios")
+async def feed_cambios(
+    request: Request,
+    ultimo_evento: Optional[str] = Query(None, description="ID del último evento recibido (alternativa a Last-Event-ID)"),
+):
+    """
+    Flujo Server-Sent Events con un evento `cambio` por mutación (crear,
+    dato, relación, carga masiva y SPARQL): op, entidad, clase, propiedad,
+    valor y generación. Al reconectar, EventSource envía Last-Event-ID y se
+    reanuda desde el evento siguiente mientras siga en el buffer
+    (BIBLIOTECA_CAMBIOS_BUFFER); si no, llega un evento `reinicio` y hay
+    que volver a pedir los listados.
+    """
+    global _vigilancia
+    if MULTIPROCESO and (_vigilancia is None or _vigilancia.done()):
+        _vigilancia = asyncio.create_task(_vigilar_procesos())
+    ultimo_id = request.headers.get("last-event-id") or ultimo_evento
+    return StreamingResponse(cambios.suscribir(ultimo_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # 5. Endpoint SPARQL
+
+def _resolver_parametros(parametros):
+    resueltos = []
+    for p in parametros:
+        if isinstance(p, dict) and "entidad" in p:
+            resueltos.append(get_thing(p["entidad"]))
+        elif isinstance(p, dict) and "iri" in p:
+            entidad = default_world[p["iri"]]
+            if entidad is None:
+                raise HTTPException(404, f"IRI '{p['iri']}' no encontrado.")
+            resueltos.append(entidad)
+        else:
+            resueltos.append(p)
+    return resueltos
+
+def _aplicar_sparql(query: str, parametros: list):
+    """Ejecuta una consulta de modificación (INSERT/DELETE) sobre la ontología."""
+    preparada, _ = consultas_preparadas.obtener(query)
+    with onto:
+        resultado = preparada.execute(_resolver_parametros(parametros))
+    # Único camino que puede tocar el T-Box (etiquetas de clases y propiedades)
+    # y cambiar datos y relaciones de muchos individuos a la vez: se
+    # reconstruyen todos los índices, igual que al arrancar
+    _construir_indices()
+    return resultado
+
+_APLICADORES["sparql"] = lambda e: _aplicar_sparql(e["query"], e["parametros"])
+
 @app.post("/consultar/sparql")
-def consultar_sparql(consulta: SPARQLQuery):
+def consultar_sparql(consulta: SPARQLQuery, request: Request):
+    """
+    Ejecuta SPARQL con consultas preparadas (LRU por texto normalizado) y
+    caché de resultados invalidada por la generación de escritura. Los tiempos
+    de compilación y ejecución se informan en las cabeceras X-SPARQL-*.
+
+    Las filas se codifican como JSON (entidades -> {"iri", "nombre"}) y se
+    paginan con `limit`/`offset`, nunca más de MAX_FILAS_SPARQL por respuesta.
+    Cada consulta tiene un plazo de PLAZO_SPARQL_SEG segundos. Con `stream` o
+    Accept: application/x-ndjson las filas se envían una a una.
+    """
+    texto = normalizar_sparql(consulta.query)
     try:
-        # graph.query de owlready2
-        results = list(default_world.sparql(consulta.query))
-        return {"resultados": results}
+        preparada, ms_parse = consultas_preparadas.obtener(texto)
     except Exception as e:
         raise HTTPException(400, detail=str(e))
 
+    if not isinstance(preparada, PreparedSelectQuery):
+        # Modificaciones: se registran en la bitácora como cualquier escritura
+        inicio = time.perf_counter()
+        try:
+            with _mutacion():
+                _aplicar_sparql(texto, consulta.parametros)
+                seq = _anotar_mutacion({"op": "sparql", "query": texto, "parametros": consulta.parametros})
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(400, detail=str(e))
+        _sincronizar_bitacora(seq)
+        ms_exec = (time.perf_counter() - inicio) * 1000
+        return Response(b'{"resultados":[]}', media_type="application/json",
+                        headers=_cabeceras_sparql(ms_parse, ms_exec, "no"))
+
+    if consulta.offset < 0 or (consulta.limit is not None and consulta.limit < 1):
+        raise HTTPException(400, "limit debe ser >= 1 y offset >= 0")
+    limite = min(consulta.limit or MAX_FILAS_SPARQL, MAX_FILAS_SPARQL)
+    columnas = [c.lstrip("?") for c in preparada.column_names]
+    parametros = _resolver_parametros(consulta.parametros)
+    plazo = time.monotonic() + PLAZO_SPARQL_SEG
+
+    def filas():
+        resultados = presupuesto_sparql.ejecutar(preparada, parametros, plazo)
+        return itertools.islice(resultados, consulta.offset, None)
+
+    if consulta.stream or "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(_bajo_lectura(_stream_sparql(filas(), columnas, limite)), media_type="application/x-ndjson",
+                                 headers=_cabeceras_sparql(ms_parse, 0.0, "no"))
+
+    clave = (texto, json.dumps(consulta.parametros, sort_keys=True), limite, consulta.offset)
+    gen = generacion
+    cuerpo = cache_sparql.obtener(clave, gen)
+    if cuerpo is not None:
+        return Response(cuerpo, media_type="application/json", headers=_cabeceras_sparql(ms_parse, 0.0, "hit"))
+
+    inicio = time.perf_counter()
+    try:
+        with _lectura(), metricas.fase("consulta"):
+            pagina = [codificar_fila(f) for f in itertools.islice(filas(), limite + 1)]
+    except sqlite3.OperationalError as e:
+        if str(e) == "interrupted":
+            raise HTTPException(408, f"La consulta superó el plazo de {PLAZO_SPARQL_SEG:g} s")
+        raise HTTPException(400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(400, detail=str(e))
+    ms_exec = (time.perf_counter() - inicio) * 1000
+
+    hay_mas = len(pagina) > limite
+    pagina = pagina[:limite]
+    with metricas.fase("serializacion"):
+        cuerpo = json.dumps({
+            "columnas": columnas,
+            "resultados": pagina,
+            "cantidad": len(pagina),
+            "offset": consulta.offset,
+            "siguiente_offset": consulta.offset + len(pagina) if hay_mas else None,
+        }, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    cache_sparql.guardar(clave, gen, cuerpo)
+    return Response(cuerpo, media_type="application/json", headers=_cabeceras_sparql(ms_parse, ms_exec, "miss"))
+
+def _stream_sparql(filas, columnas, limite):
+    """NDJSON: cabecera con columnas, una línea por fila y un cierre con el total."""
+    yield json.dumps({"columnas": columnas}, ensure_ascii=False) + "\n"
+    enviadas = 0
+    cierre = {}
+    try:
+        for fila in filas:
+            if enviadas == limite:
+                cierre["truncado"] = True
+                break
+            yield json.dumps(codificar_fila(fila), ensure_ascii=False) + "\n"
+            enviadas += 1
+    except sqlite3.OperationalError as e:
+        if str(e) == "interrupted":
+            cierre["error"] = f"La consulta superó el plazo de {PLAZO_SPARQL_SEG:g} s"
+        else:
+            cierre["error"] = str(e)
+    yield json.dumps({"filas": enviadas, **cierre}, ensure_ascii=False) + "\n"
+
+def _cabeceras_sparql(ms_parse, ms_exec, cache):
+    return {
+        "X-SPARQL-Parse-Ms": f"{ms_parse:.3f}",
+        "X-SPARQL-Exec-Ms": f"{ms_exec:.3f}",
+        "X-SPARQL-Cache": cache,
+    }
+
+
+
+class ParametrosListado:
+    """Parámetros comunes de paginación y proyección para los listados por clase."""
+    def __init__(
+        self,
+        request: Request,
+        limit: Optional[int] = Query(None, ge=1, le=1000, description="Tamaño de página; activa la paginación"),
+        cursor: Optional[str] = Query(None, description="Cursor 'siguiente_cursor' de la página anterior"),
+        fields: Optional[str] = Query(None, description="Propiedades a incluir, separadas por coma (ej: titulo,estado_libro)"),
+        stream: bool = Query(False, description="Transmite un arreglo JSON a medida que se construye"),
+    ):
+        self.limite = limit
+        self.cursor = cursor
+        self.campos = [c.strip() for c in fields.split(",") if c.strip()] if fields else None
+        self.if_none_match = request.headers.get("if-none-match")
+
+        # Modo streaming: NDJSON si el cliente lo pide por Accept, arreglo JSON con ?stream=1
+        if "application/x-ndjson" in request.headers.get("accept", ""):
+            self.stream = "ndjson"
+        elif stream:
+            self.stream = "json"
+        else:
+            self.stream = None
+
+    @property
+    def paginado(self):
+        return self.limite is not None or self.cursor is not None
 
 
-def obtener_detalles_instancias(nombre_clase: str):
+TAMANO_PAGINA_DEFECTO = 50
+
+def _codificar_cursor(storid: int) -> str:
+    return base64.urlsafe_b64encode(str(storid).encode()).decode().rstrip("=")
+
+def _decodificar_cursor(cursor: str) -> int:
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(cursor + relleno).decode())
+    except Exception:
+        raise HTTPException(400, "Cursor inválido")
+
+def _stream_ndjson(storids, campos):
+    for s in storids:
+        yield json.dumps(_detalle_instancia(s, campos), ensure_ascii=False) + "\n"
+
+def _stream_arreglo_json(storids, campos):
+    yield "["
+    separador = ""
+    for s in storids:
+        yield separador + json.dumps(_detalle_instancia(s, campos), ensure_ascii=False)
+        separador = ","
+    yield "]"
+
+def _detalle_instancia(storid: int, campos=None):
+    """Formatea los datos y relaciones de un individuo (desde el modelo de lectura) como JSON limpio."""
+    registro = modelo_lectura.registro(storid)
+    if campos is None:
+        datos = {k: list(v) for k, v in registro.datos}
+        relaciones = {k: list(v) for k, v in registro.relaciones}
+    else:
+        datos = {k: list(v) for k, v in registro.datos if k in campos}
+        relaciones = {k: list(v) for k, v in registro.relaciones if k in campos}
+
+    return {
+        "id": registro.nombre,
+        "tipo": registro.clase, # La clase más específica
+        "datos": datos,
+        "relaciones": relaciones
+    }
+
+def _validar_campos(campos):
+    if campos:
+        desconocidos = [c for c in campos if not isinstance(onto[c], (DataPropertyClass, ObjectPropertyClass))]
+        if desconocidos:
+            raise HTTPException(400, f"Propiedades desconocidas: {', '.join(desconocidos)}")
+
+def obtener_detalles_instancias(nombre_clase: str, listado: ParametrosListado = None):
     """
     Función auxiliar que recupera todas las instancias de una clase
     y formatea sus datos y relaciones para devolver JSON limpio.
+    Con `limit`/`cursor` devuelve una página ordenada y el cursor siguiente.
+    Las respuestas no transmitidas se sirven desde la caché versionada.
     """
+    if listado is None:
+        return _listar_instancias(nombre_clase)
+
+    if listado.stream:
+        # Cada individuo se serializa y envía apenas se construye (memoria constante).
+        # `cursor` permite reanudar una exportación y `limit` acota el total.
+        clase = onto[nombre_clase]
+        campos = listado.campos
+        _validar_campos(campos)
+        storids = ()
+        if clase:
+            despues_de = _decodificar_cursor(listado.cursor) if listado.cursor else 0
+            storids = indice_tipos.iterar(clase, despues_de)
+            if listado.limite:
+                storids = itertools.islice(storids, listado.limite)
+        if listado.stream == "ndjson":
+            return StreamingResponse(_bajo_lectura(_stream_ndjson(storids, campos)), media_type="application/x-ndjson")
+        return StreamingResponse(_bajo_lectura(_stream_arreglo_json(storids, campos)), media_type="application/json")
+
+    clave = ("clase", nombre_clase, listado.limite, listado.cursor, tuple(listado.campos or ()))
+    return _respuesta_cacheada(clave, listado.if_none_match, lambda: _listar_instancias(nombre_clase, listado))
+
+def _listar_instancias(nombre_clase: str, listado: ParametrosListado = None):
     clase = onto[nombre_clase]
+    campos = listado.campos if listado else None
+    _validar_campos(campos)
+
+    if not (listado and listado.paginado):
+        if not clase:
+            return []
+        # El índice de tipos ya incluye las instancias heredadas
+        with metricas.fase("recorrido"):
+            return [_detalle_instancia(s, campos) for s in indice_tipos.iterar(clase)]
+
     if not clase:
-        return []
+        return {"cantidad": 0, "resultados": [], "siguiente_cursor": None}
 
-    resultados = []
-    
-    # .instances() obtiene las instancias directas y heredadas
-    for ind in clase.instances():
-        datos = {}
-        relaciones = {}
-        
-        # Extraemos propiedades dinámicamente
-        for prop in ind.get_properties():
-            valores = prop[ind]
-            # Formateo seguro para JSON
-            valores_limpios = [v.name if hasattr(v, 'name') else str(v) for v in valores]
-            
-            # Separar Data vs Object properties
-            if isinstance(prop, ObjectPropertyClass):
-                relaciones[prop.python_name] = valores_limpios
-            else:
-                datos[prop.python_name] = valores_limpios
-        
-        resultados.append({
-            "id": ind.name,
-            "tipo": ind.is_a[0].name, # La clase más específica
-            "datos": datos,
-            "relaciones": relaciones
-        })
-        
-    return resultados
+    limite = listado.limite or TAMANO_PAGINA_DEFECTO
+    despues_de = _decodificar_cursor(listado.cursor) if listado.cursor else 0
+    with metricas.fase("consulta"):
+        storids = indice_tipos.pagina(clase, limite + 1, despues_de)
+
+    hay_mas = len(storids) > limite
+    storids = storids[:limite]
+    with metricas.fase("recorrido"):
+        resultados = [_detalle_instancia(s, campos) for s in storids]
+
+    return {
+        "cantidad": len(resultados),
+        "resultados": resultados,
+        "siguiente_cursor": _codificar_cursor(storids[-1]) if hay_mas else None,
+    }
 
 # --- Endpoints GET Específicos ---
 
 @app.get("/libros")
-def obtener_todos_los_libros():
+def obtener_todos_los_libros(listado: ParametrosListado = Depends()):
     """Devuelve todos los libros con autores y editoriales."""
-    return obtener_detalles_instancias("Libro")
+    return obtener_detalles_instancias("Libro", listado)
 
 @app.get("/revistas")
-def obtener_todas_las_revistas():
+def obtener_todas_las_revistas(listado: ParametrosListado = Depends()):
     """Devuelve todas las revistas."""
-    return obtener_detalles_instancias("Revista")
+    return obtener_detalles_instancias("Revista", listado)
 
 @app.get("/usuarios")
-def obtener_todos_los_usuarios():
+def obtener_todos_los_usuarios(listado: ParametrosListado = Depends()):
     """
     Devuelve TODOS los usuarios (incluye Estudiantes y Docentes 
     porque son subclases de Usuario).
     """
-    return obtener_detalles_instancias("Usuario")
+    return obtener_detalles_instancias("Usuario", listado)
 
 @app.get("/estudiantes")
-def obtener_estudiantes():
+def obtener_estudiantes(listado: ParametrosListado = Depends()):
     """Devuelve solo los estudiantes."""
-    return obtener_detalles_instancias("Estudiante")
+    return obtener_detalles_instancias("Estudiante", listado)
 
 @app.get("/docentes")
-def obtener_docentes():
+def obtener_docentes(listado: ParametrosListado = Depends()):
     """Devuelve solo los docentes."""
-    return obtener_detalles_instancias("Docente")
+    return obtener_detalles_instancias("Docente", listado)
 
 @app.get("/bibliotecarios")
-def obtener_bibliotecarios():
+def obtener_bibliotecarios(listado: ParametrosListado = Depends()):
     """Devuelve el personal bibliotecario."""
-    return obtener_detalles_instancias("Bibliotecario")
+    return obtener_detalles_instancias("Bibliotecario", listado)
 
 @app.get("/editoriales")
-def obtener_editoriales():
+def obtener_editoriales(listado: ParametrosListado = Depends()):
     """Devuelve las editoriales y qué libros han publicado."""
-    return obtener_detalles_instancias("Editorial")
-
-
-
-
-
-
-
-
+    return obtener_detalles_instancias("Editorial", listado)
 
+# --- Circulación (índice de préstamos) ---
+# Las respuestas dependen solo del tamaño de la página, no del catálogo.
 
+def _pagina_individuos(storids, hay_mas, total, campos):
+    with metricas.fase("recorrido"):
+        resultados = [_detalle_instancia(s, campos) for s in storids]
+    return {
+        "cantidad": len(resultados),
+        "total": total,
+        "resultados": resultados,
+        "siguiente_cursor": _codificar_cursor(storids[-1]) if hay_mas else None,
+    }
 
+def _campos_circulacion(fields: Optional[str]):
+    campos = [c.strip() for c in fields.split(",") if c.strip()] if fields else None
+    _validar_campos(campos)
+    return campos
+
+@app.get("/prestamos")
+def listar_prestamos(
+    request: Request,
+    libro: Optional[str] = Query(None, description="Solo los préstamos de este libro (quién lo tiene)"),
+    limit: int = Query(TAMANO_PAGINA_DEFECTO, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Cursor 'siguiente_cursor' de la página anterior"),
+):
+    """Préstamos vigentes (usuario, libro), paginados por cursor."""
+    despues_de = _decodificar_cursor(cursor) if cursor else 0
+    return _respuesta_cacheada(
+        ("prestamos", libro, limit, despues_de), request.headers.get("if-none-match"),
+        lambda: _listar_prestamos(libro, limit, despues_de),
+    )
+
+def _listar_prestamos(libro: Optional[str], limite: int, despues_de: int):
+    id_libro = get_thing(libro).storid if libro else None
+    with metricas.fase("consulta"):
+        pares, hay_mas, total = indice_prestamos.prestamos(despues_de, limite, id_libro)
+    with metricas.fase("recorrido"):
+        nombre = modelo_lectura.nombre
+        resultados = [{"usuario": nombre(u), "libro": nombre(l)} for u, l in pares]
+    siguiente = None
+    if hay_mas:
+        siguiente = _codificar_cursor(IndicePrestamos.cursor_prestamo(*pares[-1], por_libro=libro is not None))
+    return {"cantidad": len(resultados), "total": total, "resultados": resultados, "siguiente_cursor": siguiente}
+
+@app.get("/libros/disponibles")
+def listar_libros_disponibles(
+    request: Request,
+    estado: str = Query("Disponible", description="Valor de estado_libro (ej: Prestado)"),
+    limit: int = Query(TAMANO_PAGINA_DEFECTO, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Cursor 'siguiente_cursor' de la página anterior"),
+    fields: Optional[str] = Query(None, description="Propiedades a incluir, separadas por coma"),
+):
+    """Libros con el `estado_libro` indicado (por defecto, los disponibles)."""
+    despues_de = _decodificar_cursor(cursor) if cursor else 0
+    campos = _campos_circulacion(fields)
+
+    def construir():
+        with metricas.fase("consulta"):
+            pagina = indice_prestamos.libros_en_estado(estado, despues_de, limit)
+        return _pagina_individuos(*pagina, campos)
+
+    return _respuesta_cacheada(
+        ("libros_estado", estado, limit, despues_de, tuple(campos or ())), request.headers.get("if-none-match"), construir,
+    )
+
+@app.get("/usuarios/{id}/prestamos")
+def listar_prestamos_usuario(
+    id: str,
+    request: Request,
+    limit: int = Query(TAMANO_PAGINA_DEFECTO, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Cursor 'siguiente_cursor' de la página anterior"),
+    fields: Optional[str] = Query(None, description="Propiedades a incluir, separadas por coma"),
+):
+    """Libros que tiene prestados el usuario."""
+    despues_de = _decodificar_cursor(cursor) if cursor else 0
+    campos = _campos_circulacion(fields)
+
+    def construir():
+        usuario = get_thing(id)
+        with metricas.fase("consulta"):
+            pagina = indice_prestamos.libros_de(usuario.storid, despues_de, limit)
+        return _pagina_individuos(*pagina, campos)
+
+    return _respuesta_cacheada(
+        ("prestamos_usuario", id, limit, despues_de, tuple(campos or ())), request.headers.get("if-none-match"), construir,
+    )
 
 # --- ENDPOINT MAESTRO DE BÚSQUEDA (FACETED SEARCH) ---
 # --- LÓGICA DE BÚSQUEDA INTERNA (Helper Function) ---
@@ -408,138 +1435,172 @@ def _buscar_en_local(query_str: str, clase_filtro: str = None):
     resultados = []
     q = query_str.lower()
     
-    # 1. Definir alcance
-    if clase_filtro and onto[clase_filtro]:
-        scope = onto[clase_filtro].instances()
-    else:
-        scope = onto.individuals()
+    with _lectura():
+        # 1. Definir alcance
+        nombres = None
+        if clase_filtro and onto[clase_filtro]:
+            nombres = (modelo_lectura.nombre(s) for s in indice_tipos.iterar(onto[clase_filtro]))
 
-    # 2. Iterar y buscar
-    for ind in scope:
-        match_found = False
-        match_details = ""
+        # 2. Buscar en el índice: solo se verifican los candidatos
+        #    (prioridad: ID, luego etiquetas, luego propiedades)
+        with metricas.fase("consulta"):
+            coincidencias = list(indice_busqueda.buscar(q, nombres))
+
+        with metricas.fase("recorrido"):
+            for nombre, match_details in coincidencias:
+                resultados.append(_resultado_local(modelo_lectura.storid(nombre), match_details))
 
-        # A. ID
-        if q in ind.name.lower():
-            match_found = True
-            match_details = "Coincidencia en ID"
-        
-        # B. Labels
-        if not match_found and hasattr(ind, "label"):
-            for lbl in ind.label:
-                if q in lbl.lower():
-                    match_found = True
-                    match_details = f"Coincidencia en etiqueta: {lbl}"
-                    break
-        
-        # C. Propiedades
-        if not match_found:
-            props_texto = ["titulo", "nombre", "descripcion", "carrera", "editorial", "autor"]
-            for prop_name in props_texto:
-                if hasattr(ind, prop_name):
-                    vals = getattr(ind, prop_name)
-                    for val in vals:
-                        if isinstance(val, str) and q in val.lower():
-                            match_found = True
-                            match_details = f"Coincidencia en {prop_name}: {val}"
-                            break
-                if match_found: break
-
-        if match_found:
-            display_name = ind.name
-            if hasattr(ind, "titulo") and ind.titulo: display_name = ind.titulo[0]
-            elif hasattr(ind, "nombre") and ind.nombre: display_name = ind.nombre[0]
-            elif ind.label: display_name = ind.label[0]
-
-            resultados.append({
-                "id": ind.name,
-                "tipo": ind.is_a[0].name,
-                "nombre_mostrar": display_name,
-                "descripcion": match_details,
-                "origen": "Local",   
-                "imagen": None       
-            })
-            
     return resultados
 
+def _resultado_local(storid, match_details):
+    registro = modelo_lectura.registro(storid)
+    display_name = registro.nombre
+    for prop in ("titulo", "nombre", "label"):
+        valores = registro.valores(prop)
+        if valores:
+            display_name = valores[0]
+            break
+
+    return {
+        "id": registro.nombre,
+        "tipo": registro.clase,
+        "nombre_mostrar": display_name,
+        "descripcion": match_details,
+        "origen": "Local",   
+        "imagen": None       
+    }
+
 # --- ENDPOINTS DE BÚSQUEDA ---
 
 @app.get("/buscador")
 def buscador_offline(q: str = Query(..., min_length=1), 
-                     clase: Optional[str] = Query(None)):
+                     clase: Optional[str] = Query(None),
+                     modo: str = Query("subcadena", pattern="^(subcadena|relevancia)$",
+                                       description="'subcadena' (todas las coincidencias) o 'relevancia' (BM25, las k mejores)"),
+                     k: int = Query(20, ge=1, le=MAX_RESULTADOS_RELEVANCIA)):
     """
     Modo Offline: Busca SOLO en el archivo .owl local.
+    Con modo=relevancia ignora tildes y mayúsculas y ordena por BM25.
     """
-    results = _buscar_en_local(q, clase)
+    if modo == "relevancia":
+        results = _buscar_por_relevancia(q, clase, k)
+    else:
+        results = _buscar_en_local(q, clase)
     return {"cantidad": len(results), "resultados": results}
 
+def _buscar_por_relevancia(q: str, clase_filtro: str, k: int):
+    with _lectura():
+        admitir = None
+        clase = onto[clase_filtro] if clase_filtro else None
+        if clase:
+            admitir = lambda s: indice_tipos.contiene(clase, s)
+
+        with metricas.fase("consulta"):
+            mejores = indice_relevancia.buscar(q, k, admitir)
+
+        with metricas.fase("recorrido"):
+            resultados = []
+            for storid, puntaje in mejores:
+                ind = onto.world._get_by_storid(storid)
+                resultado = _resultado_local(storid, indice_relevancia.detalle(ind, q))
+                resultado["puntaje"] = round(puntaje, 4)
+                resultados.append(resultado)
+    return resultados
+
+
+def _buscar_remoto(q: str, lang: str):
+    with metricas.fase("remoto"):
+        return cliente_dbpedia.buscar(q, lang)
+
+@app.get("/buscador/facetas")
+def buscador_facetado(
+    request: Request,
+    q: Optional[str] = Query(None, description="Texto a buscar (opcional)"),
+    clase: List[str] = Query([], description="Clase, incluye subclases (repetible)"),
+    carrera: List[str] = Query([]),
+    departamento: List[str] = Query([]),
+    pais_origen: List[str] = Query([]),
+    estado_libro: List[str] = Query([]),
+    anio_desde: Optional[int] = Query(None),
+    anio_hasta: Optional[int] = Query(None),
+    limit: int = Query(TAMANO_PAGINA_DEFECTO, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Cursor 'siguiente_cursor' de la página anterior"),
+):
+    """
+    Búsqueda facetada: combina el texto (opcional) con filtros por faceta.
+    Varios valores de una misma faceta se suman (O); facetas distintas se
+    intersecan (Y). Devuelve una página de resultados, el total y, en
+    `facetas`, cuántos resultados hay por cada valor de cada faceta
+    (`anio_publicacion` agrupado por década).
+    """
+    filtros = {f: tuple(sorted(set(v))) for f, v in [
+        ("clase", clase), ("carrera", carrera), ("departamento", departamento),
+        ("pais_origen", pais_origen), ("estado_libro", estado_libro),
+    ] if v}
+    despues_de = _decodificar_cursor(cursor) if cursor else -1
+    clave = ("facetas", q, tuple(sorted(filtros.items())), anio_desde, anio_hasta, limit, despues_de)
+    return _respuesta_cacheada(
+        clave, request.headers.get("if-none-match"),
+        lambda: _buscar_facetado(q, filtros, anio_desde, anio_hasta, limit, despues_de),
+    )
+
+def _buscar_facetado(q, filtros, anio_desde, anio_hasta, limite, despues_de):
+    detalles = None
+    with metricas.fase("consulta"):
+        if q:
+            # storid -> detalles de la coincidencia de texto
+            detalles = {}
+            for nombre, detalle in indice_busqueda.buscar(q.lower()):
+                s = modelo_lectura.storid(nombre)
+                if s is not None:
+                    detalles[s] = detalle
+        resultado = indice_facetas.filtrar(filtros, anio_desde, anio_hasta, detalles)
+        pagina, hay_mas = indice_facetas.pagina(resultado, despues_de, limite)
+        conteos = indice_facetas.conteos(resultado)
+    with metricas.fase("recorrido"):
+        resultados = [
+            _resultado_local(s, detalles.get(s) if detalles else None)
+            for _, s in pagina
+        ]
+    return {
+        "cantidad": resultado.bit_count(),
+        "resultados": resultados,
+        "facetas": conteos,
+        "siguiente_cursor": _codificar_cursor(pagina[-1][0]) if hay_mas else None,
+    }
 
 @app.get("/buscador/online")
-def buscador_hibrido(q: str = Query(..., min_length=2), 
-                     lang: str = Query("es", description="Idioma: 'es', 'en', 'qu', 'fr', 'de'")):
-    
+async def buscador_hibrido(q: str = Query(..., min_length=2), 
+                           lang: str = Query("es", description="Idioma: 'es', 'en', 'qu', 'fr', 'de'")):
+    """
+    Búsqueda local y en DBpedia en paralelo, bajo un plazo total. Los
+    resultados locales siempre se devuelven; si DBpedia no responde a tiempo
+    se omiten (la respuesta tardía queda en caché para la próxima búsqueda).
+    El campo `remoto` indica qué pasó con la parte online.
+    """
     print(f"--- Búsqueda Híbrida: '{q}' en idioma '{lang}' ---")
+    plazo = asyncio.get_running_loop().time() + PLAZO_BUSQUEDA_SEG
 
-    # 1. Búsqueda Local 
-    resultados_locales = _buscar_en_local(q) 
+    # 1. Búsqueda Online (DBpedia), lanzada en segundo plano
+    remota = asyncio.ensure_future(run_in_threadpool(_buscar_remoto, q, lang))
 
-    # 2. Búsqueda Online (DBpedia)
-    resultados_online = []
-    try:
-        sparql = SPARQLWrapper("http://dbpedia.org/sparql")
-        
-        # Consulta SPARQL
-        query = f"""
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        PREFIX dbo: <http://dbpedia.org/ontology/>
-        PREFIX bif: <bif:>
-
-        SELECT DISTINCT ?s ?label ?comment ?type ?img
-        WHERE {{
-          ?s rdfs:label ?label .
-          ?label bif:contains "'{q}'" . 
-          ?s a ?type .
-          
-          # --- FILTRO DE IDIOMA ---
-          FILTER (lang(?label) = '{lang}') 
-          
-          OPTIONAL {{ 
-            ?s rdfs:comment ?comment . 
-            FILTER (lang(?comment) = '{lang}') 
-          }}
-          OPTIONAL {{ ?s foaf:depiction ?img }}
-          
-          FILTER (?type IN (dbo:Person, dbo:Book, dbo:Organisation))
-        }}
-        LIMIT 10
-        """
-                
-        sparql.setQuery(query)
-        sparql.setReturnFormat(JSON)
-        sparql.setTimeout(15)
-        dbpedia_data = sparql.query().convert()
-        
-        for r in dbpedia_data["results"]["bindings"]:
-            tipo_raw = r["type"]["value"]
-            tipo_clean = tipo_raw.split('/')[-1]
-
-            resultados_online.append({
-                "id": r["s"]["value"],
-                "tipo": tipo_clean, 
-                "nombre_mostrar": r["label"]["value"],
-                "descripcion": r.get("comment", {}).get("value", "Sin descripción"),
-                "origen": "DBpedia", 
-                "imagen": r.get("img", {}).get("value", None)
-            })
-            
-    except Exception as e:
-        print(f"Error en DBpedia o sin conexión: {e}")
+    # 2. Búsqueda Local
+    resultados_locales = await run_in_threadpool(_buscar_en_local, q)
+
+    # 3. Esperar a DBpedia solo lo que quede del plazo
+    restante = plazo - asyncio.get_running_loop().time()
+    terminadas, _ = await asyncio.wait({remota}, timeout=max(0.0, restante))
+    if remota in terminadas:
+        resultados_online, estado_remoto = remota.result()
+    else:
+        resultados_online, estado_remoto = [], "plazo_agotado"
     
     total_resultados = resultados_locales + resultados_online
     
     return {
         "cantidad": len(total_resultados),
-        "resultados": total_resultados
+        "resultados": total_resultados,
+        "remoto": estado_remoto
     }
 
 
@@ -552,31 +1613,23 @@ def buscador_hibrido(q: str = Query(..., min_length=2),
 
 
 
+# --- Traducciones del esquema ---
+# Tablas precalculadas al arrancar: el T-Box solo cambia con SPARQL UPDATE,
+# así que se sirven desde memoria con ETag y caché larga en el cliente.
+
+def _respuesta_traduccion(tabla, if_none_match: Optional[str]):
+    cabeceras = {"ETag": tabla.etag, "Cache-Control": f"public, max-age={MAX_AGE_TRADUCCIONES_SEG}"}
+    if if_none_match and tabla.etag in [e.strip() for e in if_none_match.split(",")]:
+        return Response(status_code=304, headers=cabeceras)
+    return Response(tabla.cuerpo, media_type="application/json", headers=cabeceras)
+
 @app.get("/config/idioma/{lang_code}")
-def obtener_traducciones_schema(lang_code: str):
-    idiomas_soportados = ["es", "en", "qu", "fr", "de"]
-    
-    if lang_code not in idiomas_soportados:
-        raise HTTPException(400, f"Idioma no soportado. Use: {', '.join(idiomas_soportados)}")
-    
-    traducciones = {}
-    
-    # 1. Traducir nombres de Clases
-    for cls in onto.classes():
-        lbl = cls.label.get_by_lang(lang_code)
-        if lbl:
-            traducciones[cls.name] = lbl[0]
-        else:
-            lbl_es = cls.label.get_by_lang("es")
-            traducciones[cls.name] = lbl_es[0] if lbl_es else cls.name
-
-    # 2. Traducir nombres de Propiedades
-    for prop in onto.properties():
-        lbl = prop.label.get_by_lang(lang_code)
-        if lbl:
-            traducciones[prop.name] = lbl[0]
-        else:
-             lbl_es = prop.label.get_by_lang("es")
-             traducciones[prop.name] = lbl_es[0] if lbl_es else prop.name
-            
-    return traducciones
\ No newline at end of file
+def obtener_traducciones_schema(lang_code: str, request: Request):
+    if lang_code not in IDIOMAS_SOPORTADOS:
+        raise HTTPException(400, f"Idioma no soportado. Use: {', '.join(IDIOMAS_SOPORTADOS)}")
+    return _respuesta_traduccion(tablas_traduccion.idioma(lang_code), request.headers.get("if-none-match"))
+
+@app.get("/config/idiomas")
+def obtener_traducciones_todas(request: Request):
+    """Traducciones de todos los idiomas soportados en una sola respuesta: {lang: {nombre: etiqueta}}."""
+    return _respuesta_traduccion(tablas_traduccion.todas(), request.headers.get("if-none-match"))
@@ -0,0 +1,138 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Límites superiores (segundos) de las cubetas de los histogramas
+CUBETAS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Fases internas de una petición (también son los nombres en Server-Timing)
+FASES = ("consulta", "recorrido", "serializacion", "persistencia", "remoto")
+
+# Tiempos por fase de la petición en curso. Starlette copia el contexto al
+# threadpool y a las tareas, así que todos comparten el mismo diccionario.
+_fases_peticion: ContextVar = ContextVar("fases_peticion", default=None)
+
+
+class _Histograma:
+    __slots__ = ("cubetas", "suma", "cuenta")
+
+    def __init__(self):
+        self.cubetas = [0] * len(CUBETAS)   # no acumuladas; se acumulan al exportar
+        self.suma = 0.0
+        self.cuenta = 0
+
+    def observar(self, segundos: float):
+        i = bisect.bisect_left(CUBETAS, segundos)
+        if i < len(CUBETAS):
+            self.cubetas[i] += 1
+        self.suma += segundos
+        self.cuenta += 1
+
+    def exportar(self, nombre: str, etiquetas: str, lineas: list):
+        acumulado = 0
+        sep = "," if etiquetas else ""
+        for limite, n in zip(CUBETAS, self.cubetas):
+            acumulado += n
+            lineas.append(f'{nombre}_bucket{{{etiquetas}{sep}le="{limite:g}"}} {acumulado}')
+        lineas.append(f'{nombre}_bucket{{{etiquetas}{sep}le="+Inf"}} {self.cuenta}')
+        lineas.append(f"{nombre}_sum{{{etiquetas}}} {self.suma:.6f}")
+        lineas.append(f"{nombre}_count{{{etiquetas}}} {self.cuenta}")
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metricas:
+    """
+    Latencia y conteo de peticiones por ruta, duración de las fases internas
+    (`fase()`) y medidores calculados al exportar, en el formato de texto de
+    Prometheus. Las rutas se etiquetan con su plantilla (/individuos/{nombre}),
+    no con la URL concreta, para acotar la cardinalidad.
+    """
+
+    def __init__(self, prefijo: str = "biblioteca"):
+        self.prefijo = prefijo
+        self._lock = threading.Lock()
+        self._peticiones = {}     # (metodo, ruta, estado) -> cantidad
+        self._latencias = {}      # (metodo, ruta) -> _Histograma
+        self._fases = {}          # fase -> _Histograma
+        self._medidores = []      # (nombre, ayuda, funcion)
+
+    # --- Peticiones ---
+
+    def iniciar_peticion(self) -> dict:
+        """Abre el registro de fases de la petición en curso y lo devuelve."""
+        fases = {}
+        _fases_peticion.set(fases)
+        return fases
+
+    def registrar_peticion(self, metodo: str, ruta: str, estado: int, segundos: float):
+        with self._lock:
+            clave = (metodo, ruta, estado)
+            self._peticiones[clave] = self._peticiones.get(clave, 0) + 1
+            hist = self._latencias.get((metodo, ruta))
+            if hist is None:
+                hist = self._latencias[(metodo, ruta)] = _Histograma()
+            hist.observar(segundos)
+
+    # --- Fases ---
+
+    @contextmanager
+    def fase(self, nombre: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_fase(nombre, time.perf_counter() - inicio)
+
+    def registrar_fase(self, nombre: str, segundos: float):
+        fases = _fases_peticion.get()
+        if fases is not None:
+            fases[nombre] = fases.get(nombre, 0.0) + segundos
+        with self._lock:
+            hist = self._fases.get(nombre)
+            if hist is None:
+                hist = self._fases[nombre] = _Histograma()
+            hist.observar(segundos)
+
+    @staticmethod
+    def server_timing(fases: dict, total: float) -> str:
+        partes = [f"{nombre};dur={seg * 1000:.3f}" for nombre, seg in fases.items()]
+        partes.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(partes)
+
+    # --- Medidores ---
+
+    def medidor(self, nombre: str, ayuda: str, funcion):
+        """Registra un medidor cuyo valor se obtiene con `funcion()` al exportar."""
+        self._medidores.append((nombre, ayuda, funcion))
+
+    # --- Exportación ---
+
+    def exportar(self) -> str:
+        p = self.prefijo
+        lineas = []
+        with self._lock:
+            lineas.append(f"# HELP {p}_peticiones_total Peticiones HTTP atendidas.")
+            lineas.append(f"# TYPE {p}_peticiones_total counter")
+            for (metodo, ruta, estado), n in sorted(self._peticiones.items()):
+                lineas.append(f'{p}_peticiones_total{{metodo="{metodo}",ruta="{_escapar(ruta)}",estado="{estado}"}} {n}')
+
+            lineas.append(f"# HELP {p}_peticion_segundos Latencia de las peticiones HTTP hasta enviar las cabeceras.")
+            lineas.append(f"# TYPE {p}_peticion_segundos histogram")
+            for (metodo, ruta), hist in sorted(self._latencias.items()):
+                hist.exportar(f"{p}_peticion_segundos", f'metodo="{metodo}",ruta="{_escapar(ruta)}"', lineas)
+
+            lineas.append(f"# HELP {p}_fase_segundos Duración de las fases internas de las peticiones.")
+            lineas.append(f"# TYPE {p}_fase_segundos histogram")
+            for fase, hist in sorted(self._fases.items()):
+                hist.exportar(f"{p}_fase_segundos", f'fase="{fase}"', lineas)
+
+        for nombre, ayuda, funcion in self._medidores:
+            lineas.append(f"# HELP {p}_{nombre} {ayuda}")
+            lineas.append(f"# TYPE {p}_{nombre} gauge")
+            lineas.append(f"{p}_{nombre} {funcion()}")
+        return "\n".join(lineas) + "\n"
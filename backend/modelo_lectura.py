@@ -0,0 +1,165 @@
+import sys
+import threading
+
+from owlready2 import ObjectPropertyClass, rdf_type, owl_named_individual
+from owlready2.base import _universal_datatype_2_abbrev
+
+# Datatype de los literales de texto sin idioma (xsd:string)
+_XSD_STRING = _universal_datatype_2_abbrev[str]
+
+
+class Registro:
+    """
+    Proyección de lectura de un individuo. `datos` y `relaciones` son tuplas
+    de (propiedad, tuple(valores)) con los valores ya convertidos a texto
+    (datos) o al nombre del individuo destino (relaciones); las propiedades
+    y los valores repetidos se comparten entre registros.
+    """
+    __slots__ = ("nombre", "clase", "datos", "relaciones")
+
+    def __init__(self, nombre, clase, datos, relaciones):
+        self.nombre = nombre
+        self.clase = clase
+        self.datos = datos
+        self.relaciones = relaciones
+
+    def valores(self, propiedad: str):
+        for nombre, valores in self.datos:
+            if nombre == propiedad:
+                return valores
+        for nombre, valores in self.relaciones:
+            if nombre == propiedad:
+                return valores
+        return ()
+
+
+class ModeloLectura:
+    """
+    Modelo de lectura compacto: un `Registro` por individuo, con el mismo
+    contenido que devolvería recorrer `ind.get_properties()` y `prop[ind]`,
+    pero leído una sola vez.
+
+    Se construye al arrancar con dos pasadas sobre las tablas `datas` y
+    `objs` del quadstore; las escrituras (crear, dato, relación) llaman a
+    `actualizar(ind)`, que relee solo las filas de ese individuo, y las
+    modificaciones SPARQL lo reconstruyen. Así, las lecturas no tocan el
+    quadstore ni crean objetos de owlready.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._onto = None
+        self._registros = {}        # storid -> Registro
+        self._por_nombre = {}       # nombre -> storid
+        self._propiedades = {}      # storid de la propiedad -> (nombre, es_relacion) o None
+        self._entidades = {}        # storid de clase u otra entidad -> nombre
+
+    # --- Construcción ---
+
+    def _propiedad(self, p):
+        if p not in self._propiedades:
+            prop = self._onto.world._get_by_storid(p)
+            self._propiedades[p] = None if prop is None else (sys.intern(prop.python_name), isinstance(prop, ObjectPropertyClass))
+        return self._propiedades[p]
+
+    def _nombre_entidad(self, storid):
+        registro = self._registros.get(storid)
+        if registro is not None:
+            return registro.nombre
+        nombre = self._entidades.get(storid)
+        if nombre is None:
+            entidad = self._onto.world._get_by_storid(storid)
+            nombre = self._entidades[storid] = sys.intern(getattr(entidad, "name", str(entidad)))
+        return nombre
+
+    def _texto(self, o, d):
+        # Los textos (con o sin idioma) ya se guardan tal cual; el resto pasa
+        # por la conversión de owlready para que str() coincida con prop[ind]
+        if type(o) is str and (d == _XSD_STRING or isinstance(d, str)):
+            return sys.intern(o)
+        return sys.intern(str(self._onto.world._to_python(o, d)))
+
+    def _registro(self, nombre, clase, filas_datos, filas_objs):
+        datos = {}
+        relaciones = {}
+        for p, o, d in filas_datos:
+            info = self._propiedad(p)
+            if info is not None:
+                datos.setdefault(info[0], []).append(self._texto(o, d))
+        for p, o in filas_objs:
+            info = self._propiedad(p)
+            if info is not None:
+                (relaciones if info[1] else datos).setdefault(info[0], []).append(self._nombre_entidad(o))
+        return Registro(
+            nombre, clase,
+            tuple((k, tuple(v)) for k, v in datos.items()),
+            tuple((k, tuple(v)) for k, v in relaciones.items()),
+        )
+
+    def _nombre(self, iri: str) -> str:
+        base = self._onto.base_iri
+        return sys.intern(iri[len(base):] if iri.startswith(base) else iri.rsplit("#", 1)[-1].rsplit("/", 1)[-1])
+
+    def construir(self, onto):
+        grafo = onto.world.graph
+        c = onto.graph.c
+        with self._lock:
+            self._onto = onto
+            self._propiedades = {rdf_type: None}
+            self._entidades = {}
+
+            nombres = {s: self._nombre(iri) for s, iri in grafo.execute(
+                "SELECT q.s, r.iri FROM objs q JOIN resources r ON r.storid=q.s "
+                "WHERE q.c=? AND q.p=? AND q.o=? ORDER BY q.s", (c, rdf_type, owl_named_individual))}
+            clases = {}
+            datos = {s: [] for s in nombres}
+            objs = {s: [] for s in nombres}
+            for s, p, o in grafo.execute("SELECT s, p, o FROM objs WHERE c=?", (c,)):
+                if s not in nombres:
+                    continue
+                if p == rdf_type:
+                    if o != owl_named_individual and s not in clases:
+                        clases[s] = self._nombre_entidad(o)
+                else:
+                    objs[s].append((p, o))
+            for s, p, o, d in grafo.execute("SELECT s, p, o, d FROM datas WHERE c=?", (c,)):
+                filas = datos.get(s)
+                if filas is not None:
+                    filas.append((p, o, d))
+
+            # Los nombres se registran antes para que las relaciones los compartan
+            self._registros = {s: Registro(nombre, None, (), ()) for s, nombre in nombres.items()}
+            self._por_nombre = {nombre: s for s, nombre in nombres.items()}
+            for s, nombre in nombres.items():
+                self._registros[s] = self._registro(nombre, clases.get(s), datos[s], objs[s])
+
+    def actualizar(self, ind):
+        """Relee del quadstore las filas de `ind` y reemplaza su registro."""
+        grafo = self._onto.world.graph
+        c = self._onto.graph.c
+        with self._lock:
+            s = ind.storid
+            clase = None
+            objs = []
+            for p, o in grafo.execute("SELECT p, o FROM objs WHERE c=? AND s=?", (c, s)):
+                if p == rdf_type:
+                    if o != owl_named_individual and clase is None:
+                        clase = self._nombre_entidad(o)
+                else:
+                    objs.append((p, o))
+            datos = grafo.execute("SELECT p, o, d FROM datas WHERE c=? AND s=?", (c, s)).fetchall()
+            nombre = sys.intern(ind.name)
+            self._registros[s] = self._registro(nombre, clase, datos, objs)
+            self._por_nombre[nombre] = s
+
+    # --- Consultas ---
+
+    def registro(self, storid: int):
+        return self._registros.get(storid)
+
+    def storid(self, nombre: str):
+        return self._por_nombre.get(nombre)
+
+    def nombre(self, storid: int) -> str:
+        registro = self._registros.get(storid)
+        return registro.nombre if registro is not None else self._nombre_entidad(storid)
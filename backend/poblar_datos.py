@@ -1,33 +1,64 @@
+"""
+Poblado de la ontología con datos de prueba (sin conexión por defecto).
+
+Uso (desde /backend, con biblioteca.owl ya generado por main.py):
+    python poblar_datos.py                                    # catálogo demo
+    python poblar_datos.py --dbpedia                          # títulos reales de DBpedia
+    python poblar_datos.py --libros 700000 --estudiantes 250000 --docentes 40000 \\
+        --autores 150000 --editoriales 2000 --procesos 8 --sqlite biblioteca.sqlite3
+    python poblar_datos.py ... --reanudar                     # continúa desde el último checkpoint
+
+Los valores se generan en bloques de TAMANO_BLOQUE individuos, cada uno con su
+propio generador derivado de (semilla, fase, bloque). Con la misma semilla y
+los mismos parámetros el resultado es idéntico sin importar el número de
+procesos ni las reanudaciones (salvo con --dbpedia, que depende de la red).
+Cada --checkpoint-cada individuos se persiste la ontología y el progreso.
+"""
+import argparse
+import bisect
+import json
+import math
+import multiprocessing
+import os
 import random
 import time
 from owlready2 import *
 from SPARQLWrapper import SPARQLWrapper, JSON
 from faker import Faker
 
-CANTIDAD_LIBROS_DBPEDIA = 200  
+from bitacora import guardar_archivo_atomico
+import quadstore
+
+# Valores por defecto (catálogo demo)
+CANTIDAD_LIBROS = 200
+CANTIDAD_AUTORES = 120
+CANTIDAD_EDITORIALES = 15
 CANTIDAD_ESTUDIANTES = 100
 CANTIDAD_DOCENTES = 50
 CANTIDAD_BIBLIOTECARIOS = 20
-PROBABILIDAD_PRESTAMO = 0.7    
+PRESTAMOS_POR_USUARIO = "poisson:0.7"
+LIBROS_POR_AUTOR = "zipf:1.1"
+MAX_PRESTAMOS = 10
+
+TAMANO_BLOQUE = 1000
+CHECKPOINT_CADA = 100000
 
 ONTO_FILE = "biblioteca.owl"
 IRI_BASE = "http://uni.edu/biblioteca.owl#"
 
-fake = Faker('es_ES')
+CARRERAS = ["Sistemas", "Derecho", "Medicina", "Arquitectura", "Psicologia", "Civil"]
+DEPARTAMENTOS = ["Exactas", "Humanidades", "Salud", "Tecnología"]
+TURNOS = ["Mañana", "Tarde", "Noche"]
 
-print(f"--- Cargando estructura base: {ONTO_FILE} ---")
-onto = get_ontology(ONTO_FILE).load()
+# Orden de creación: las relaciones solo apuntan a fases anteriores
+FASES = ["editoriales", "autores", "libros", "estudiantes", "docentes", "bibliotecarios"]
 
-def limpiar_texto(texto):
-    if not texto: return "Desconocido"
-    texto = texto.replace("á", "a").replace("é", "e").replace("í", "i").replace("ó", "o").replace("ú", "u")
-    texto = texto.replace("ñ", "n").replace("Ñ", "N")
-    return "".join(x for x in texto if x.isalnum())
+onto = None
 
 def obtener_libros_masivos(limite):
     print(f">>> Conectando a DBpedia para descargar {limite} libros...")
     sparql = SPARQLWrapper("http://es.dbpedia.org/sparql")
-    
+
     query = f"""
     PREFIX dbo: <http://dbpedia.org/ontology/>
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
@@ -37,27 +68,27 @@ def obtener_libros_masivos(limite):
       ?libro a dbo:Book ;
              rdfs:label ?titulo ;
              dbo:author ?aResource .
-      
+
       ?aResource rdfs:label ?autor .
-      
-      OPTIONAL {{ 
-        ?libro dbo:publisher ?eResource . 
+
+      OPTIONAL {{
+        ?libro dbo:publisher ?eResource .
         ?eResource rdfs:label ?editorial .
         OPTIONAL {{ ?eResource dbo:location ?pResource . ?pResource rdfs:label ?pais }}
       }}
-      
+
       FILTER (LANG(?titulo) = 'es')
       FILTER (LANG(?autor) = 'es')
     }}
     LIMIT {limite}
     """
-    
+
     try:
         sparql.setQuery(query)
         sparql.setReturnFormat(JSON)
-        sparql.setTimeout(30) 
+        sparql.setTimeout(30)
         results = sparql.query().convert()
-        
+
         datos = []
         for result in results["results"]["bindings"]:
             datos.append({
@@ -72,142 +103,314 @@ def obtener_libros_masivos(limite):
         print("!!! Se generarán libros sintéticos en su lugar.")
         return []
 
-def generar_libros_sinteticos(cantidad_faltante):
-    libros = []
-    for _ in range(cantidad_faltante):
-        libros.append({
-            "titulo": fake.catch_phrase().title(),
-            "autor": fake.name(),
-            "editorial": fake.company(),
-            "pais": fake.country()
-        })
-    return libros
+# --- Distribuciones ---
+
+def _parsear_distribucion(texto):
+    """'poisson:0.7', 'fijo:1', 'uniforme:0-3', 'zipf:1.1' -> (tipo, parámetros)."""
+    tipo, _, param = texto.partition(":")
+    try:
+        if tipo in ("poisson", "zipf"):
+            return tipo, (float(param),)
+        if tipo == "fijo":
+            return tipo, (int(param),)
+        if tipo == "uniforme":
+            if not param:
+                return tipo, ()
+            a, b = param.split("-")
+            return tipo, (int(a), int(b))
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(f"Distribución inválida: {texto!r}")
+
+def _distribucion_valida(texto):
+    _parsear_distribucion(texto)
+    return texto
+
+def _poisson(rnd, media):
+    # Knuth: suficiente para medias pequeñas como préstamos por usuario
+    limite = math.exp(-media)
+    k, p = 0, rnd.random()
+    while p > limite:
+        k += 1
+        p *= rnd.random()
+    return k
+
+def _cantidad_prestamos(rnd, dist):
+    tipo, param = dist
+    if tipo == "poisson":
+        n = _poisson(rnd, param[0])
+    elif tipo == "fijo":
+        n = param[0]
+    else:
+        n = rnd.randint(*(param or (0, 1)))
+    return min(n, MAX_PRESTAMOS)
+
+_PESOS_AUTORES = {}
+
+def _elegir_autor(rnd, dist, autores):
+    """Índice de autor de un libro según la distribución de libros por autor."""
+    tipo, param = dist
+    if tipo != "zipf":
+        return rnd.randrange(autores)
+    clave = (autores, param[0])
+    acumulados = _PESOS_AUTORES.get(clave)
+    if acumulados is None:
+        acumulados, total = [], 0.0
+        for k in range(1, autores + 1):
+            total += 1.0 / k ** param[0]
+            acumulados.append(total)
+        _PESOS_AUTORES[clave] = acumulados
+    return min(bisect.bisect(acumulados, rnd.random() * acumulados[-1]), autores - 1)
+
+# --- Generación de valores (se ejecuta en los procesos del pool) ---
+
+_fake = None
+
+def _generar_bloque(tarea):
+    """
+    Genera los valores de un bloque de una fase como tuplas simples (sin
+    tocar la ontología), para poder repartir el trabajo entre procesos.
+    """
+    global _fake
+    fase, bloque, inicio, fin, conf = tarea
+    rnd = random.Random(f"{conf['semilla']}:{fase}:{bloque}")
+    if _fake is None:
+        _fake = Faker("es_ES")
+    fake = _fake
+    fake.seed_instance(rnd.getrandbits(64))
+    filas = []
+
+    for i in range(inicio, fin):
+        if fase == "editoriales":
+            filas.append((fake.company(), fake.country()))
+        elif fase == "autores":
+            filas.append((fake.name(),))
+        elif fase == "libros":
+            filas.append((
+                fake.catch_phrase().title(),
+                rnd.randint(1950, 2023),
+                f"978-{i // 100000 % 10}-{i % 100000:05d}-{rnd.randrange(100):02d}-{rnd.randrange(10)}",
+                _elegir_autor(rnd, conf["libros_por_autor"], conf["autores"]),
+                rnd.randrange(conf["editoriales"]),
+            ))
+        elif fase in ("estudiantes", "docentes"):
+            prestamos = sorted({rnd.randrange(conf["libros"]) for _ in range(_cantidad_prestamos(rnd, conf["prestamos"]))}) \
+                if conf["libros"] else []
+            extra = rnd.choice(CARRERAS) if fase == "estudiantes" else rnd.choice(DEPARTAMENTOS)
+            filas.append((fake.name(), extra, prestamos))
+        else:
+            filas.append((fake.name(), rnd.choice(TURNOS)))
+    return fase, inicio, filas
+
+# --- Creación de individuos (proceso principal) ---
+
+def _nombre(fase, i):
+    prefijos = {
+        "editoriales": "Editorial", "autores": "Autor", "libros": "Libro",
+        "estudiantes": "Estudiante", "docentes": "Docente", "bibliotecarios": "Bibliotecario",
+    }
+    return f"{prefijos[fase]}_{i + 1}"
+
+def _crear_bloque(fase, inicio, filas, titulos_reales):
+    for desplazamiento, valores in enumerate(filas):
+        i = inicio + desplazamiento
+        nombre = _nombre(fase, i)
+
+        if fase == "editoriales":
+            edit = onto.Editorial(nombre)
+            edit.nombre = [valores[0]]
+            edit.pais_origen = [valores[1]]
+
+        elif fase == "autores":
+            autor = onto.Persona(nombre)
+            autor.nombre = [valores[0]]
+
+        elif fase == "libros":
+            titulo, anio, isbn, autor, editorial = valores
+            real = titulos_reales[i] if i < len(titulos_reales) else None
+            libro = onto.Libro(nombre)
+            libro.titulo = [real["titulo"] if real else titulo]
+            libro.anio_publicacion = [anio]
+            libro.isbn = [isbn]
+            libro.estado_libro = ["Disponible"]
+            if real:
+                libro.pais_origen = [real["pais"]]
+            onto[_nombre("autores", autor)].escribe.append(libro)
+            onto[_nombre("editoriales", editorial)].publica.append(libro)
+
+        elif fase in ("estudiantes", "docentes"):
+            nombre_persona, extra, prestamos = valores
+            if fase == "estudiantes":
+                usuario = onto.Estudiante(nombre)
+                usuario.codigo_sis = [str(20200000 + i)]
+                usuario.carrera = [extra]
+            else:
+                usuario = onto.Docente(nombre)
+                usuario.item_docente = [str(1000 + i)]
+                usuario.departamento = [extra]
+            usuario.nombre = [nombre_persona]
+            for k in prestamos:
+                # Usuario -> toma_prestado -> Libro
+                libro = onto[_nombre("libros", k)]
+                usuario.toma_prestado.append(libro)
+                libro.estado_libro = ["Prestado"]
+
+        else:
+            bib = onto.Bibliotecario(nombre)
+            bib.nombre = [valores[0]]
+            bib.turno = [valores[1]]
+            bib.id_empleado = [f"BIB-{i + 1:04d}"]
 
 def crear_datos_demo_garantizados():
     """
     Crea manualmente los datos para probar Quechua, Alemán y Francés.
     """
     print(">>> Creando datos DEMO multilingües (Arguedas, Kafka, etc)...")
-    
+
     # Referencias directas a clases
     Libro = onto.Libro
     Persona = onto.Persona
     Editorial = onto.Editorial
-    
+
     # 1. José María Arguedas (Quechua)
     aut_arguedas = Persona("autor_arguedas")
     aut_arguedas.nombre = ["José María Arguedas"]
-    
+
     l_yawar = Libro("libro_yawar_fiesta")
     l_yawar.titulo = ["Yawar Fiesta"]
     l_yawar.anio_publicacion = [1941]
     l_yawar.pais_origen = ["Perú"]
-    
-    aut_arguedas.escribe.append(l_yawar) 
+
+    aut_arguedas.escribe.append(l_yawar)
 
     # 2. Franz Kafka (Alemán)
     aut_kafka = Persona("autor_kafka")
     aut_kafka.nombre = ["Franz Kafka"]
-    
+
     l_meta = Libro("libro_metamorfosis")
     l_meta.titulo = ["Die Verwandlung"]
     l_meta.anio_publicacion = [1915]
-    
+
     aut_kafka.escribe.append(l_meta)
 
-    return [l_yawar, l_meta] 
+    return [l_yawar, l_meta]
+
+# --- Checkpoints ---
+
+def _guardar(args):
+    if args.sqlite:
+        quadstore.guardar()
+    else:
+        guardar_archivo_atomico(ONTO_FILE, lambda ruta: onto.save(file=ruta))
+
+def _guardar_progreso(ruta, conf, fase, hechos):
+    datos = json.dumps({"conf": conf, "fase": fase, "hechos": hechos}, ensure_ascii=False)
+    guardar_archivo_atomico(ruta, lambda tmp: open(tmp, "w", encoding="utf-8").write(datos))
 
-def ejecutar_poblado():
+def _tareas(conf, desde_fase, desde):
+    for fase in FASES[FASES.index(desde_fase):]:
+        total = conf[fase]
+        inicio = desde if fase == desde_fase else 0
+        for bloque in range(inicio // TAMANO_BLOQUE, math.ceil(total / TAMANO_BLOQUE)):
+            yield fase, bloque, bloque * TAMANO_BLOQUE, min(total, (bloque + 1) * TAMANO_BLOQUE), conf
+
+def ejecutar_poblado(args):
+    global onto
     start_time = time.time()
-    libros_creados = []
-    
-    with onto:
-        libros_creados.extend(crear_datos_demo_garantizados())
-
-        # 2. Insertar Datos Masivos (DBpedia)
-        datos_libros = obtener_libros_masivos(CANTIDAD_LIBROS_DBPEDIA)
-        
-        if len(datos_libros) < CANTIDAD_LIBROS_DBPEDIA:
-            faltan = CANTIDAD_LIBROS_DBPEDIA - len(datos_libros)
-            print(f">>> Rellenando {faltan} libros con datos sintéticos...")
-            datos_libros += generar_libros_sinteticos(faltan)
-            
-        print(f">>> Procesando {len(datos_libros)} libros masivos...")
-        
-        for i, item in enumerate(datos_libros):
-            hash_id = str(random.randint(1000, 9999))
-            # IDs seguros
-            id_libro = limpiar_texto(item["titulo"])[:30] + hash_id
-            id_autor = "aut_" + limpiar_texto(item["autor"])[:20] + hash_id
-            id_editorial = "edit_" + limpiar_texto(item["editorial"])[:20] + hash_id
-            
-            # Editorial
-            if onto[id_editorial]:
-                editorial = onto[id_editorial]
-            else:
-                editorial = onto.Editorial(id_editorial)
-                editorial.nombre = [item["editorial"]]
-                editorial.pais_origen = [item["pais"]]
-            
-            # Autor
-            if onto[id_autor]:
-                autor = onto[id_autor]
-            else:
-                autor = onto.Persona(id_autor)
-                autor.nombre = [item["autor"]]
-            
-            # Libro
-            libro = onto.Libro(id_libro)
-            libro.titulo = [item["titulo"]]
-            libro.anio_publicacion = [random.randint(1950, 2023)]
-            libro.estado_libro = ["Disponible"]
-            
-            autor.escribe.append(libro)
-            
-            editorial.publica.append(libro)
-            
-            libros_creados.append(libro)
-            
-            if i % 50 == 0 and i > 0:
-                print(f"   ... creados {i} libros")
-
-        # 3. ESTUDIANTES
-        print(f">>> Generando {CANTIDAD_ESTUDIANTES} estudiantes...")
-        carreras = ["Sistemas", "Derecho", "Medicina", "Arquitectura", "Psicologia", "Civil"]
-        
-        for i in range(CANTIDAD_ESTUDIANTES):
-            est = onto.Estudiante(f"Estudiante_{i+1}")
-            est.nombre = [fake.name()]
-            est.codigo_sis = [str(random.randint(20200000, 20250000))]
-            est.carrera = [random.choice(carreras)]
-            
-            # Préstamos aleatorios
-            if libros_creados and random.random() < PROBABILIDAD_PRESTAMO:
-                libro_prestado = random.choice(libros_creados)
-                # Estudiante -> toma_prestado -> Libro
-                est.toma_prestado.append(libro_prestado)
-                libro_prestado.estado_libro = ["Prestado"]
-
-        # 4. DOCENTES Y BIBLIOTECARIOS
-        print(f">>> Generando personal ({CANTIDAD_DOCENTES} docentes, {CANTIDAD_BIBLIOTECARIOS} bibliotecarios)...")
-        
-        for i in range(CANTIDAD_DOCENTES):
-            doc = onto.Docente(f"Docente_{i+1}")
-            doc.nombre = [fake.name()]
-            doc.departamento = [random.choice(["Exactas", "Humanidades", "Salud", "Tecnología"])]
-            doc.item_docente = [str(random.randint(1000, 5000))]
-
-        for i in range(CANTIDAD_BIBLIOTECARIOS):
-            bib = onto.Bibliotecario(f"Bibliotecario_{i+1}")
-            bib.nombre = [fake.name()]
-            bib.turno = [random.choice(["Mañana", "Tarde", "Noche"])]
-            bib.id_empleado = [f"BIB-{random.randint(100, 999)}"]
+
+    if args.sqlite:
+        onto = quadstore.abrir(args.sqlite, ONTO_FILE, IRI_BASE)
+    else:
+        print(f"--- Cargando estructura base: {ONTO_FILE} ---")
+        onto = get_ontology(ONTO_FILE).load()
+
+    conf = {
+        "semilla": args.semilla,
+        "editoriales": max(1, args.editoriales),
+        "autores": max(1, args.autores),
+        "libros": args.libros,
+        "estudiantes": args.estudiantes,
+        "docentes": args.docentes,
+        "bibliotecarios": args.bibliotecarios,
+        "prestamos": _parsear_distribucion(args.prestamos_por_usuario),
+        "libros_por_autor": _parsear_distribucion(args.libros_por_autor),
+        "dbpedia": args.dbpedia,
+    }
+    # JSON convierte las tuplas en listas: normalizar para comparar con el checkpoint
+    conf = json.loads(json.dumps(conf))
+    ruta_progreso = (args.sqlite or ONTO_FILE) + ".progreso.json"
+
+    fase, hechos = FASES[0], 0
+    if os.path.exists(ruta_progreso):
+        with open(ruta_progreso, encoding="utf-8") as f:
+            progreso = json.load(f)
+        if not args.reanudar:
+            raise SystemExit(f"Hay un poblado incompleto ({ruta_progreso}). Use --reanudar o borre el archivo.")
+        if progreso["conf"] != conf:
+            raise SystemExit("Los parámetros no coinciden con los del poblado a reanudar.")
+        fase, hechos = progreso["fase"], progreso["hechos"]
+        print(f">>> Reanudando desde {fase}: {hechos} de {conf[fase]}")
+    else:
+        with onto:
+            crear_datos_demo_garantizados()
+        # El archivo de progreso marca los datos demo como hechos: antes tienen
+        # que quedar en disco, o --reanudar los saltaría tras una caída
+        _guardar(args)
+        _guardar_progreso(ruta_progreso, conf, fase, hechos)
+
+    titulos_reales = obtener_libros_masivos(conf["libros"]) if args.dbpedia else []
+
+    total = sum(conf[f] for f in FASES)
+    creados = sum(conf[f] for f in FASES[:FASES.index(fase)]) + hechos
+    desde_checkpoint = 0
+    print(f">>> Generando {total - creados} individuos en {args.procesos} proceso(s)...")
+
+    pool = multiprocessing.Pool(args.procesos) if args.procesos > 1 else None
+    try:
+        tareas = _tareas(conf, fase, hechos)
+        bloques = pool.imap(_generar_bloque, tareas) if pool else map(_generar_bloque, tareas)
+        for fase, inicio, filas in bloques:
+            with onto:
+                _crear_bloque(fase, inicio, filas, titulos_reales)
+            creados += len(filas)
+            desde_checkpoint += len(filas)
+
+            if desde_checkpoint >= args.checkpoint_cada:
+                _guardar(args)
+                _guardar_progreso(ruta_progreso, conf, fase, inicio + len(filas))
+                desde_checkpoint = 0
+                ritmo = creados / (time.time() - start_time)
+                print(f"   ... checkpoint: {creados}/{total} ({fase}), {ritmo:.0f} individuos/s")
+    finally:
+        if pool:
+            pool.terminate()
 
     print(">>> Guardando ontología...")
-    onto.save(file=ONTO_FILE)
-    
-    print(f"--- ¡LISTO! Ontología guardada en {ONTO_FILE} ---")
-    print(f"Total individuos: {len(list(onto.individuals()))}")
+    _guardar(args)
+    os.remove(ruta_progreso)
+
+    print(f"--- ¡LISTO! Ontología guardada en {args.sqlite or ONTO_FILE} ---")
+    print(f"Total individuos: {len(list(onto.individuals()))} ({time.time() - start_time:.1f} s)")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--libros", type=int, default=CANTIDAD_LIBROS)
+    parser.add_argument("--autores", type=int, default=CANTIDAD_AUTORES)
+    parser.add_argument("--editoriales", type=int, default=CANTIDAD_EDITORIALES)
+    parser.add_argument("--estudiantes", type=int, default=CANTIDAD_ESTUDIANTES)
+    parser.add_argument("--docentes", type=int, default=CANTIDAD_DOCENTES)
+    parser.add_argument("--bibliotecarios", type=int, default=CANTIDAD_BIBLIOTECARIOS)
+    parser.add_argument("--prestamos-por-usuario", type=_distribucion_valida, default=PRESTAMOS_POR_USUARIO,
+                        help="poisson:MEDIA | fijo:N | uniforme:MIN-MAX (máx. %d)" % MAX_PRESTAMOS)
+    parser.add_argument("--libros-por-autor", type=_distribucion_valida, default=LIBROS_POR_AUTOR,
+                        help="zipf:S (pocos autores con muchos libros) | uniforme")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--procesos", type=int, default=1, help="Procesos para generar los valores")
+    parser.add_argument("--checkpoint-cada", type=int, default=CHECKPOINT_CADA, help="Individuos entre checkpoints")
+    parser.add_argument("--reanudar", action="store_true", help="Continúa un poblado interrumpido")
+    parser.add_argument("--sqlite", help="Poblar el quadstore SQLite indicado en lugar de biblioteca.owl")
+    parser.add_argument("--dbpedia", action="store_true", help="Usa títulos reales de DBpedia (requiere red)")
+    ejecutar_poblado(parser.parse_args())
 
 if __name__ == "__main__":
-    ejecutar_poblado()
\ No newline at end of file
+    main_cli()
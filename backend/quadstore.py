@@ -0,0 +1,115 @@
+"""
+Modo quadstore SQLite persistente para la ontología.
+
+En lugar de parsear biblioteca.owl (RDF/XML) en cada arranque, owlready2 usa
+un archivo .sqlite3 como almacén: abrirlo solo requiere abrir la base. La
+primera vez se importa el .owl existente. Las órdenes de línea de comandos
+deben ejecutarse con el servidor detenido.
+
+Uso por línea de comandos (desde /backend):
+    python quadstore.py importar [--sqlite biblioteca.sqlite3] [--owl biblioteca.owl]
+    python quadstore.py exportar [--sqlite biblioteca.sqlite3] [--owl biblioteca.owl]
+"""
+import argparse
+import atexit
+import os
+import pathlib
+import shutil
+import sqlite3
+import tempfile
+
+from owlready2 import default_world, get_ontology
+
+from bitacora import guardar_archivo_atomico
+
+SQLITE_FILE = "biblioteca.sqlite3"
+
+
+def abrir(ruta_sqlite: str, ruta_owl: str, iri_base: str):
+    """
+    Conecta el mundo de owlready2 al quadstore. Si la base no existe todavía,
+    importa `ruta_owl` (si existe) una única vez y la confirma en disco.
+    """
+    nueva = not os.path.exists(ruta_sqlite)
+    # Sin bloqueo exclusivo y en modo WAL: las conexiones de lectura
+    # (conexion_lectura) leen mientras owlready2 escribe y confirma
+    default_world.set_backend(filename=ruta_sqlite, exclusive=False, journal_mode="WAL")
+
+    if nueva and os.path.exists(ruta_owl):
+        print(f"--- Importando {ruta_owl} al quadstore {ruta_sqlite} (una sola vez) ---")
+        onto = get_ontology(ruta_owl).load()
+        default_world.save()
+        return onto
+
+    onto = get_ontology(iri_base)
+    if nueva:
+        print(f"--- Creando quadstore desde cero: {ruta_sqlite} ---")
+    else:
+        print(f"--- Abriendo quadstore: {ruta_sqlite} ---")
+        # La ontología ya está en la base: load() no vuelve a parsear nada
+        onto.load()
+    return onto
+
+
+def abrir_temporal():
+    """
+    Respalda el mundo de owlready2 con una base temporal en disco en lugar de
+    ":memory:" (modos .owl e instantánea), para que conexion_lectura pueda
+    abrirla. No se sincroniza con el disco: la durabilidad la dan el archivo
+    de la ontología y la bitácora. Se borra al terminar el proceso. No hace
+    nada si el mundo ya tiene base.
+    """
+    if default_world.graph.filename != ":memory:":
+        return
+    directorio = tempfile.mkdtemp(prefix="biblioteca-")
+    atexit.register(shutil.rmtree, directorio, ignore_errors=True)
+    default_world.set_backend(filename=os.path.join(directorio, "mundo.sqlite3"),
+                              exclusive=False, journal_mode="WAL")
+    default_world.graph.commit()
+    default_world.graph.execute("PRAGMA synchronous = OFF")
+
+
+def conexion_lectura():
+    """Conexión SQLite propia a la base del mundo, para consultas de solo lectura."""
+    uri = pathlib.Path(default_world.graph.filename).absolute().as_uri()
+    conexion = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conexion.execute("PRAGMA mmap_size = 30000000000")
+    return conexion
+
+
+def guardar():
+    """Confirma en disco la transacción en curso del quadstore."""
+    default_world.save()
+
+
+def exportar_owl(onto, ruta_owl: str):
+    """Vuelca la ontología del quadstore a RDF/XML (reemplazo atómico)."""
+    guardar_archivo_atomico(ruta_owl, lambda ruta: onto.save(file=ruta))
+
+
+def main_cli():
+    from main import IRI_BASE, ONTO_FILE
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("accion", choices=["importar", "exportar"])
+    parser.add_argument("--sqlite", default=SQLITE_FILE)
+    parser.add_argument("--owl", default=ONTO_FILE)
+    args = parser.parse_args()
+
+    if args.accion == "importar":
+        if os.path.exists(args.sqlite):
+            parser.error(f"{args.sqlite} ya existe; bórrelo para volver a importar")
+        if not os.path.exists(args.owl):
+            parser.error(f"No existe {args.owl}")
+        onto = abrir(args.sqlite, args.owl, IRI_BASE)
+        print(f"--- Importados {len(list(onto.individuals()))} individuos ---")
+    else:
+        if not os.path.exists(args.sqlite):
+            parser.error(f"No existe {args.sqlite}")
+        onto = abrir(args.sqlite, args.owl, IRI_BASE)
+        exportar_owl(onto, args.owl)
+        print(f"--- Exportado a {args.owl} ---")
+
+
+if __name__ == "__main__":
+    main_cli()
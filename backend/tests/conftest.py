@@ -0,0 +1,34 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+@pytest.fixture(scope="session")
+def app_dir(tmp_path_factory):
+    """
+    Directorio de trabajo de la API con una copia de biblioteca.owl: main.py
+    usa rutas relativas, así que la aplicación nunca toca los archivos del
+    repositorio.
+    """
+    directorio = tmp_path_factory.mktemp("api")
+    shutil.copy(os.path.join(BACKEND, "biblioteca.owl"), directorio)
+    anterior = os.getcwd()
+    os.chdir(directorio)
+    yield directorio
+    os.chdir(anterior)
+
+
+@pytest.fixture(scope="session")
+def cliente(app_dir):
+    from fastapi.testclient import TestClient
+
+    os.environ.setdefault("BIBLIOTECA_SPARQL_PLAZO_SEG", "1")
+    import main
+
+    with TestClient(main.app, raise_server_exceptions=False) as c:
+        yield c
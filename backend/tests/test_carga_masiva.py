@@ -0,0 +1,68 @@
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import BACKEND
+
+
+@pytest.fixture
+def servidor(tmp_path):
+    """uvicorn real en un puerto libre: TestClient no entrega la respuesta hasta terminar la petición."""
+    shutil.copy(os.path.join(BACKEND, "biblioteca.owl"), tmp_path)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        puerto = s.getsockname()[1]
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(puerto), "--log-level", "warning"],
+        cwd=tmp_path, env=dict(os.environ, PYTHONPATH=BACKEND),
+    )
+    try:
+        limite = time.monotonic() + 60
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", puerto), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > limite or proc.poll() is not None:
+                    raise RuntimeError("El servidor no arrancó")
+                time.sleep(0.1)
+        yield puerto
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def _fragmento(datos: bytes) -> bytes:
+    return b"%x\r\n%s\r\n" % (len(datos), datos)
+
+
+def test_resultados_llegan_durante_la_subida(servidor):
+    primera = b'{"op": "crear", "name": "Libro_Bulk_1", "class_name": "Libro"}\n'
+    resto = b'{"op": "crear", "name": "Libro_Bulk_2", "class_name": "Libro"}\n{"op": "crear", "name": "x", "class_name": "NoExiste"}\n'
+
+    with socket.create_connection(("127.0.0.1", servidor), timeout=10) as s:
+        s.sendall(b"POST /individuos/bulk?lote=1 HTTP/1.1\r\nHost: prueba\r\n"
+                  b"Content-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n\r\n" + _fragmento(primera))
+
+        # El cuerpo sigue abierto: el resultado de la primera línea tiene que llegar igual
+        recibido = b""
+        while b'"linea": 1' not in recibido:
+            datos = s.recv(65536)
+            assert datos, "el servidor cerró la conexión"
+            recibido += datos
+
+        s.sendall(_fragmento(resto) + b"0\r\n\r\n")
+        while b'"resumen"' not in recibido:
+            datos = s.recv(65536)
+            assert datos, "el servidor cerró la conexión"
+            recibido += datos
+
+    lineas = [json.loads(l) for l in recibido.split(b"\r\n\r\n", 1)[1].split(b"\n") if l.startswith(b"{")]
+    assert [l.get("ok") for l in lineas[:3]] == [True, True, False]
+    assert lineas[-1]["resumen"] == {"lineas": 3, "aplicadas": 2, "errores": 1}
@@ -0,0 +1,82 @@
+import threading
+import time
+
+LIBRO = "<http://uni.edu/biblioteca.owl#Libro>"
+# Producto cruzado de todas las tripletas: supera cualquier plazo razonable
+CONSULTA_LARGA = "SELECT (COUNT(*) AS ?n) WHERE { ?a ?p ?b . ?c ?q ?d . ?e ?r ?f . }"
+
+
+def test_plazo_no_corta_lecturas_concurrentes(cliente):
+    import main
+
+    lecturas = []       # (inicio, duración, estado) de cada lectura corta
+    fin = threading.Event()
+
+    def leer():
+        cursor = None
+        i = 0
+        while not fin.is_set():
+            inicio = time.monotonic()
+            r = cliente.get("/libros", params={"limit": 5, **({"cursor": cursor} if cursor else {})})
+            cursor = r.json().get("siguiente_cursor")
+            lecturas.append((inicio, time.monotonic() - inicio, r.status_code))
+            # El offset cambia en cada vuelta para no responder desde la caché
+            inicio = time.monotonic()
+            r = cliente.post("/consultar/sparql", json={"query": f"SELECT ?x WHERE {{ ?x a {LIBRO} . }}", "limit": 1, "offset": i})
+            lecturas.append((inicio, time.monotonic() - inicio, r.status_code))
+            i += 1
+
+    lector = threading.Thread(target=leer)
+    lector.start()
+    try:
+        time.sleep(0.2)
+        inicio = time.monotonic()
+        r = cliente.post("/consultar/sparql", json={"query": CONSULTA_LARGA})
+        duracion = time.monotonic() - inicio
+        time.sleep(0.2)
+    finally:
+        fin.set()
+        lector.join(30)
+
+    assert r.status_code == 408
+    assert duracion < main.PLAZO_SPARQL_SEG + 2
+    durante = [(d, estado) for t, d, estado in lecturas if inicio <= t <= inicio + duracion]
+    assert len(durante) > 5
+    assert all(estado == 200 for _, estado in durante)
+    assert max(d for d, _ in durante) < 1
+    assert all(estado == 200 for _, _, estado in lecturas)
+
+
+def test_consulta_ve_escrituras_recientes(cliente):
+    r = cliente.post("/individuos/", json={"name": "Libro_Plazo", "class_name": "Libro"})
+    assert r.status_code == 200, r.text
+    r = cliente.post("/consultar/sparql", json={"query": f"SELECT ?x WHERE {{ ?x a {LIBRO} . }}"})
+    assert r.status_code == 200
+    assert "Libro_Plazo" in {fila[0]["nombre"] for fila in r.json()["resultados"]}
+
+
+def test_plazo_no_corta_escrituras_concurrentes(cliente):
+    estados = []
+    fin = threading.Event()
+
+    def escribir():
+        i = 0
+        while not fin.is_set():
+            r = cliente.post("/individuos/", json={"name": f"Libro_Concurrente_{i}", "class_name": "Libro"})
+            estados.append(r.status_code)
+            i += 1
+
+    escritor = threading.Thread(target=escribir)
+    escritor.start()
+    try:
+        time.sleep(0.2)
+        r = cliente.post("/consultar/sparql", json={"query": CONSULTA_LARGA})
+        time.sleep(0.2)
+    finally:
+        fin.set()
+        escritor.join(30)
+
+    assert r.status_code == 408
+    assert len(estados) > 5
+    assert all(estado == 200 for estado in estados)
+    assert cliente.get("/individuos/Libro_Concurrente_0").status_code == 200
@@ -0,0 +1,36 @@
+import pytest
+
+
+@pytest.mark.parametrize("ruta, cuerpo", [
+    ("/individuos/datos", {"individual": "Libro", "property": "titulo", "value": "Tomo"}),
+    ("/individuos/relacion", {"subject": "autor_kafka", "property": "escribe", "object": "Libro"}),
+    ("/individuos/relacion", {"subject": "Persona", "property": "escribe", "object": "libro_yawar_fiesta"}),
+])
+def test_escrituras_rechazan_clases(cliente, ruta, cuerpo):
+    antes = cliente.get("/estadisticas").json()["clases"]
+    r = cliente.post(ruta, json=cuerpo)
+    assert r.status_code == 400
+    assert cliente.get("/estadisticas").json()["clases"] == antes
+    assert all(f.get("tipo") != "None" for f in cliente.get("/buscador", params={"q": "tomo"}).json()["resultados"])
+
+
+def test_crear_rechaza_clase_que_no_es_clase(cliente):
+    r = cliente.post("/individuos/", json={"name": "Libro_Raro", "class_name": "autor_kafka"})
+    assert r.status_code == 404
+
+
+def test_reproducir_bitacora_no_duplica_valores(cliente):
+    import main
+
+    dato = {"op": "dato", "individual": "libro_yawar_fiesta", "property": "resumen", "value": "Reedición"}
+    relacion = {"op": "relacion", "subject": "autor_kafka", "property": "escribe", "object": "libro_yawar_fiesta"}
+    assert cliente.post("/individuos/datos", json={k: v for k, v in dato.items() if k != "op"}).status_code == 200
+    assert cliente.post("/individuos/relacion", json={k: v for k, v in relacion.items() if k != "op"}).status_code == 200
+
+    # Como al arrancar tras una caída entre el guardado y el vaciado de la bitácora
+    with main._mutacion():
+        main._APLICADORES["dato"](dato)
+        main._APLICADORES["relacion"](relacion)
+
+    assert main.onto.libro_yawar_fiesta.resumen.count("Reedición") == 1
+    assert main.onto.autor_kafka.escribe.count(main.onto.libro_yawar_fiesta) == 1
@@ -0,0 +1,27 @@
+from indice_relevancia import IndiceRelevancia
+
+
+def test_actualizar_mantiene_listas_y_totales(cliente):
+    import main
+
+    assert cliente.post("/individuos/", json={"name": "Libro_Relevancia", "class_name": "Libro"}).status_code == 200
+    for valor in ("Crónica de una muerte anunciada", "Crónica del pájaro que da cuerda al mundo"):
+        r = cliente.post("/individuos/datos", json={"individual": "Libro_Relevancia", "property": "titulo", "value": valor})
+        assert r.status_code == 200
+    r = cliente.post("/individuos/datos", json={"individual": "libro_yawar_fiesta", "property": "resumen", "value": "Crónica andina"})
+    assert r.status_code == 200
+
+    indice = main.indice_relevancia
+    indice.buscar("crónica libro")          # ordena esas listas
+    assert cliente.post("/individuos/datos", json={
+        "individual": "Libro_Relevancia", "property": "titulo", "value": "Otra crónica"}).status_code == 200
+    assert indice._listas
+    for t, lista in indice._listas.items():
+        assert lista == sorted(indice._impactos[t], key=indice._clave(t))
+
+    nuevo = IndiceRelevancia()
+    nuevo.construir(main.onto)
+    assert indice._totales == nuevo._totales
+    assert indice._n_docs == nuevo._n_docs
+    assert set(indice._lista("cronica")) == set(nuevo._lista("cronica"))
+    assert [s for s, _ in indice.buscar("crónica", k=50)] == [s for s, _ in nuevo.buscar("crónica", k=50)]
@@ -0,0 +1,61 @@
+import io
+
+import pytest
+from owlready2 import DataProperty, FunctionalProperty, ObjectProperty, Thing, World, locstr
+
+import instantanea
+
+IRI = "http://prueba.org/mini.owl#"
+
+
+@pytest.fixture
+def mini():
+    """Ontología pequeña con nodos en blanco, textos con idioma y literales tipados."""
+    onto = World().get_ontology(IRI)
+    with onto:
+        class Persona(Thing): pass
+        class Libro(Thing): pass
+        class escribe(ObjectProperty): domain = [Persona]; range = [Libro]
+        class titulo(DataProperty): range = [str]
+        class paginas(DataProperty, FunctionalProperty): range = [int]
+        class precio(DataProperty, FunctionalProperty): range = [float]
+        # Restricción: se guarda con nodos en blanco
+        class Autor(Persona): is_a = [escribe.some(Libro)]
+
+        libro = Libro("libro_1", titulo=[locstr("Los ríos profundos", "es"), locstr("Deep Rivers", "en"),
+                                         'Con "comillas"\ny salto'])
+        libro.paginas = 256
+        libro.precio = 39.9
+        Autor("autor_1", escribe=[libro])
+    return onto
+
+
+def test_instantanea_ida_y_vuelta(mini, tmp_path):
+    ruta = str(tmp_path / "mini.instantanea")
+    instantanea.escribir(mini, ruta)
+    copia = instantanea.cargar(ruta, IRI, World())
+
+    esperadas = instantanea.tripletas(mini)
+    assert any(t[0] == "_:" for t in esperadas)
+    assert instantanea.tripletas(copia) == esperadas
+    libro = copia.libro_1
+    assert libro.paginas == 256 and isinstance(libro.paginas, int)
+    assert libro.precio == 39.9 and isinstance(libro.precio, float)
+    assert {(str(t), getattr(t, "lang", None)) for t in libro.titulo} == {
+        ("Los ríos profundos", "es"), ("Deep Rivers", "en"), ('Con "comillas"\ny salto', None)}
+    assert copia.autor_1.escribe == [libro]
+
+
+def test_ntriples_ida_y_vuelta(mini):
+    texto = "".join(instantanea.ntriples(mini, lote=3))
+    assert "_:b" in texto and "@es" in texto
+    copia = World().get_ontology(IRI).load(fileobj=io.BytesIO(texto.encode("utf-8")), format="ntriples")
+
+    assert instantanea.tripletas(copia) == instantanea.tripletas(mini)
+
+
+def test_cargar_rechaza_otra_ontologia(mini, tmp_path):
+    ruta = str(tmp_path / "mini.instantanea")
+    instantanea.escribir(mini, ruta)
+    with pytest.raises(ValueError):
+        instantanea.cargar(ruta, "http://otra.org/onto#", World())
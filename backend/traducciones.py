@@ -0,0 +1,67 @@
+import hashlib
+import json
+import threading
+
+IDIOMAS_SOPORTADOS = ["es", "en", "qu", "fr", "de"]
+IDIOMA_RESPALDO = "es"
+
+
+def _etiqueta(entidad, lang_code: str):
+    """Primera etiqueta de la entidad en el idioma pedido, o None."""
+    for lbl in entidad.label:
+        if getattr(lbl, "lang", None) == lang_code:
+            return str(lbl)
+    return None
+
+
+def traducir_schema(onto, lang_code: str) -> dict:
+    """
+    Mapa nombre -> etiqueta de clases y propiedades en `lang_code`, con
+    respaldo en español y, si no hay etiqueta, el propio nombre.
+    """
+    traducciones = {}
+    # 1. Clases, 2. Propiedades
+    for entidad in list(onto.classes()) + list(onto.properties()):
+        traducciones[entidad.name] = (
+            _etiqueta(entidad, lang_code)
+            or _etiqueta(entidad, IDIOMA_RESPALDO)
+            or entidad.name
+        )
+    return traducciones
+
+
+class _Tabla:
+    __slots__ = ("cuerpo", "etag")
+
+    def __init__(self, datos):
+        self.cuerpo = json.dumps(datos, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+        self.etag = '"' + hashlib.sha1(self.cuerpo).hexdigest()[:20] + '"'
+
+
+class TablasTraduccion:
+    """
+    Traducciones del T-Box para todos los idiomas soportados, ya serializadas.
+    Se construyen al arrancar y solo se reconstruyen cuando cambia el esquema.
+    El ETag depende del contenido, así que sobrevive a reinicios.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_idioma = {}
+        self._todas = None
+
+    def construir(self, onto):
+        por_idioma = {lang: traducir_schema(onto, lang) for lang in IDIOMAS_SOPORTADOS}
+        tablas = {lang: _Tabla(datos) for lang, datos in por_idioma.items()}
+        todas = _Tabla(por_idioma)
+        with self._lock:
+            self._por_idioma = tablas
+            self._todas = todas
+
+    def idioma(self, lang_code: str) -> _Tabla:
+        with self._lock:
+            return self._por_idioma.get(lang_code)
+
+    def todas(self) -> _Tabla:
+        with self._lock:
+            return self._todas
@@ -16,23 +16,25 @@ function App() {
   const [isSearching, setIsSearching] = useState(false);
   
   const [language, setLanguage] = useState('es');
-  const [translations, setTranslations] = useState({});
+  const [allTranslations, setAllTranslations] = useState({});
+  const translations = allTranslations[language] || {};
 
+  // Todas las traducciones llegan en una sola petición; cambiar de idioma no vuelve a pedir nada
   useEffect(() => {
     const loadTranslations = async () => {
       try {
-        const response = await fetch(`${API_BASE}/config/idioma/${language}`);
+        const response = await fetch(`${API_BASE}/config/idiomas`);
         const data = await response.json();
-        setTranslations(data);
-        console.log('Traducciones cargadas:', data);
+        setAllTranslations(data);
+        console.log('Traducciones cargadas:', Object.keys(data));
       } catch (error) {
         console.error('Error cargando traducciones:', error);
-        setTranslations({});
+        setAllTranslations({});
       }
     };
 
     loadTranslations();
-  }, [language]);
+  }, []);
 
   const handleSearch = async (query, category, onlineMode) => {
     setIsSearching(true);
@@ -1,4 +1,5 @@
 import { useEffect, useState } from 'react';
+import { useCambios } from '../useCambios';
 import './Dashboard.css';
 
 const API_BASE = 'http://127.0.0.1:8000';
@@ -19,25 +20,22 @@ function Dashboard({ onViewList, onItemClick }) {
         
     }, []);
 
+    // Los conteos solo cambian al crear individuos (o con SPARQL)
+    useCambios(evento => {
+        if (evento.op !== 'dato' && evento.op !== 'relacion') loadStats();
+    });
+
     const loadStats = async () => {
         try {
-            const [libros, estudiantes, docentes, revistas, bibliotecarios] = await Promise.all([
-                fetch(`${API_BASE}/libros`).then(r => r.json()),
-                fetch(`${API_BASE}/estudiantes`).then(r => r.json()),
-                fetch(`${API_BASE}/docentes`).then(r => r.json()),
-                fetch(`${API_BASE}/revistas`).then(r => r.json()),
-                fetch(`${API_BASE}/bibliotecarios`).then(r => r.json())
-            ]);
-
-            // console.log(libros, estudiantes, doce);
-            
+            const data = await fetch(`${API_BASE}/estadisticas`).then(r => r.json());
+            const clases = data.clases || {};
 
             setStats({
-                libros: libros.length,
-                estudiantes: estudiantes.length,
-                docentes: docentes.length,
-                revistas: revistas.length,
-                bibliotecarios: bibliotecarios.length
+                libros: clases.Libro || 0,
+                estudiantes: clases.Estudiante || 0,
+                docentes: clases.Docente || 0,
+                revistas: clases.Revista || 0,
+                bibliotecarios: clases.Bibliotecario || 0
             });
 
         } catch (error) {
@@ -52,7 +50,7 @@ function Dashboard({ onViewList, onItemClick }) {
             id: 'libros',
             title: 'Libros',
             icon: '📖',
-            count: 202,
+            count: stats.libros,
             color: 'blue',
             gradient: 'linear-gradient(135deg, var(--neon-blue), var(--neon-purple))'
         },
@@ -60,7 +58,7 @@ function Dashboard({ onViewList, onItemClick }) {
             id: 'estudiantes',
             title: 'Estudiantes',
             icon: '🎓',
-            count: 100,
+            count: stats.estudiantes,
             color: 'pink',
             gradient: 'linear-gradient(135deg, var(--neon-pink), var(--neon-purple))'
         },
@@ -68,7 +66,7 @@ function Dashboard({ onViewList, onItemClick }) {
             id: 'docentes',
             title: 'Docentes',
             icon: '👨‍🏫',
-            count: 50,
+            count: stats.docentes,
             color: 'purple',
             gradient: 'linear-gradient(135deg, var(--neon-purple), var(--neon-blue))'
         },
@@ -85,7 +83,7 @@ function Dashboard({ onViewList, onItemClick }) {
             id: 'bibliotecarios',
             title: 'Bibliotecarios',
             icon: '👤',
-            count: 20,
+            count: stats.bibliotecarios,
             color: 'yellow',
             gradient: 'linear-gradient(135deg, var(--neon-yellow), var(--neon-pink))'
         }
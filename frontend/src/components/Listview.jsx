@@ -1,28 +1,73 @@
 import { useEffect, useState } from 'react';
+import { useCambios } from '../useCambios';
 import './ListView.css';
 
 // const API_BASE = 'http://127.0.0.1:8000';
 const API_BASE = 'http://localhost:8000';
+const PAGE_SIZE = 50;
+
+const CLASE_POR_TIPO = {
+    libros: 'Libro',
+    estudiantes: 'Estudiante',
+    docentes: 'Docente',
+    revistas: 'Revista',
+    bibliotecarios: 'Bibliotecario'
+};
 
 function ListView({ type, onItemClick }) {
     const [items, setItems] = useState([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         loadItems();
     }, [type]);
 
+    // Actualiza solo la fila afectada en lugar de volver a pedir la lista
+    useCambios(evento => {
+        if (evento.op === 'reinicio' || evento.op === 'sparql') {
+            loadItems();
+        } else if (evento.op === 'crear') {
+            // Las filas van en orden de creación: solo se agrega si ya se cargó la última página
+            if (evento.clase === CLASE_POR_TIPO[type] && !nextCursor) refreshItem(evento.entidad);
+        } else if (items.some(item => item.id === evento.entidad)) {
+            refreshItem(evento.entidad);
+        }
+    });
+
+    const refreshItem = async (id) => {
+        try {
+            const response = await fetch(`${API_BASE}/individuos/${encodeURIComponent(id)}`);
+            if (!response.ok) return;
+            const detalle = await response.json();
+            const item = { id: detalle.nombre, tipo: detalle.clase, datos: detalle.datos, relaciones: detalle.relaciones };
+            setItems(prev => prev.some(it => it.id === id)
+                ? prev.map(it => (it.id === id ? item : it))
+                : [...prev, item]);
+        } catch (err) {
+            console.error('Error actualizando elemento:', err);
+        }
+    };
+
+    const fetchPage = async (cursor) => {
+        const params = new URLSearchParams({ limit: PAGE_SIZE });
+        if (cursor) params.append('cursor', cursor);
+
+        const response = await fetch(`${API_BASE}/${type}?${params}`);
+        if (!response.ok) throw new Error('Error al cargar datos');
+        return response.json();
+    };
+
     const loadItems = async () => {
         setLoading(true);
         setError(null);
 
         try {
-            const response = await fetch(`${API_BASE}/${type}`);
-            if (!response.ok) throw new Error('Error al cargar datos');
-
-            const data = await response.json();
-            setItems(data);
+            const data = await fetchPage(null);
+            setItems(data.resultados);
+            setNextCursor(data.siguiente_cursor);
         } catch (err) {
             setError(err.message);
         } finally {
@@ -30,6 +75,20 @@ function ListView({ type, onItemClick }) {
         }
     };
 
+    const loadMore = async () => {
+        setLoadingMore(true);
+
+        try {
+            const data = await fetchPage(nextCursor);
+            setItems(prev => [...prev, ...data.resultados]);
+            setNextCursor(data.siguiente_cursor);
+        } catch (err) {
+            setError(err.message);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const getTitleByType = (type) => {
         const titles = {
             libros: 'Libros',
@@ -157,7 +216,7 @@ function ListView({ type, onItemClick }) {
                         </h2>
                     </div>
                     <div className="list-count">
-                        Total: <strong>{items.length}</strong>
+                        Total: <strong>{items.length}{nextCursor ? '+' : ''}</strong>
                     </div>
                 </div>
             </div>
@@ -176,6 +235,14 @@ function ListView({ type, onItemClick }) {
                     </table>
                 </div>
             </div>
+
+            {nextCursor && (
+                <div className="list-load-more">
+                    <button className="btn-view" onClick={loadMore} disabled={loadingMore}>
+                        {loadingMore ? 'Cargando...' : 'Cargar más'}
+                    </button>
+                </div>
+            )}
         </div>
     );
 }
@@ -0,0 +1,23 @@
+import { useEffect, useRef } from 'react';
+
+const API_BASE = 'http://127.0.0.1:8000';
+
+// Suscripción a GET /cambios (Server-Sent Events). `alCambiar` recibe cada
+// evento ya parseado ({ op, entidad, clase, propiedad, valor, generacion });
+// si el servidor avisa que se perdieron eventos llega { op: 'reinicio' } y
+// hay que volver a cargar todo. EventSource reconecta solo y envía
+// Last-Event-ID para retomar donde quedó.
+export function useCambios(alCambiar) {
+    const callback = useRef(alCambiar);
+
+    useEffect(() => {
+        callback.current = alCambiar;
+    });
+
+    useEffect(() => {
+        const fuente = new EventSource(`${API_BASE}/cambios`);
+        fuente.addEventListener('cambio', e => callback.current(JSON.parse(e.data)));
+        fuente.addEventListener('reinicio', () => callback.current({ op: 'reinicio' }));
+        return () => fuente.close();
+    }, []);
+}